@@ -56,9 +56,9 @@ class MattermostAdapter:
     
     def __init__(self, settings: Settings):
         self.settings = settings
-        self.base_url = settings.mattermost_url.rstrip('/')
+        self.base_url = str(settings.mattermost.url).rstrip('/')
         self.bot_token = settings.mattermost_bot_token.get_secret_value()
-        self.team_id = settings.mattermost_team_id
+        self.team_id = settings.mattermost.team_id
         self.escalation_channel_id = settings.mattermost_escalation_channel_id
         
         # HTTP client for API calls
@@ -408,6 +408,27 @@ class MattermostAdapter:
             logger.error("Failed to create escalation thread", error=str(e))
             return None
     
+    async def get_user_status(self, user_id: str) -> Optional[str]:
+        """Get presence status (online, away, dnd, offline) for a single user."""
+        statuses = await self.get_users_status([user_id])
+        return statuses.get(user_id)
+    
+    async def get_users_status(self, user_ids: List[str]) -> Dict[str, str]:
+        """Get presence statuses for several users in a single API call."""
+        if not self.client or not user_ids:
+            return {}
+        
+        response = await self.client.post(
+            f"{self.base_url}/api/v4/users/status/ids",
+            json=list(user_ids)
+        )
+        response.raise_for_status()
+        
+        return {
+            status["user_id"]: status.get("status", "offline")
+            for status in response.json()
+        }
+    
     async def update_agent_workload(self, agent_user_id: str, delta: int) -> None:
         """Update agent workload counter."""
         current = self.agent_workload.get(agent_user_id, 0)
@@ -54,12 +54,12 @@ class TwilioAdapter:
             
             # Initialize Twilio client
             self.client = Client(
-                self.settings.twilio_account_sid,
-                self.settings.twilio_auth_token.get_secret_value()
+                self.settings.twilio.account_sid,
+                self.settings.twilio.auth_token.get_secret_value()
             )
             
             # Verify account
-            account = self.client.api.accounts(self.settings.twilio_account_sid).fetch()
+            account = self.client.api.accounts(self.settings.twilio.account_sid).fetch()
             logger.info(
                 "Twilio client initialized successfully",
                 account_sid=account.sid,
@@ -105,7 +105,7 @@ class TwilioAdapter:
             # Send SMS
             twilio_message = self.client.messages.create(
                 body=protected_message,
-                from_=from_number or self.settings.twilio_phone_number,
+                from_=from_number or self.settings.twilio.phone_number,
                 to=to_number,
                 media_url=media_urls
             )
@@ -163,7 +163,7 @@ class TwilioAdapter:
             call = self.client.calls.create(
                 twiml=f'<Response><Redirect>{twiml_url}</Redirect></Response>',
                 to=to_number,
-                from_=from_number or self.settings.twilio_phone_number
+                from_=from_number or self.settings.twilio.phone_number
             )
             
             logger.info(
@@ -479,7 +479,7 @@ class TwilioAdapter:
             from twilio.request_validator import RequestValidator
             
             validator = RequestValidator(
-                self.settings.twilio_auth_token.get_secret_value()
+                self.settings.twilio.auth_token.get_secret_value()
             )
             
             return validator.validate(url, post_data, signature)
@@ -495,13 +495,13 @@ class TwilioAdapter:
         
         try:
             # Test account access
-            account = self.client.api.accounts(self.settings.twilio_account_sid).fetch()
+            account = self.client.api.accounts(self.settings.twilio.account_sid).fetch()
             
             return {
                 "status": "healthy",
                 "account_sid": account.sid,
                 "account_status": account.status,
-                "phone_number": self.settings.twilio_phone_number,
+                "phone_number": self.settings.twilio.phone_number,
                 "capabilities": ["sms", "voice"]
             }
             
@@ -0,0 +1,113 @@
+"""Bring schemas created by create_all up to the current models
+
+Revision ID: 7c1e4b9a2d3f
+Revises:
+Create Date: 2026-10-16 09:00:00.000000
+
+Base.metadata.create_all never alters an existing table, so databases created
+before this revision keep JSON columns, the old btree/boolean indexes and no
+audit_logs.entry_id (which audit writes deduplicate on with ON CONFLICT
+(entry_id)). Every step is conditional, so the revision is also safe on a
+database create_all has already brought up to date.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+
+# revision identifiers, used by Alembic.
+revision = "7c1e4b9a2d3f"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# Same expression as AuditLog.retention_until's server default
+RETENTION_DEFAULT = "(now() AT TIME ZONE 'utc') + interval '7 years'"
+
+# Columns the models store as JSONB, by table
+JSONB_COLUMNS = {
+    "users": ("communication_preferences", "accessibility_needs"),
+    "agents": ("languages", "specialties"),
+    "conversations": ("context_data", "metadata"),
+    "conversation_messages": ("metadata",),
+    "escalation_tickets": ("conversation_summary", "user_context", "tags", "notes"),
+    "audit_logs": ("event_data", "affected_resources"),
+    "user_profiles": ("general_conditions", "care_team_ids"),
+    "system_configuration": ("value",),
+}
+
+# Indexes duplicating a unique constraint's index, or superseded by idx_tickets_open
+DROPPED_INDEXES = (
+    "idx_users_phone", "idx_users_email", "idx_tickets_status",
+    "idx_profile_user", "idx_config_key",
+)
+
+# (name, table, definition, marker): an existing index whose pg_indexes definition
+# lacks the marker predates the model and is rebuilt
+INDEXES = (
+    ("idx_conversations_created", "conversations", "USING brin (created_at)", "USING brin"),
+    ("idx_messages_timestamp", "conversation_messages", 'USING brin ("timestamp")', "USING brin"),
+    ("idx_messages_phi", "conversation_messages", "(conversation_id) WHERE phi_detected", "WHERE"),
+    ("idx_tickets_open", "escalation_tickets",
+     "(status) WHERE status IN ('pending', 'assigned', 'in_progress')", "WHERE"),
+    ("idx_audit_timestamp", "audit_logs", 'USING brin ("timestamp")', "USING brin"),
+    ("idx_audit_phi", "audit_logs", '("timestamp") WHERE phi_accessed', "WHERE"),
+    ("idx_audit_event_data_gin", "audit_logs", "USING gin (event_data)", "USING gin"),
+    ("idx_audit_request", "audit_logs", "(request_id) WHERE request_id IS NOT NULL", "WHERE"),
+)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = set(inspector.get_table_names())
+    if "audit_logs" not in tables:
+        # Fresh database: create_all builds the current schema on startup
+        return
+    
+    for table, columns in JSONB_COLUMNS.items():
+        if table not in tables:
+            continue
+        column_types = {column["name"]: column["type"] for column in inspector.get_columns(table)}
+        for column in columns:
+            if column in column_types and not isinstance(column_types[column], JSONB):
+                op.alter_column(
+                    table, column,
+                    type_=JSONB(),
+                    postgresql_using=f'"{column}"::jsonb'
+                )
+    
+    audit_columns = {column["name"] for column in inspector.get_columns("audit_logs")}
+    if "entry_id" not in audit_columns:
+        op.add_column("audit_logs", sa.Column("entry_id", UUID(as_uuid=True), nullable=True))
+        # Existing rows are distinct entries, each gets its own id (gen_random_uuid is built in from PostgreSQL 13)
+        op.execute("UPDATE audit_logs SET entry_id = gen_random_uuid() WHERE entry_id IS NULL")
+        op.alter_column("audit_logs", "entry_id", nullable=False)
+    op.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_audit_entry ON audit_logs (entry_id)")
+    op.alter_column("audit_logs", "retention_until", server_default=sa.text(RETENTION_DEFAULT))
+    
+    for name in DROPPED_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+    
+    for name, table, definition, marker in INDEXES:
+        if table not in tables:
+            continue
+        existing = bind.execute(
+            sa.text("SELECT indexdef FROM pg_indexes WHERE indexname = :name"),
+            {"name": name}
+        ).scalar()
+        if existing is not None and marker in existing:
+            continue
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+        op.execute(f'CREATE INDEX {name} ON "{table}" {definition}')
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_audit_event_data_gin")
+    op.execute("DROP INDEX IF EXISTS idx_audit_request")
+    op.execute("DROP INDEX IF EXISTS idx_tickets_open")
+    op.execute("DROP INDEX IF EXISTS idx_audit_entry")
+    op.alter_column("audit_logs", "retention_until", server_default=None)
+    op.drop_column("audit_logs", "entry_id")
+    # JSONB columns and the BRIN/partial index definitions are kept; both are
+    # compatible with the code that predates this revision
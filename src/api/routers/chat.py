@@ -410,10 +410,10 @@ async def websocket_endpoint(
                 
             except json.JSONDecodeError:
                 logger.warning("Invalid JSON received", connection_id=connection_id)
-                await websocket.send_text(json.dumps({
+                await ws_manager.send_to_connection(connection_id, {
                     "type": "error",
                     "message": "Invalid JSON format"
-                }))
+                })
                 
             except Exception as e:
                 logger.error(
@@ -421,10 +421,10 @@ async def websocket_endpoint(
                     connection_id=connection_id,
                     error=str(e)
                 )
-                await websocket.send_text(json.dumps({
+                await ws_manager.send_to_connection(connection_id, {
                     "type": "error",
                     "message": "Message processing failed"
-                }))
+                })
                 
     except Exception as e:
         logger.error("WebSocket connection failed", error=str(e))
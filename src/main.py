@@ -6,6 +6,7 @@ Production-ready FastAPI application with full healthcare AI capabilities
 import asyncio
 import signal
 import sys
+import time
 from datetime import datetime
 from contextlib import asynccontextmanager
 from typing import Dict, Any
@@ -22,7 +23,7 @@ from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 from orchestration.chat_orchestrator import ChatOrchestrator
 from orchestration.websocket_manager import WebSocketManager
 from utils.config import get_settings, Settings
-from utils.database import init_database, check_database_health
+from utils.database import init_database, close_database, check_database_health
 from utils.security import SecurityManager
 from utils.metrics import MetricsCollector
 from utils.phi_protection import PHIProtector
@@ -36,6 +37,11 @@ from api.routers.health import router as health_router
 from adapters.twilio_adapter import TwilioAdapter
 from adapters.mattermost_adapter import MattermostAdapter
 
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
 # Configure logging
 logger = structlog.get_logger(__name__)
 
@@ -105,7 +111,7 @@ async def startup_components():
         logger.info("Mattermost adapter initialized")
     
     # Initialize WebSocket manager
-    websocket_manager = WebSocketManager()
+    websocket_manager = WebSocketManager(settings)
     await websocket_manager.initialize()
     logger.info("WebSocket manager initialized")
     
@@ -142,6 +148,17 @@ async def shutdown_components():
             await twilio_adapter.cleanup()
             logger.info("Twilio adapter cleaned up")
         
+        await close_database()
+        logger.info("Database connections closed")
+        
+        if phi_protector:
+            await phi_protector.cleanup()
+            logger.info("PHI protector cleaned up")
+        
+        if security_manager:
+            await security_manager.cleanup()
+            logger.info("Security manager cleaned up")
+        
         logger.info("All components cleaned up successfully")
         
     except Exception as e:
@@ -196,7 +213,7 @@ def configure_middleware(app: FastAPI, settings: Settings):
     # Request logging and metrics middleware
     @app.middleware("http")
     async def logging_and_metrics(request: Request, call_next):
-        start_time = datetime.utcnow()
+        start_time = time.perf_counter()
         request_id = security_manager.generate_request_id() if security_manager else "unknown"
         
         # Add request ID to context
@@ -205,14 +222,14 @@ def configure_middleware(app: FastAPI, settings: Settings):
         try:
             # Rate limiting check
             client_ip = request.client.host if request.client else "unknown"
-            if security_manager and not security_manager.check_rate_limit(client_ip):
+            if security_manager and not await security_manager.check_rate_limit(client_ip):
                 raise HTTPException(status_code=429, detail="Rate limit exceeded")
             
             # Process request
             response = await call_next(request)
             
             # Calculate response time
-            response_time = (datetime.utcnow() - start_time).total_seconds() * 1000
+            response_time = (time.perf_counter() - start_time) * 1000
             
             # Log request
             logger.info(
@@ -236,7 +253,7 @@ def configure_middleware(app: FastAPI, settings: Settings):
             return response
             
         except Exception as e:
-            response_time = (datetime.utcnow() - start_time).total_seconds() * 1000
+            response_time = (time.perf_counter() - start_time) * 1000
             
             logger.error(
                 "HTTP request failed",
@@ -364,6 +381,7 @@ def run_development_server():
         host=settings.server_host,
         port=settings.server_port,
         reload=settings.development_mode,
+        loop="uvloop" if uvloop else "asyncio",
         log_level="info" if settings.development_mode else "warning",
         access_log=settings.development_mode
     )
@@ -382,6 +400,8 @@ def get_production_config() -> Dict[str, Any]:
         "worker_connections": 1000,
         "max_requests": 1000,
         "max_requests_jitter": 100,
+        # Settings are built while importing the app, so preloading in the
+        # master lets workers share them (and the interned strings) via CoW
         "preload_app": True,
         "keepalive": 5,
         "timeout": 30,
@@ -12,8 +12,7 @@ from langchain.memory import ConversationBufferMemory
 from langchain.prompts import PromptTemplate
 
 from utils.config import Settings
-from retrieval.vector_store import VectorStore
-from retrieval.document_processor import DocumentProcessor
+from retrieval.vector_store import VectorStore, DocumentProcessor
 
 logger = structlog.get_logger(__name__)
 
@@ -50,7 +49,7 @@ class AIEngine:
                 self.vector_store = VectorStore(self.settings)
                 await self.vector_store.initialize()
                 
-                self.document_processor = DocumentProcessor(self.settings)
+                self.document_processor = DocumentProcessor(self.settings, self.vector_store)
                 await self.document_processor.initialize()
                 
                 # Initialize conversational retrieval chain
@@ -121,6 +120,18 @@ class AIEngine:
             # Return fallback response
             return self._get_fallback_response(conversation.language)
     
+    async def add_knowledge_document(
+        self,
+        text: str,
+        metadata: Dict[str, Any]
+    ) -> List[str]:
+        """Add a knowledge base document to the RAG index; returns the stored chunk IDs."""
+        if not self.document_processor:
+            logger.warning("RAG disabled, knowledge document not added")
+            return []
+        
+        return await self.document_processor.add_text_document(text, metadata)
+    
     async def health_check(self) -> bool:
         """Health check for AI engine."""
         try:
@@ -4,19 +4,112 @@ Manages escalation to human agents, Mattermost integration, and CSR workflows
 """
 
 import asyncio
+import bisect
+import re
+import time
 import uuid
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Any, Coroutine, Dict, List, Optional, Set, Tuple
 from enum import Enum
 
 import structlog
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from utils.config import Settings
 from adapters.mattermost_adapter import MattermostAdapter
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 logger = structlog.get_logger(__name__)
 
+# Escalation categories and their keywords, in match-priority order
+ESCALATION_CATEGORIES: Dict[str, List[str]] = {
+    "billing": ["billing", "payment", "insurance", "cost"],
+    "clinical": ["medical", "doctor", "diagnosis", "treatment"],
+    "pharmacy": ["prescription", "medication", "drug", "pharmacy"],
+    "technical": ["not working", "error", "bug", "broken"],
+    "complaint": ["complaint", "frustrated", "angry", "dissatisfied"]
+}
+
+_CATEGORY_NAMES = list(ESCALATION_CATEGORIES)
+_KEYWORD_CATEGORY_RANK = {
+    keyword: rank
+    for rank, keywords in enumerate(ESCALATION_CATEGORIES.values())
+    for keyword in keywords
+}
+
+# Single-pass keyword scanners: Aho-Corasick when available, else a regex alternation
+if ahocorasick is not None:
+    _CATEGORY_AUTOMATON = ahocorasick.Automaton()
+    for _keyword, _rank in _KEYWORD_CATEGORY_RANK.items():
+        _CATEGORY_AUTOMATON.add_word(_keyword, _rank)
+    _CATEGORY_AUTOMATON.make_automaton()
+else:
+    _CATEGORY_AUTOMATON = None
+
+_CATEGORY_PATTERN = re.compile(
+    "|".join(
+        re.escape(keyword)
+        for keyword in sorted(_KEYWORD_CATEGORY_RANK, key=len, reverse=True)
+    )
+)
+
+# Seconds a cached Mattermost presence lookup is reused before polling again
+PRESENCE_CACHE_TTL_SECONDS = 45
+
+# Mattermost notification templates (rendered with str.format_map)
+_ESCALATION_TEMPLATE = """
+🚨 **New Escalation Ticket**
+- **ID**: {ticket_ref}
+- **Priority**: {priority}
+- **Category**: {category}
+- **Channel**: {channel}
+- **Language**: {language}
+- **Reason**: {reason}
+- **Queue Position**: #{queue_position}
+
+**Patient Context**:
+- Previous conversations: {total_conversations}
+- Satisfaction score: {satisfaction}
+
+To assign: `/assign {ticket_ref} @agent`
+"""
+
+_ASSIGNMENT_TEMPLATE = """
+👋 **New Conversation Assigned**
+- **Ticket**: {ticket_ref}
+- **Priority**: {priority}
+- **Channel**: {channel}
+- **Wait time**: {wait_minutes:.1f} minutes
+
+**Summary**: {topic}
+**Urgency**: {urgency}
+
+Click to join conversation: [Link](conversation/{conversation_id})
+"""
+
+_TIMEOUT_TEMPLATE = """
+⏰ **Escalation Timeout**
+- **Ticket**: {ticket_ref}
+- **Priority upgraded to**: {priority}
+- **Wait time**: {wait_minutes:.1f} minutes
+
+Immediate attention required!
+"""
+
+_SLA_BREACH_TEMPLATE = """
+🚨 **SLA BREACH ALERT**
+- **Ticket**: {ticket_ref}
+- **Breach Type**: {breach_type}
+- **Priority**: {priority}
+- **Time elapsed**: {elapsed_minutes:.1f} minutes
+
+URGENT ACTION REQUIRED!
+"""
+
 
 class EscalationPriority(str, Enum):
     """Escalation priority levels."""
@@ -26,6 +119,15 @@ class EscalationPriority(str, Enum):
     URGENT = "urgent"
 
 
+# Queue rank per priority (lower ranks are served first)
+_PRIORITY_RANK: Dict[EscalationPriority, int] = {
+    EscalationPriority.URGENT: 0,
+    EscalationPriority.HIGH: 1,
+    EscalationPriority.NORMAL: 2,
+    EscalationPriority.LOW: 3
+}
+
+
 class AgentStatus(str, Enum):
     """Agent availability status."""
     AVAILABLE = "available"
@@ -61,7 +163,9 @@ class EscalationTicket(BaseModel):
     resolved_at: Optional[datetime] = None
     
     # SLA tracking
+    created_at_mono: float = Field(default_factory=time.monotonic)
     response_sla_minutes: int = 15  # Default 15 minutes
+    response_deadline_mono: float = 0.0  # created_at_mono + response SLA
     resolution_sla_minutes: int = 60  # Default 1 hour
     
     # Status tracking
@@ -109,10 +213,23 @@ class EscalationManager:
         
         # Active escalation tracking
         self.escalation_queue: List[EscalationTicket] = []
+        # Sort keys parallel to escalation_queue, packed as (rank << 32) | sequence
+        self._queue_keys: List[int] = []
+        self._queue_seq = 0
         self.active_tickets: Dict[str, EscalationTicket] = {}
         self.agents: Dict[str, Agent] = {}
         
+        # Ticket ids currently assigned to each agent
+        self._tickets_by_agent: Dict[str, Set[str]] = {}
+        
+        # Mattermost presence cache: user id -> (monotonic fetch time, status)
+        self._presence_cache: Dict[str, Tuple[float, str]] = {}
+        
+        # Background tasks and in-flight notifications
+        self._background_tasks: Set[asyncio.Task] = set()
+        
         # Queue management
+        self._queue_event = asyncio.Event()
         self.max_queue_size = 100
         self.auto_escalation_enabled = settings.auto_escalation_enabled
         
@@ -130,9 +247,9 @@ class EscalationManager:
             await self._load_agents()
             
             # Start background tasks
-            asyncio.create_task(self._monitor_agent_presence())
-            asyncio.create_task(self._process_escalation_queue())
-            asyncio.create_task(self._monitor_sla_breaches())
+            self._create_background_task(self._monitor_agent_presence())
+            self._create_background_task(self._process_escalation_queue())
+            self._create_background_task(self._monitor_sla_breaches())
             
             logger.info("Escalation manager initialized successfully")
             
@@ -165,7 +282,7 @@ class EscalationManager:
             )
             
             # Set SLA based on priority
-            ticket.response_sla_minutes = self._get_response_sla(ticket.priority)
+            self._set_response_sla(ticket)
             ticket.resolution_sla_minutes = self._get_resolution_sla(ticket.priority)
             
             # Try immediate assignment for urgent cases
@@ -175,12 +292,19 @@ class EscalationManager:
                     await self._assign_ticket_to_agent(ticket, agent)
                     return True
             
-            # Add to escalation queue
-            await self._add_to_queue(ticket)
+            # Add to escalation queue; when it is full a lower-priority request is turned away
+            if await self._add_to_queue(ticket) is ticket:
+                logger.warning(
+                    "Agent request rejected, escalation queue full",
+                    conversation_id=conversation.id,
+                    ticket_id=ticket.id,
+                    priority=priority
+                )
+                return False
             
             # Notify Mattermost
             if self.mattermost:
-                await self._notify_escalation_team(ticket)
+                self._create_background_task(self._notify_escalation_team(ticket))
             
             logger.info(
                 "Agent requested",
@@ -228,6 +352,7 @@ class EscalationManager:
                     language=conversation.language,
                     created_at=datetime.utcnow()
                 )
+                self._set_response_sla(ticket)
             
             # Find agent
             agent = self.agents.get(agent_id)
@@ -272,13 +397,10 @@ class EscalationManager:
                 return
             
             # Escalate priority
-            if ticket.priority == EscalationPriority.NORMAL:
-                ticket.priority = EscalationPriority.HIGH
-            elif ticket.priority == EscalationPriority.HIGH:
-                ticket.priority = EscalationPriority.URGENT
+            self._raise_priority(ticket)
             
             # Update SLA
-            ticket.response_sla_minutes = self._get_response_sla(ticket.priority)
+            self._set_response_sla(ticket)
             
             # Try reassignment
             if not ticket.assigned_agent_id:
@@ -288,7 +410,7 @@ class EscalationManager:
             
             # Notify escalation team
             if self.mattermost:
-                await self._notify_escalation_timeout(ticket)
+                self._create_background_task(self._notify_escalation_timeout(ticket))
             
             logger.warning(
                 "Escalation timeout handled",
@@ -323,6 +445,10 @@ class EscalationManager:
             if status == AgentStatus.OFFLINE and old_status != AgentStatus.OFFLINE:
                 await self._reassign_agent_tickets(agent_id)
             
+            # Wake the queue processor when new capacity appears
+            if status == AgentStatus.AVAILABLE and old_status != AgentStatus.AVAILABLE:
+                self._queue_event.set()
+            
             logger.info(
                 "Agent status updated",
                 agent_id=agent_id,
@@ -376,6 +502,13 @@ class EscalationManager:
     
     # Private methods
     
+    def _create_background_task(self, coro: Coroutine) -> asyncio.Task:
+        """Start a task and hold a reference to it until it finishes."""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+    
     async def _load_agents(self) -> None:
         """Load agent information."""
         # In production, load from database
@@ -454,6 +587,10 @@ class EscalationManager:
         agent: Agent
     ) -> None:
         """Assign ticket to agent."""
+        # Drop ticket from a previous agent's index on manual reassignment
+        if ticket.assigned_agent_id and ticket.assigned_agent_id != agent.id:
+            self._tickets_by_agent.get(ticket.assigned_agent_id, set()).discard(ticket.id)
+        
         # Update ticket
         ticket.assigned_agent_id = agent.id
         ticket.assigned_at = datetime.utcnow()
@@ -462,19 +599,21 @@ class EscalationManager:
         # Update agent
         agent.current_load += 1
         agent.active_conversations.append(ticket.conversation_id)
+        self._tickets_by_agent.setdefault(agent.id, set()).add(ticket.id)
         
         # Add to active tickets
         self.active_tickets[ticket.id] = ticket
         
         # Remove from queue if present
-        self.escalation_queue = [
-            t for t in self.escalation_queue 
-            if t.id != ticket.id
-        ]
+        for i, queued_ticket in enumerate(self.escalation_queue):
+            if queued_ticket.id == ticket.id:
+                del self.escalation_queue[i]
+                del self._queue_keys[i]
+                break
         
         # Notify agent via Mattermost
         if self.mattermost:
-            await self._notify_agent_assignment(ticket, agent)
+            self._create_background_task(self._notify_agent_assignment(ticket, agent))
         
         logger.info(
             "Ticket assigned to agent",
@@ -483,31 +622,33 @@ class EscalationManager:
             conversation_id=ticket.conversation_id
         )
     
-    async def _add_to_queue(self, ticket: EscalationTicket) -> None:
-        """Add ticket to escalation queue."""
-        if len(self.escalation_queue) >= self.max_queue_size:
-            logger.warning("Escalation queue full, dropping oldest ticket")
-            self.escalation_queue.pop(0)
-        
-        # Insert based on priority
-        priority_order = {
-            EscalationPriority.URGENT: 0,
-            EscalationPriority.HIGH: 1,
-            EscalationPriority.NORMAL: 2,
-            EscalationPriority.LOW: 3
-        }
+    async def _add_to_queue(self, ticket: EscalationTicket) -> Optional[EscalationTicket]:
+        """Add ticket to escalation queue; returns the ticket dropped to make room, if any."""
+        self._insert_into_queue(ticket, self._queue_seq)
+        self._queue_seq = (self._queue_seq + 1) & 0xFFFFFFFF
+        
+        # Over capacity, drop the tail: the lowest-priority, most recent ticket,
+        # which may be the one just added
+        dropped = None
+        if len(self.escalation_queue) > self.max_queue_size:
+            dropped = self.escalation_queue.pop()
+            self._queue_keys.pop()
+            dropped.queue_position = None
+            # A re-queued ticket must not linger in active_tickets as pending
+            self.active_tickets.pop(dropped.id, None)
+            logger.warning(
+                "Escalation queue full, dropping lowest-priority ticket",
+                ticket_id=dropped.id,
+                priority=dropped.priority
+            )
         
-        insert_index = len(self.escalation_queue)
-        for i, queued_ticket in enumerate(self.escalation_queue):
-            if priority_order[ticket.priority] < priority_order[queued_ticket.priority]:
-                insert_index = i
-                break
+        self._renumber_queue()
         
-        self.escalation_queue.insert(insert_index, ticket)
+        if dropped is ticket:
+            return dropped
         
-        # Update queue positions
-        for i, queued_ticket in enumerate(self.escalation_queue):
-            queued_ticket.queue_position = i + 1
+        # Wake the queue processor
+        self._queue_event.set()
         
         logger.info(
             "Ticket added to queue",
@@ -515,50 +656,55 @@ class EscalationManager:
             position=ticket.queue_position,
             queue_size=len(self.escalation_queue)
         )
+        return dropped
     
     async def _process_escalation_queue(self) -> None:
         """Background task to process escalation queue."""
         while True:
             try:
-                if not self.escalation_queue:
-                    await asyncio.sleep(30)
-                    continue
+                # Sleep until a ticket is queued or an agent becomes available
+                await self._queue_event.wait()
+                self._queue_event.clear()
                 
-                # Process tickets in queue
-                for ticket in self.escalation_queue[:]:
+                # Process tickets in queue; assignment removes the ticket in place
+                index = 0
+                while index < len(self.escalation_queue):
+                    ticket = self.escalation_queue[index]
                     agent = await self._find_available_agent(ticket)
                     if agent:
                         await self._assign_ticket_to_agent(ticket, agent)
-                
-                await asyncio.sleep(15)  # Check every 15 seconds
+                    else:
+                        index += 1
                 
             except Exception as e:
                 logger.error("Error in escalation queue processing", error=str(e))
                 await asyncio.sleep(60)
+                self._queue_event.set()  # Retry the remaining tickets
     
     async def _monitor_agent_presence(self) -> None:
         """Monitor agent presence and update status."""
+        # Map Mattermost status to agent status
+        status_mapping = {
+            "online": AgentStatus.AVAILABLE,
+            "busy": AgentStatus.BUSY,
+            "away": AgentStatus.AWAY,
+            "offline": AgentStatus.OFFLINE
+        }
+        
         while True:
             try:
                 if self.mattermost:
-                    # Get agent presence from Mattermost
+                    presence = await self._get_agent_presence()
+                    
                     for agent in self.agents.values():
-                        if agent.mattermost_user_id:
-                            presence = await self.mattermost.get_user_status(
-                                agent.mattermost_user_id
-                            )
-                            
-                            # Map Mattermost status to agent status
-                            status_mapping = {
-                                "online": AgentStatus.AVAILABLE,
-                                "busy": AgentStatus.BUSY,
-                                "away": AgentStatus.AWAY,
-                                "offline": AgentStatus.OFFLINE
-                            }
-                            
-                            new_status = status_mapping.get(presence, AgentStatus.OFFLINE)
-                            if new_status != agent.status:
-                                await self.update_agent_status(agent.id, new_status)
+                        if agent.mattermost_user_id not in presence:
+                            continue
+                        
+                        new_status = status_mapping.get(
+                            presence[agent.mattermost_user_id], AgentStatus.OFFLINE
+                        )
+                        if new_status != agent.status:
+                            await self.update_agent_status(agent.id, new_status)
                 
                 await asyncio.sleep(60)  # Check every minute
                 
@@ -566,19 +712,44 @@ class EscalationManager:
                 logger.error("Error in agent presence monitoring", error=str(e))
                 await asyncio.sleep(120)
     
+    async def _get_agent_presence(self) -> Dict[str, str]:
+        """Get Mattermost presence for all agents, polling only stale cache entries."""
+        now = time.monotonic()
+        user_ids = [
+            agent.mattermost_user_id for agent in self.agents.values()
+            if agent.mattermost_user_id
+        ]
+        stale_ids = [
+            user_id for user_id in user_ids
+            if now - self._presence_cache.get(user_id, (float("-inf"), ""))[0]
+            >= PRESENCE_CACHE_TTL_SECONDS
+        ]
+        
+        if stale_ids:
+            try:
+                statuses = await self.mattermost.get_users_status(stale_ids)
+                for user_id, status in statuses.items():
+                    self._presence_cache[user_id] = (now, status)
+            except Exception as e:
+                # Keep serving the last known statuses until the next poll
+                logger.warning("Failed to refresh agent presence", error=str(e))
+        
+        return {
+            user_id: self._presence_cache[user_id][1]
+            for user_id in user_ids
+            if user_id in self._presence_cache
+        }
+    
     async def _monitor_sla_breaches(self) -> None:
         """Monitor and handle SLA breaches."""
         while True:
             try:
-                current_time = datetime.utcnow()
+                now_mono = time.monotonic()
                 
                 for ticket in list(self.active_tickets.values()) + self.escalation_queue:
                     # Check response SLA
-                    if not ticket.first_response_at:
-                        wait_time = (current_time - ticket.created_at).total_seconds() / 60
-                        
-                        if wait_time > ticket.response_sla_minutes:
-                            await self._handle_sla_breach(ticket, "response")
+                    if not ticket.first_response_at and now_mono >= ticket.response_deadline_mono:
+                        await self._handle_sla_breach(ticket, "response")
                 
                 await asyncio.sleep(60)  # Check every minute
                 
@@ -600,32 +771,71 @@ class EscalationManager:
         )
         
         # Escalate priority if possible
+        self._raise_priority(ticket)
+        self._set_response_sla(ticket)
+        
+        # Notify management
+        if self.mattermost:
+            self._create_background_task(self._notify_sla_breach(ticket, breach_type))
+    
+    def _insert_into_queue(self, ticket: EscalationTicket, seq: int) -> None:
+        """Insert a ticket by priority, after queued tickets of the same rank that arrived earlier."""
+        # Packing rank and arrival order into one int keeps every comparison a single int compare
+        key = (_PRIORITY_RANK[ticket.priority] << 32) | seq
+        insert_index = bisect.bisect_right(self._queue_keys, key)
+        
+        self.escalation_queue.insert(insert_index, ticket)
+        self._queue_keys.insert(insert_index, key)
+    
+    def _renumber_queue(self) -> None:
+        """Update queue positions."""
+        for i, queued_ticket in enumerate(self.escalation_queue):
+            queued_ticket.queue_position = i + 1
+    
+    def _raise_priority(self, ticket: EscalationTicket) -> None:
+        """Move a ticket up one priority level, re-keying it if it is queued."""
         if ticket.priority == EscalationPriority.NORMAL:
             ticket.priority = EscalationPriority.HIGH
         elif ticket.priority == EscalationPriority.HIGH:
             ticket.priority = EscalationPriority.URGENT
+        else:
+            return
         
-        # Notify management
-        if self.mattermost:
-            await self._notify_sla_breach(ticket, breach_type)
+        # Reinsert under the new rank, keeping the ticket's original arrival order
+        for i, queued_ticket in enumerate(self.escalation_queue):
+            if queued_ticket.id == ticket.id:
+                seq = self._queue_keys[i] & 0xFFFFFFFF
+                del self.escalation_queue[i]
+                del self._queue_keys[i]
+                self._insert_into_queue(ticket, seq)
+                self._renumber_queue()
+                break
     
     def _categorize_escalation(self, reason: str) -> str:
         """Categorize escalation reason."""
-        categories = {
-            "billing": ["billing", "payment", "insurance", "cost"],
-            "clinical": ["medical", "doctor", "diagnosis", "treatment"],
-            "pharmacy": ["prescription", "medication", "drug", "pharmacy"],
-            "technical": ["not working", "error", "bug", "broken"],
-            "complaint": ["complaint", "frustrated", "angry", "dissatisfied"]
-        }
-        
         reason_lower = reason.lower()
         
-        for category, keywords in categories.items():
-            if any(keyword in reason_lower for keyword in keywords):
-                return category
+        # Earliest category wins when keywords from several categories match
+        if _CATEGORY_AUTOMATON is not None:
+            ranks = (rank for _, rank in _CATEGORY_AUTOMATON.iter(reason_lower))
+        else:
+            ranks = (
+                _KEYWORD_CATEGORY_RANK[match.group(0)]
+                for match in _CATEGORY_PATTERN.finditer(reason_lower)
+            )
+        
+        rank = min(ranks, default=None)
+        if rank is None:
+            return "general"
         
-        return "general"
+        return _CATEGORY_NAMES[rank]
+    
+    def _set_response_sla(self, ticket: EscalationTicket) -> None:
+        """Set response SLA and its monotonic deadline from ticket priority."""
+        ticket.response_sla_minutes = self._get_response_sla(ticket.priority)
+        ticket.response_deadline_mono = (
+            ticket.created_at_mono + ticket.response_sla_minutes * 60
+        )
     
     def _get_response_sla(self, priority: EscalationPriority) -> int:
         """Get response SLA minutes based on priority."""
@@ -665,18 +875,19 @@ class EscalationManager:
             return
         
         # Find tickets assigned to this agent
-        agent_tickets = [
-            ticket for ticket in self.active_tickets.values()
-            if ticket.assigned_agent_id == agent_id
-        ]
+        agent_ticket_ids = self._tickets_by_agent.pop(agent_id, set())
         
-        for ticket in agent_tickets:
+        for ticket_id in agent_ticket_ids:
+            ticket = self.active_tickets.get(ticket_id)
+            if not ticket:
+                continue
+            
             # Unassign from agent
             ticket.assigned_agent_id = None
             ticket.assigned_at = None
             ticket.status = "pending"
             
-            # Add back to queue
+            # Add back to queue; if a full queue drops it, it leaves active_tickets too
             await self._add_to_queue(ticket)
         
         # Update agent workload
@@ -686,7 +897,7 @@ class EscalationManager:
         logger.info(
             "Reassigned agent tickets",
             agent_id=agent_id,
-            tickets_reassigned=len(agent_tickets)
+            tickets_reassigned=len(agent_ticket_ids)
         )
     
     # Mattermost notification methods
@@ -696,25 +907,20 @@ class EscalationManager:
         if not self.mattermost:
             return
         
-        message = f"""
-🚨 **New Escalation Ticket**
-- **ID**: {ticket.id[:8]}
-- **Priority**: {ticket.priority.upper()}
-- **Category**: {ticket.category}
-- **Channel**: {ticket.channel}
-- **Language**: {ticket.language}
-- **Reason**: {ticket.reason}
-- **Queue Position**: #{ticket.queue_position}
-
-**Patient Context**:
-- Previous conversations: {ticket.user_context.get('total_conversations', 0)}
-- Satisfaction score: {ticket.user_context.get('satisfaction_scores', [])[-1:]}
-
-To assign: `/assign {ticket.id[:8]} @agent`
-        """
+        message = _ESCALATION_TEMPLATE.format_map({
+            "ticket_ref": ticket.id[:8],
+            "priority": ticket.priority.upper(),
+            "category": ticket.category,
+            "channel": ticket.channel,
+            "language": ticket.language,
+            "reason": ticket.reason,
+            "queue_position": ticket.queue_position,
+            "total_conversations": ticket.user_context.get('total_conversations', 0),
+            "satisfaction": ticket.user_context.get('satisfaction_scores', [])[-1:]
+        })
         
         await self.mattermost.send_message(
-            self.settings.mattermost_escalation_channel,
+            self.settings.mattermost.escalation_channel,
             message
         )
     
@@ -724,45 +930,38 @@ To assign: `/assign {ticket.id[:8]} @agent`
         agent: Agent
     ) -> None:
         """Notify agent about ticket assignment."""
-        if not self.mattermost:
+        if not self.mattermost or not agent.mattermost_user_id:
             return
         
-        message = f"""
-👋 **New Conversation Assigned**
-- **Ticket**: {ticket.id[:8]}
-- **Priority**: {ticket.priority.upper()}
-- **Channel**: {ticket.channel}
-- **Wait time**: {(datetime.utcnow() - ticket.created_at).total_seconds() / 60:.1f} minutes
-
-**Summary**: {ticket.conversation_summary.get('current_topic', 'General inquiry')}
-**Urgency**: {ticket.conversation_summary.get('urgency_level', 'normal')}
-
-Click to join conversation: [Link](conversation/{ticket.conversation_id})
-        """
+        message = _ASSIGNMENT_TEMPLATE.format_map({
+            "ticket_ref": ticket.id[:8],
+            "priority": ticket.priority.upper(),
+            "channel": ticket.channel,
+            "wait_minutes": (datetime.utcnow() - ticket.created_at).total_seconds() / 60,
+            "topic": ticket.conversation_summary.get('current_topic', 'General inquiry'),
+            "urgency": ticket.conversation_summary.get('urgency_level', 'normal'),
+            "conversation_id": ticket.conversation_id
+        })
         
         # Send direct message to agent
-        if agent.mattermost_user_id:
-            await self.mattermost.send_direct_message(
-                agent.mattermost_user_id,
-                message
-            )
+        await self.mattermost.send_direct_message(
+            agent.mattermost_user_id,
+            message
+        )
     
     async def _notify_escalation_timeout(self, ticket: EscalationTicket) -> None:
         """Notify about escalation timeout."""
         if not self.mattermost:
             return
         
-        message = f"""
-⏰ **Escalation Timeout**
-- **Ticket**: {ticket.id[:8]}
-- **Priority upgraded to**: {ticket.priority.upper()}
-- **Wait time**: {(datetime.utcnow() - ticket.created_at).total_seconds() / 60:.1f} minutes
-
-Immediate attention required!
-        """
+        message = _TIMEOUT_TEMPLATE.format_map({
+            "ticket_ref": ticket.id[:8],
+            "priority": ticket.priority.upper(),
+            "wait_minutes": (datetime.utcnow() - ticket.created_at).total_seconds() / 60
+        })
         
         await self.mattermost.send_message(
-            self.settings.mattermost_escalation_channel,
+            self.settings.mattermost.escalation_channel,
             message
         )
     
@@ -775,18 +974,15 @@ Immediate attention required!
         if not self.mattermost:
             return
         
-        message = f"""
-🚨 **SLA BREACH ALERT**
-- **Ticket**: {ticket.id[:8]}
-- **Breach Type**: {breach_type.upper()}
-- **Priority**: {ticket.priority.upper()}
-- **Time elapsed**: {(datetime.utcnow() - ticket.created_at).total_seconds() / 60:.1f} minutes
-
-URGENT ACTION REQUIRED!
-        """
+        message = _SLA_BREACH_TEMPLATE.format_map({
+            "ticket_ref": ticket.id[:8],
+            "breach_type": breach_type.upper(),
+            "priority": ticket.priority.upper(),
+            "elapsed_minutes": (datetime.utcnow() - ticket.created_at).total_seconds() / 60
+        })
         
         await self.mattermost.send_message(
-            self.settings.mattermost_csr_ops_channel,
+            self.settings.mattermost.csr_ops_channel,
             message
         )
     
@@ -794,6 +990,11 @@ URGENT ACTION REQUIRED!
         """Cleanup escalation manager resources."""
         logger.info("Cleaning up escalation manager...")
         
+        # Stop background tasks
+        for task in self._background_tasks:
+            task.cancel()
+        await asyncio.gather(*self._background_tasks, return_exceptions=True)
+        
         if self.mattermost:
             await self.mattermost.cleanup()
         
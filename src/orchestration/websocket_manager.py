@@ -4,32 +4,129 @@ Handles WebSocket connections, real-time messaging, and agent handoffs
 """
 
 import asyncio
+import functools
 import json
 import uuid
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, List, Optional, Any, Set
+from typing import Dict, List, Optional, Any, Sequence, Set, Tuple, Union
 
 import structlog
 from fastapi import WebSocket, WebSocketDisconnect
-from pydantic import BaseModel
 
 from utils.config import Settings
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
 logger = structlog.get_logger(__name__)
 
+# Outbound messages buffered per connection before it is treated as too slow
+OUTBOUND_QUEUE_SIZE = 256
+
+# Most queued messages a writer coalesces into one "batch" frame (batching clients only)
+WRITER_BATCH_SIZE = 32
+
+# Close code sent to a client dropped for not keeping up with its messages (Try Again Later)
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+# Broadcasts larger than this are sent in batches, yielding to the loop between them
+BROADCAST_BATCH_SIZE = 50
+
+# Window over which typing_start/typing_stop bursts are coalesced per user
+TYPING_DEBOUNCE_SECONDS = 0.2
+
+# Subprotocol clients can request to receive MessagePack binary frames
+MSGPACK_SUBPROTOCOL = "medinovai-msgpack"
+
+# Subprotocol clients can request to receive JSON text frames with queued messages
+# coalesced into {"type":"batch","items":[...]}; other JSON clients get one message per frame
+BATCH_SUBPROTOCOL = "medinovai-batch"
+
+
+def _json_default(value: Any) -> Any:
+    """Encode types the stdlib JSON encoder does not support natively."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+# Fall back to compact ujson/stdlib encoding when orjson is unavailable; every
+# backend shares _json_default, so e.g. Decimal or UUID values encode the same
+if orjson is not None:
+    def _dumps(message: Dict[str, Any]) -> str:
+        """Serialize an outbound message to JSON text (datetimes as ISO 8601)."""
+        return orjson.dumps(message, default=_json_default).decode()
+elif ujson is not None:
+    _dumps = functools.partial(ujson.dumps, default=_json_default)
+else:
+    _dumps = functools.partial(json.dumps, separators=(",", ":"), default=_json_default)
+
+
+# Redis pub/sub channel every shard listens on; a conversation's or agent's sockets can sit on
+# any worker, so each shard delivers a relayed message to whichever of its local connections match
+RELAY_CHANNEL = "medinovai:ws:relay"
+
+# Pause before the relay listener resubscribes after a Redis failure
+RELAY_RETRY_SECONDS = 1.0
+
+
+# Fixed JSON prefixes for frequent notifications; only the dynamic tail is encoded
+_CONNECTION_ESTABLISHED_PREFIX = '{"type":"connection_established","connection_id":'
+_AGENT_AVAILABLE_PREFIX = '{"type":"agent_available","agent":'
+_AGENT_JOINED_PREFIX = '{"type":"agent_joined","agent":'
+_TRANSFERRED_FROM_AI_PREFIX = '{"type":"conversation_transferred","from_ai":true'
+_TRANSFERRED_FROM_AGENT_PREFIX = '{"type":"conversation_transferred","from_ai":false'
+
+
+def _timestamp_suffix(timestamp: datetime) -> str:
+    """Closing JSON fragment carrying a message timestamp."""
+    return ',"timestamp":"' + timestamp.isoformat() + '"}'
+
+
+def _msgpack_default(value: Any) -> Any:
+    """Encode types MessagePack does not support natively."""
+    # Same fallback as the JSON encoders, so e.g. Decimal or UUID values reach msgpack clients too
+    return _json_default(value)
+
+
+def _encode(message: Dict[str, Any], codec: str) -> Union[str, bytes]:
+    """Serialize an outbound message for the given connection codec."""
+    if codec == "msgpack":
+        return msgpack.packb(message, use_bin_type=True, default=_msgpack_default)
+    return _dumps(message)
 
-class ConnectionInfo(BaseModel):
+
+@dataclass(slots=True)
+class ConnectionInfo:
     """WebSocket connection information."""
     connection_id: str
+    connected_at: datetime
+    last_activity: float  # Event loop time (monotonic seconds)
     user_id: Optional[str] = None
     conversation_id: Optional[str] = None
     channel: str = "web"
     agent_id: Optional[str] = None
-    connected_at: datetime
-    last_activity: datetime
-    
-    class Config:
-        arbitrary_types_allowed = True
+    codec: str = "json"  # "json" text frames or "msgpack" binary frames
+    batch_frames: bool = False  # JSON messages may be coalesced into "batch" frames
 
 
 class WebSocketManager:
@@ -38,24 +135,69 @@ class WebSocketManager:
     Handles patient-AI chat and agent handoffs.
     """
     
-    def __init__(self):
+    def __init__(self, settings: Optional[Settings] = None):
+        self.settings = settings
+        
+        # Sharding across worker processes (1 shard = no cross-process relay); the id is
+        # generated per process so every uvicorn worker is its own shard
+        self.shard_count = settings.websocket_shard_count if settings else 1
+        self.shard_id = uuid.uuid4().hex
+        self.redis = None
+        self._relay_task: Optional[asyncio.Task] = None
+        self._cleanup_task: Optional[asyncio.Task] = None
+        
         # Active WebSocket connections
         self.connections: Dict[str, WebSocket] = {}
-        self.connection_info: Dict[str, ConnectionInfo] = {}
+        # Kept in last-activity order: active connections move to the end
+        self.connection_info: "OrderedDict[str, ConnectionInfo]" = OrderedDict()
         
-        # Conversation to connection mapping
+        # Conversation to connection mapping, and its reverse index
         self.conversation_connections: Dict[str, Set[str]] = {}
+        self.connection_conversations: Dict[str, Set[str]] = {}
         
         # Agent connections
         self.agent_connections: Dict[str, Set[str]] = {}
         
+        # Outbound queues and their writer tasks
+        self.send_queues: Dict[str, asyncio.Queue] = {}
+        self.writer_tasks: Dict[str, asyncio.Task] = {}
+        
+        # Debounced typing indicators keyed by (conversation_id, sender):
+        # pending (is_typing, connection_id, flush timer), and senders last
+        # broadcast as typing with the connection that sent it
+        self.typing_state: Dict[
+            Tuple[str, str], Tuple[bool, str, asyncio.TimerHandle]
+        ] = {}
+        self.typing_active: Dict[Tuple[str, str], str] = {}
+        self._typing_tasks: Set[asyncio.Task] = set()
+        
+        # Close handshakes for dropped slow connections, run off the sending path
+        self._close_tasks: Set[asyncio.Task] = set()
+        
         logger.info("WebSocket manager initialized")
     
     async def initialize(self) -> None:
         """Initialize WebSocket manager."""
         # Start background cleanup task
-        asyncio.create_task(self._cleanup_stale_connections())
-        logger.info("WebSocket manager background tasks started")
+        self._cleanup_task = asyncio.create_task(self._cleanup_stale_connections())
+        
+        # Receive messages relayed from other shards
+        if self.shard_count > 1:
+            if aioredis is None:
+                logger.warning("redis package not installed, WebSocket sharding disabled")
+            else:
+                self.redis = aioredis.from_url(self.settings.redis_url)
+                self._relay_task = asyncio.create_task(self._relay_listener())
+                logger.info(
+                    "WebSocket shard relay started",
+                    shard_id=self.shard_id,
+                    shard_count=self.shard_count
+                )
+        
+        logger.info(
+            "WebSocket manager background tasks started",
+            event_loop=type(asyncio.get_running_loop()).__module__
+        )
     
     async def connect(
         self,
@@ -65,22 +207,66 @@ class WebSocketManager:
         agent_id: Optional[str] = None
     ) -> str:
         """Accept and register new WebSocket connection."""
-        await websocket.accept()
-        
-        connection_id = str(uuid.uuid4())
-        
-        # Store connection
-        self.connections[connection_id] = websocket
-        
-        # Create connection info
+        # Negotiate MessagePack framing for clients that request it
+        requested_protocols = [
+            protocol.strip()
+            for protocol in websocket.headers.get("sec-websocket-protocol", "").split(",")
+        ]
+        use_msgpack = msgpack is not None and MSGPACK_SUBPROTOCOL in requested_protocols
+        codec = "msgpack" if use_msgpack else "json"
+        
+        # Batched JSON frames are opt-in; a client gets them only by asking
+        batch_frames = not use_msgpack and BATCH_SUBPROTOCOL in requested_protocols
+        if use_msgpack:
+            subprotocol = MSGPACK_SUBPROTOCOL
+        elif batch_frames:
+            subprotocol = BATCH_SUBPROTOCOL
+        else:
+            subprotocol = None
+        
+        # Build connection info and the confirmation payload before the handshake
+        connection_id = uuid.uuid4().hex
+        now = datetime.utcnow()
         info = ConnectionInfo(
             connection_id=connection_id,
             user_id=user_id,
             conversation_id=conversation_id,
             agent_id=agent_id,
-            connected_at=datetime.utcnow(),
-            last_activity=datetime.utcnow()
+            codec=codec,
+            batch_frames=batch_frames,
+            connected_at=now,
+            last_activity=0.0
         )
+        if use_msgpack:
+            confirmation = _encode({
+                "type": "connection_established",
+                "connection_id": connection_id,
+                "timestamp": now
+            }, codec)
+        else:
+            confirmation = (
+                _CONNECTION_ESTABLISHED_PREFIX + '"' + connection_id + '"'
+                + _timestamp_suffix(now)
+            )
+        
+        await websocket.accept(subprotocol=subprotocol)
+        
+        # Store connection
+        self.connections[connection_id] = websocket
+        
+        # Start the outbound writer
+        queue: asyncio.Queue = asyncio.Queue(maxsize=OUTBOUND_QUEUE_SIZE)
+        self.send_queues[connection_id] = queue
+        writer_task = asyncio.create_task(
+            self._writer(connection_id, websocket, queue, batch_frames)
+        )
+        writer_task.add_done_callback(
+            functools.partial(self._release_writer, connection_id)
+        )
+        self.writer_tasks[connection_id] = writer_task
+        
+        # Activity is measured from the completed handshake
+        info.last_activity = asyncio.get_running_loop().time()
         self.connection_info[connection_id] = info
         
         # Map conversation to connection
@@ -88,6 +274,7 @@ class WebSocketManager:
             if conversation_id not in self.conversation_connections:
                 self.conversation_connections[conversation_id] = set()
             self.conversation_connections[conversation_id].add(connection_id)
+            self.connection_conversations.setdefault(connection_id, set()).add(conversation_id)
         
         # Map agent to connection
         if agent_id:
@@ -104,11 +291,7 @@ class WebSocketManager:
         )
         
         # Send connection confirmation
-        await self.send_to_connection(connection_id, {
-            "type": "connection_established",
-            "connection_id": connection_id,
-            "timestamp": datetime.utcnow().isoformat()
-        })
+        await self._send_raw(connection_id, confirmation)
         
         return connection_id
     
@@ -119,14 +302,15 @@ class WebSocketManager:
         
         info = self.connection_info.get(connection_id)
         
-        # Remove from conversation mapping
-        if info and info.conversation_id:
-            conv_connections = self.conversation_connections.get(
-                info.conversation_id, set()
-            )
+        # Drop its typing state while its info can still label a stop event
+        self._clear_typing({connection_id})
+        
+        # Remove from every conversation the connection joined
+        for conv_id in self.connection_conversations.pop(connection_id, set()):
+            conv_connections = self.conversation_connections.get(conv_id, set())
             conv_connections.discard(connection_id)
             if not conv_connections:
-                del self.conversation_connections[info.conversation_id]
+                self.conversation_connections.pop(conv_id, None)
         
         # Remove from agent mapping
         if info and info.agent_id:
@@ -137,6 +321,12 @@ class WebSocketManager:
             if not agent_connections:
                 del self.agent_connections[info.agent_id]
         
+        # Stop the outbound writer
+        self.send_queues.pop(connection_id, None)
+        writer_task = self.writer_tasks.pop(connection_id, None)
+        if writer_task and writer_task is not asyncio.current_task():
+            writer_task.cancel()
+        
         # Remove connection
         del self.connections[connection_id]
         if connection_id in self.connection_info:
@@ -154,61 +344,156 @@ class WebSocketManager:
         message: Dict[str, Any]
     ) -> bool:
         """Send message to specific connection."""
-        if connection_id not in self.connections:
+        info = self.connection_info.get(connection_id)
+        if connection_id not in self.connections or not info:
+            return False
+        
+        return await self._send_raw(connection_id, _encode(message, info.codec))
+    
+    async def _send_raw(self, connection_id: str, payload: Union[str, bytes]) -> bool:
+        """Queue an already-serialized payload for a connection's writer."""
+        queue = self.send_queues.get(connection_id)
+        if queue is None:
             return False
         
         try:
-            websocket = self.connections[connection_id]
-            await websocket.send_text(json.dumps(message))
-            
-            # Update last activity
-            if connection_id in self.connection_info:
-                self.connection_info[connection_id].last_activity = datetime.utcnow()
-            
+            queue.put_nowait(payload)
             return True
             
-        except Exception as e:
-            logger.error(
-                "Failed to send message to connection",
+        except asyncio.QueueFull:
+            logger.warning(
+                "Outbound queue full, dropping slow connection",
                 connection_id=connection_id,
-                error=str(e)
+                queue_size=queue.qsize()
             )
-            # Remove failed connection
+            websocket = self.connections.get(connection_id)
             await self.disconnect(connection_id)
+            
+            # Close the socket too, so the client reconnects instead of waiting on a dead session;
+            # a backed-up client can stall the close handshake, so it must not block this sender
+            if websocket is not None:
+                task = asyncio.create_task(self._close_slow_connection(connection_id, websocket))
+                self._close_tasks.add(task)
+                task.add_done_callback(self._close_tasks.discard)
             return False
     
+    async def _close_slow_connection(self, connection_id: str, websocket: WebSocket) -> None:
+        """Close a WebSocket dropped for falling behind on its outbound queue."""
+        try:
+            await websocket.close(
+                code=SLOW_CONSUMER_CLOSE_CODE,
+                reason="Connection too slow to keep up"
+            )
+        except Exception as e:
+            logger.debug(
+                "Failed to close slow connection",
+                connection_id=connection_id,
+                error=str(e)
+            )
+    
     async def send_to_conversation(
         self,
         conversation_id: str,
         message: Dict[str, Any],
-        exclude_connection: Optional[str] = None
+        exclude_connection: Optional[str] = None,
+        json_payload: Optional[str] = None
     ) -> int:
-        """Send message to all connections in a conversation."""
-        connections = self.conversation_connections.get(conversation_id, set())
-        sent_count = 0
+        """Send message to all connections in a conversation.
+        
+        json_payload, when given, is the message already encoded as JSON.
+        With sharding enabled the message is also relayed to the other
+        shards once local connections have it; the count only covers
+        local connections.
+        """
+        sent_count = await self._deliver_to_conversation(
+            conversation_id, message, exclude_connection, json_payload
+        )
         
-        for connection_id in connections.copy():
-            if exclude_connection and connection_id == exclude_connection:
-                continue
-            
-            success = await self.send_to_connection(connection_id, message)
-            if success:
-                sent_count += 1
+        if self.redis is not None:
+            await self._relay_to_shards(
+                message, conversation_id=conversation_id, exclude_connection=exclude_connection
+            )
         
         return sent_count
     
+    async def _deliver_to_conversation(
+        self,
+        conversation_id: str,
+        message: Dict[str, Any],
+        exclude_connection: Optional[str] = None,
+        json_payload: Optional[str] = None
+    ) -> int:
+        """Send message to this shard's connections in a conversation."""
+        connections = self.conversation_connections.get(conversation_id, set())
+        if not connections:
+            return 0
+        
+        # Snapshot recipients: sends may disconnect and mutate the live set
+        if exclude_connection in connections:
+            recipients = tuple(
+                connection_id for connection_id in connections
+                if connection_id != exclude_connection
+            )
+        else:
+            recipients = tuple(connections)
+        
+        return await self._broadcast(recipients, message, json_payload)
+    
     async def send_to_agent(
         self,
         agent_id: str,
         message: Dict[str, Any]
     ) -> int:
-        """Send message to all agent connections."""
+        """Send message to all agent connections.
+        
+        With sharding enabled the message is also relayed to the other
+        shards; the count only covers local connections.
+        """
+        sent_count = await self._deliver_to_agent(agent_id, message)
+        
+        if self.redis is not None:
+            await self._relay_to_shards(message, agent_id=agent_id)
+        
+        return sent_count
+    
+    async def _deliver_to_agent(
+        self,
+        agent_id: str,
+        message: Dict[str, Any]
+    ) -> int:
+        """Send message to this shard's connections for an agent."""
         connections = self.agent_connections.get(agent_id, set())
+        if not connections:
+            return 0
+        
+        return await self._broadcast(tuple(connections), message)
+    
+    async def _broadcast(
+        self,
+        connection_ids: Sequence[str],
+        message: Dict[str, Any],
+        json_payload: Optional[str] = None
+    ) -> int:
+        """Queue a message for several connections, serializing once per codec."""
+        payloads: Dict[str, Union[str, bytes]] = {}
+        if json_payload is not None:
+            payloads["json"] = json_payload
         sent_count = 0
         
-        for connection_id in connections.copy():
-            success = await self.send_to_connection(connection_id, message)
-            if success:
+        for index, connection_id in enumerate(connection_ids):
+            if index and index % BROADCAST_BATCH_SIZE == 0:
+                # Let other handlers run between batches of a large broadcast
+                await asyncio.sleep(0)
+            
+            info = self.connection_info.get(connection_id)
+            if not info:
+                continue
+            
+            payload = payloads.get(info.codec)
+            if payload is None:
+                payload = payloads[info.codec] = _encode(message, info.codec)
+            
+            if await self._send_raw(connection_id, payload):
                 sent_count += 1
         
         return sent_count
@@ -257,13 +542,18 @@ class WebSocketManager:
         agent_info: Dict[str, Any]
     ) -> None:
         """Notify conversation participants that agent is available."""
+        now = datetime.utcnow()
         message = {
             "type": "agent_available",
             "agent": agent_info,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": now
         }
         
-        await self.send_to_conversation(conversation_id, message)
+        await self.send_to_conversation(
+            conversation_id,
+            message,
+            json_payload=_AGENT_AVAILABLE_PREFIX + _dumps(agent_info) + _timestamp_suffix(now)
+        )
     
     async def notify_agent_joined(
         self,
@@ -271,13 +561,18 @@ class WebSocketManager:
         agent_info: Dict[str, Any]
     ) -> None:
         """Notify conversation participants that agent joined."""
+        now = datetime.utcnow()
         message = {
             "type": "agent_joined",
             "agent": agent_info,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": now
         }
         
-        await self.send_to_conversation(conversation_id, message)
+        await self.send_to_conversation(
+            conversation_id,
+            message,
+            json_payload=_AGENT_JOINED_PREFIX + _dumps(agent_info) + _timestamp_suffix(now)
+        )
     
     async def notify_conversation_transferred(
         self,
@@ -285,13 +580,19 @@ class WebSocketManager:
         from_ai: bool = True
     ) -> None:
         """Notify about conversation transfer."""
+        now = datetime.utcnow()
         message = {
             "type": "conversation_transferred",
             "from_ai": from_ai,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": now
         }
+        prefix = _TRANSFERRED_FROM_AI_PREFIX if from_ai else _TRANSFERRED_FROM_AGENT_PREFIX
         
-        await self.send_to_conversation(conversation_id, message)
+        await self.send_to_conversation(
+            conversation_id,
+            message,
+            json_payload=prefix + _timestamp_suffix(now)
+        )
     
     def get_connection_count(self) -> int:
         """Get total number of active connections."""
@@ -307,6 +608,126 @@ class WebSocketManager:
     
     # Private methods
     
+    def _release_writer(self, connection_id: str, task: asyncio.Task) -> None:
+        """Drop a finished writer task so it cannot pin its WebSocket."""
+        if self.writer_tasks.get(connection_id) is task:
+            del self.writer_tasks[connection_id]
+    
+    async def _relay_to_shards(
+        self,
+        message: Dict[str, Any],
+        conversation_id: Optional[str] = None,
+        agent_id: Optional[str] = None,
+        exclude_connection: Optional[str] = None
+    ) -> None:
+        """Publish a conversation or agent message for the other shards to deliver."""
+        try:
+            await self.redis.publish(
+                RELAY_CHANNEL,
+                _dumps({
+                    "origin": self.shard_id,
+                    "conversation_id": conversation_id,
+                    "agent_id": agent_id,
+                    "message": message,
+                    "exclude_connection": exclude_connection
+                })
+            )
+        except Exception as e:
+            logger.error(
+                "Failed to relay message to shards",
+                conversation_id=conversation_id,
+                agent_id=agent_id,
+                error=str(e)
+            )
+    
+    async def _relay_listener(self) -> None:
+        """Deliver messages relayed by other shards to local connections.
+        
+        Runs for the manager's lifetime: a Redis failure closes the
+        subscription and resubscribes after a short pause.
+        """
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(RELAY_CHANNEL)
+                async for item in pubsub.listen():
+                    if item.get("type") != "message":
+                        continue
+                    
+                    try:
+                        envelope = json.loads(item["data"])
+                        # This shard already delivered its own messages locally
+                        if envelope["origin"] == self.shard_id:
+                            continue
+                        if envelope.get("agent_id"):
+                            await self._deliver_to_agent(envelope["agent_id"], envelope["message"])
+                        else:
+                            await self._deliver_to_conversation(
+                                envelope["conversation_id"],
+                                envelope["message"],
+                                exclude_connection=envelope.get("exclude_connection")
+                            )
+                    except Exception as e:
+                        logger.error("Failed to deliver relayed message", error=str(e))
+                
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("WebSocket shard relay failed, resubscribing", error=str(e))
+            finally:
+                await pubsub.close()
+            
+            await asyncio.sleep(RELAY_RETRY_SECONDS)
+    
+    async def _writer(
+        self,
+        connection_id: str,
+        websocket: WebSocket,
+        queue: asyncio.Queue,
+        batch_frames: bool = False
+    ) -> None:
+        """Drain a connection's outbound queue onto its WebSocket.
+        
+        This is the only coroutine that writes to the socket, so frames
+        keep their queue order without a per-connection lock. With
+        batch_frames, JSON messages already queued are coalesced into
+        one "batch" frame.
+        """
+        loop = asyncio.get_running_loop()
+        
+        try:
+            while True:
+                payload = await queue.get()
+                
+                if isinstance(payload, bytes):
+                    await websocket.send_bytes(payload)
+                else:
+                    # Coalesce whatever else is already queued into one frame
+                    if batch_frames and not queue.empty():
+                        batch = [payload]
+                        while len(batch) < WRITER_BATCH_SIZE and not queue.empty():
+                            batch.append(queue.get_nowait())
+                        payload = '{"type":"batch","items":[' + ",".join(batch) + "]}"
+                    
+                    await websocket.send_text(payload)
+                
+                # Update last activity
+                info = self.connection_info.get(connection_id)
+                if info:
+                    info.last_activity = loop.time()
+                    self.connection_info.move_to_end(connection_id)
+                
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(
+                "Failed to send message to connection",
+                connection_id=connection_id,
+                error=str(e)
+            )
+            # Remove failed connection
+            await self.disconnect(connection_id)
+    
     async def _handle_chat_message(
         self,
         connection_id: str,
@@ -333,7 +754,7 @@ class WebSocketManager:
                 "type": "ai_response",
                 "content": response.content,
                 "message_id": response.id,
-                "timestamp": response.timestamp.isoformat()
+                "timestamp": response.timestamp
             }
             
             await self.send_to_conversation(
@@ -347,24 +768,67 @@ class WebSocketManager:
         connection_id: str,
         is_typing: bool
     ) -> None:
-        """Handle typing indicator."""
+        """Record typing indicator; broadcast once the debounce window ends."""
         info = self.connection_info.get(connection_id)
         if not info or not info.conversation_id:
             return
         
+        key = (info.conversation_id, info.agent_id or info.user_id or connection_id)
+        pending = self.typing_state.get(key)
+        if pending is not None:
+            handle = pending[2]
+        else:
+            handle = asyncio.get_running_loop().call_later(
+                TYPING_DEBOUNCE_SECONDS, self._flush_typing_indicator, key
+            )
+        self.typing_state[key] = (is_typing, connection_id, handle)
+    
+    def _flush_typing_indicator(self, key: Tuple[str, str]) -> None:
+        """Broadcast a debounced typing state if it differs from the last one sent."""
+        pending = self.typing_state.pop(key, None)
+        if pending is None:
+            return
+        is_typing, connection_id, _ = pending
+        
+        if is_typing == (key in self.typing_active):
+            return
+        if is_typing:
+            self.typing_active[key] = connection_id
+        else:
+            self.typing_active.pop(key, None)
+        
+        self._send_typing_indicator(key[0], is_typing, connection_id)
+    
+    def _send_typing_indicator(self, conversation_id: str, is_typing: bool, connection_id: str) -> None:
+        """Broadcast a connection's typing state to the rest of its conversation."""
+        info = self.connection_info.get(connection_id)
         message = {
             "type": "typing_indicator",
             "is_typing": is_typing,
-            "user_id": info.user_id,
-            "agent_id": info.agent_id,
-            "timestamp": datetime.utcnow().isoformat()
+            "user_id": info.user_id if info else None,
+            "agent_id": info.agent_id if info else None,
+            "timestamp": datetime.utcnow()
         }
         
-        await self.send_to_conversation(
-            info.conversation_id,
+        task = asyncio.create_task(self.send_to_conversation(
+            conversation_id,
             message,
             exclude_connection=connection_id
-        )
+        ))
+        self._typing_tasks.add(task)
+        task.add_done_callback(self._typing_tasks.discard)
+    
+    def _clear_typing(self, connection_ids: Set[str]) -> None:
+        """Forget typing state owned by closing connections; senders shown typing get a stop event."""
+        for key, (_, connection_id, handle) in list(self.typing_state.items()):
+            if connection_id in connection_ids:
+                handle.cancel()
+                del self.typing_state[key]
+        
+        for key, connection_id in list(self.typing_active.items()):
+            if connection_id in connection_ids:
+                del self.typing_active[key]
+                self._send_typing_indicator(key[0], False, connection_id)
     
     async def _handle_agent_join(
         self,
@@ -387,6 +851,7 @@ class WebSocketManager:
         if conversation_id not in self.conversation_connections:
             self.conversation_connections[conversation_id] = set()
         self.conversation_connections[conversation_id].add(connection_id)
+        self.connection_conversations.setdefault(connection_id, set()).add(conversation_id)
         
         # Notify conversation participants
         await self.notify_agent_joined(conversation_id, {
@@ -408,38 +873,86 @@ class WebSocketManager:
         if not status:
             return
         
-        # Broadcast status to relevant conversations
-        for conv_id in self.conversation_connections:
-            if connection_id in self.conversation_connections[conv_id]:
-                message = {
-                    "type": "agent_status_update",
-                    "agent_id": info.agent_id,
-                    "status": status,
-                    "timestamp": datetime.utcnow().isoformat()
-                }
-                
-                await self.send_to_conversation(
-                    conv_id,
-                    message,
-                    exclude_connection=connection_id
+        message = {
+            "type": "agent_status_update",
+            "agent_id": info.agent_id,
+            "status": status,
+            "timestamp": datetime.utcnow()
+        }
+        
+        # Broadcast status to relevant conversations; best effort, one failure never stops the rest
+        conversation_ids = list(self.connection_conversations.get(connection_id, ()))
+        results = await asyncio.gather(
+            *(
+                self.send_to_conversation(conv_id, message, exclude_connection=connection_id)
+                for conv_id in conversation_ids
+            ),
+            return_exceptions=True
+        )
+        for conv_id, result in zip(conversation_ids, results):
+            if isinstance(result, Exception):
+                logger.error(
+                    "Failed to send agent status update",
+                    agent_id=info.agent_id,
+                    conversation_id=conv_id,
+                    error=str(result)
                 )
     
+    def _disconnect_many(self, connection_ids: List[str]) -> None:
+        """Disconnect several connections, grouping the index updates."""
+        conversation_removals: Dict[str, Set[str]] = defaultdict(set)
+        agent_removals: Dict[str, Set[str]] = defaultdict(set)
+        
+        # Drop their typing state while their info can still label stop events
+        self._clear_typing(set(connection_ids))
+        
+        for connection_id in connection_ids:
+            if self.connections.pop(connection_id, None) is None:
+                continue
+            
+            for conv_id in self.connection_conversations.pop(connection_id, ()):
+                conversation_removals[conv_id].add(connection_id)
+            
+            info = self.connection_info.pop(connection_id, None)
+            if info and info.agent_id:
+                agent_removals[info.agent_id].add(connection_id)
+            
+            # Stop the outbound writer
+            self.send_queues.pop(connection_id, None)
+            writer_task = self.writer_tasks.pop(connection_id, None)
+            if writer_task:
+                writer_task.cancel()
+        
+        # One set difference per affected conversation/agent
+        for mapping, removals in (
+            (self.conversation_connections, conversation_removals),
+            (self.agent_connections, agent_removals)
+        ):
+            for key, removed in removals.items():
+                remaining = mapping.get(key)
+                if remaining is None:
+                    continue
+                remaining -= removed
+                if not remaining:
+                    del mapping[key]
+    
     async def _cleanup_stale_connections(self) -> None:
         """Background task to cleanup stale connections."""
         while True:
             try:
-                current_time = datetime.utcnow()
+                # Connections with no activity for 30 minutes are stale
+                cutoff = asyncio.get_running_loop().time() - 1800
                 stale_connections = []
                 
+                # Least recently active first, so stop at the first fresh one
                 for connection_id, info in self.connection_info.items():
-                    # Check if connection is stale (no activity for 30 minutes)
-                    if (current_time - info.last_activity).total_seconds() > 1800:
-                        stale_connections.append(connection_id)
-                
-                for connection_id in stale_connections:
-                    await self.disconnect(connection_id)
+                    if info.last_activity > cutoff:
+                        break
+                    stale_connections.append(connection_id)
                 
                 if stale_connections:
+                    self._disconnect_many(stale_connections)
+                    
                     logger.info(
                         "Cleaned up stale connections",
                         count=len(stale_connections)
@@ -460,7 +973,19 @@ class WebSocketManager:
         """Cleanup WebSocket manager."""
         logger.info("Cleaning up WebSocket manager...")
         
+        # Stop background tasks
+        background_tasks = [
+            task for task in (self._cleanup_task, self._relay_task) if task
+        ]
+        for task in background_tasks:
+            task.cancel()
+        for _, _, handle in self.typing_state.values():
+            handle.cancel()
+        self.typing_state.clear()
+        self.typing_active.clear()
+        
         # Close all connections
+        writer_tasks = list(self.writer_tasks.values())
         for connection_id in list(self.connections.keys()):
             try:
                 websocket = self.connections[connection_id]
@@ -470,4 +995,13 @@ class WebSocketManager:
             
             await self.disconnect(connection_id)
         
+        # Wait for cancelled tasks so none outlive the manager
+        await asyncio.gather(
+            *background_tasks, *writer_tasks, *self._typing_tasks, *self._close_tasks,
+            return_exceptions=True
+        )
+        
+        if self.redis is not None:
+            await self.redis.close()
+        
         logger.info("WebSocket manager cleanup complete") 
\ No newline at end of file
@@ -4,35 +4,120 @@ Provides context-aware healthcare knowledge retrieval for AI responses
 """
 
 import asyncio
-from datetime import datetime
+import atexit
+import fcntl
+import functools
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from typing import Dict, List, Optional, Any, Tuple
 import json
 
 import structlog
 import numpy as np
+import torch
 from sentence_transformers import SentenceTransformer
 
 from utils.config import Settings
 from utils.phi_protection import PHIProtector
 
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 logger = structlog.get_logger(__name__)
 
+# Quantized model files shipped with all-MiniLM-L6-v2 for each non-torch backend
+_EMBEDDING_BACKEND_FILES = {
+    "onnx": "onnx/model_qint8_avx512_vnni.onnx",
+    "openvino": "openvino/openvino_model_qint8_quantized.xml",
+}
+
+# How long the encode worker waits for more texts to join a batch
+ENCODE_BATCH_WINDOW_SECONDS = 0.005
+
+# Most texts embedded in one coalesced encode call
+ENCODE_MAX_BATCH_SIZE = 32
+
+# Corpus size from which search goes through the HNSW index instead of a full scan
+HNSW_MIN_DOCUMENTS = 10000
+
+# Initial row capacity of the embedding buffer; doubled whenever it fills
+INITIAL_EMBEDDING_CAPACITY = 64
+
+# Files written under VECTOR_STORE_PERSIST_PATH
+_EMBEDDINGS_FILE = "embeddings.npy"
+_DOCUMENTS_FILE = "documents.json"
+_INDEX_FILE = "hnsw.faiss"
+_LOCK_FILE = ".lock"
+
+# HNSW graph degree and search breadth
+HNSW_M = 32
+HNSW_EF_SEARCH = 64
+
+# Simple keyword-based query classification, earlier categories win
+# In production, use a trained classifier
+QUERY_CATEGORY_KEYWORDS = {
+    "symptoms": ["symptom", "pain", "fever", "headache", "cough", "cold", "flu", "sick", "hurt"],
+    "medications": ["medication", "medicine", "drug", "prescription", "pill", "dosage", "side effect"],
+    "billing": ["bill", "insurance", "cost", "payment", "coverage", "copay", "deductible"],
+    "appointments": ["appointment", "schedule", "booking", "visit", "see doctor", "when can"],
+    "emergency": ["emergency", "urgent", "911", "chest pain", "breathing", "unconscious"],
+    "prevention": ["vaccine", "shot", "screening", "checkup", "prevention", "immunization"],
+    "general_health": ["health", "wellness", "exercise", "diet", "blood pressure", "diabetes"]
+}
+
+# All keywords matched in one pass: Aho-Corasick when available, else an
+# overlapping-match regex; each keyword maps to its category's rank
+_QUERY_CATEGORY_NAMES = list(QUERY_CATEGORY_KEYWORDS)
+_QUERY_KEYWORD_RANK: Dict[str, int] = {}
+for _rank, _keywords in enumerate(QUERY_CATEGORY_KEYWORDS.values()):
+    for _keyword in _keywords:
+        _QUERY_KEYWORD_RANK.setdefault(_keyword, _rank)
+
+if ahocorasick is not None:
+    _QUERY_AUTOMATON = ahocorasick.Automaton()
+    for _keyword, _rank in _QUERY_KEYWORD_RANK.items():
+        _QUERY_AUTOMATON.add_word(_keyword, _rank)
+    _QUERY_AUTOMATON.make_automaton()
+else:
+    _QUERY_AUTOMATON = None
+
+_QUERY_PATTERN = re.compile(
+    "(?=("
+    + "|".join(
+        re.escape(keyword)
+        for keyword in sorted(_QUERY_KEYWORD_RANK, key=len, reverse=True)
+    )
+    + "))"
+)
+
 
 class Document:
     """Document model for vector storage."""
     
+    __slots__ = ("id", "content", "metadata", "embedding", "created_at")
+    
     def __init__(
         self,
         id: str,
         content: str,
         metadata: Dict[str, Any],
-        embedding: Optional[List[float]] = None
+        embedding: Optional[np.ndarray] = None
     ):
         self.id = id
         self.content = content
         self.metadata = metadata
         self.embedding = embedding
-        self.created_at = datetime.utcnow()
+        self.created_at = time.time()  # Unix epoch seconds
 
 
 class VectorStore:
@@ -49,9 +134,37 @@ class VectorStore:
         self.embedding_model: Optional[SentenceTransformer] = None
         self.embedding_dimension = 384  # all-MiniLM-L6-v2 dimension
         
+        # Concurrent encode requests are coalesced into batched model calls
+        self._encode_queue: Optional[asyncio.Queue] = None
+        self._encode_task: Optional[asyncio.Task] = None
+        
+        # Model inference runs on a single dedicated thread, off the event loop;
+        # one worker avoids contention between intra-op BLAS threads
+        self._encode_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="st-encode")
+        
         # Document storage
         self.documents: Dict[str, Document] = {}
-        self.embeddings: Dict[str, np.ndarray] = {}
+        
+        # L2-normalized embeddings, one row per document in _doc_ids order,
+        # stored at the configured precision and upcast when scored.
+        # Rows live in preallocated buffers; _emb_matrix and _cats are views
+        # over the filled part
+        self._emb_dtype = np.dtype(settings.embedding_dtype)
+        self._doc_ids: List[str] = []
+        self._doc_rows: Dict[str, int] = {}
+        self._reset_embeddings()
+        
+        # Row numbers per category, so filtered search scores only that shard
+        self._cat_rows: Dict[Optional[str], List[int]] = {}
+        self._cat_row_arrays: Dict[Optional[str], np.ndarray] = {}
+        
+        # Approximate nearest-neighbour index over the same rows (fp16 HNSW). Every faiss
+        # call runs on the encode thread, which orders adds, searches and rebuilds without
+        # a lock; a stale graph is rebuilt in the background while search scans exactly
+        self._index = self._new_index()
+        self._index_stale = False
+        self._index_generation = 0  # Bumped whenever existing rows change
+        self._index_rebuild_task: Optional[asyncio.Task] = None
         
         # Healthcare knowledge categories
         self.categories = {
@@ -71,15 +184,21 @@ class VectorStore:
         """Initialize vector store and load healthcare knowledge."""
         try:
             # Load embedding model
-            self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+            torch.set_num_threads(max(1, (os.cpu_count() or 2) // 2))
+            self.embedding_model = self._load_embedding_model()
+            self._encode_queue = asyncio.Queue()
+            self._encode_task = asyncio.create_task(self._encode_worker())
             logger.info("Embedding model loaded")
             
             # Get PHI protector
             from main import phi_protector
             self.phi_protector = phi_protector
             
-            # Load healthcare knowledge base
-            await self._load_healthcare_knowledge()
+            # Map the persisted index, or seed the healthcare knowledge base
+            if not self._load_state():
+                await self._load_healthcare_knowledge()
+            if self.settings.vector_store_persist_path:
+                atexit.register(self._save_state)
             
             logger.info(
                 "Vector store initialized successfully",
@@ -101,33 +220,16 @@ class VectorStore:
         try:
             # Generate document ID if not provided
             if not document_id:
-                document_id = f"doc_{len(self.documents)}_{int(datetime.utcnow().timestamp())}"
+                document_id = self._new_document_id()
             
             # Check for PHI in content
-            clean_content = content
-            if self.phi_protector:
-                phi_detected, clean_content = await self.phi_protector.detect_and_redact(
-                    content,
-                    context={"source": "knowledge_base"}
-                )
-                
-                if phi_detected:
-                    logger.warning("PHI detected in document, redacted", doc_id=document_id)
+            clean_content = await self._prepare_document(content, document_id)
             
             # Generate embedding
-            embedding = self.embedding_model.encode(clean_content).tolist()
-            
-            # Create document
-            document = Document(
-                id=document_id,
-                content=clean_content,
-                metadata=metadata,
-                embedding=embedding
-            )
+            embedding = await self._enqueue_encode(clean_content)
             
-            # Store document and embedding
-            self.documents[document_id] = document
-            self.embeddings[document_id] = np.array(embedding)
+            # Store document and its embedding row
+            self._commit_documents([document_id], [clean_content], [metadata], [embedding])
             
             logger.debug("Document added to vector store", doc_id=document_id)
             return document_id
@@ -136,6 +238,33 @@ class VectorStore:
             logger.error("Failed to add document", error=str(e))
             raise
     
+    async def add_documents_bulk(
+        self,
+        contents: List[str],
+        embeddings: np.ndarray,
+        metadatas: List[Dict[str, Any]]
+    ) -> List[str]:
+        """Add already-redacted documents with precomputed, L2-normalized embeddings."""
+        try:
+            document_ids = [self._new_document_id(i) for i in range(len(contents))]
+            self._commit_documents(document_ids, contents, metadatas, embeddings)
+            
+            logger.debug("Documents added to vector store", count=len(document_ids))
+            return document_ids
+            
+        except Exception as e:
+            logger.error("Failed to add documents", error=str(e))
+            raise
+    
+    async def encode_batch(self, texts: List[str]) -> np.ndarray:
+        """Embed many texts in one batched, normalized model call."""
+        return await self._run_encode(
+            texts,
+            batch_size=32,
+            normalize_embeddings=True,
+            convert_to_numpy=True
+        )
+    
     async def search(
         self,
         query: str,
@@ -145,36 +274,43 @@ class VectorStore:
     ) -> List[Tuple[Document, float]]:
         """Search for similar documents."""
         try:
-            if not self.embedding_model or not self.embeddings:
+            if not self.embedding_model or not self._doc_ids:
                 return []
             
-            # Generate query embedding
-            query_embedding = self.embedding_model.encode(query)
-            query_norm = np.linalg.norm(query_embedding)
+            # Generate query embedding (the encoder returns it L2-normalized)
+            query_embedding = (await self._enqueue_encode(query)).astype(np.float32, copy=False)
             
-            # Calculate similarities
-            similarities = []
-            for doc_id, doc_embedding in self.embeddings.items():
-                document = self.documents[doc_id]
-                
-                # Apply category filter if specified
-                if category_filter and document.metadata.get("category") != category_filter:
-                    continue
-                
-                # Calculate cosine similarity
-                doc_norm = np.linalg.norm(doc_embedding)
-                if doc_norm == 0 or query_norm == 0:
-                    similarity = 0.0
-                else:
-                    similarity = np.dot(query_embedding, doc_embedding) / (query_norm * doc_norm)
-                
-                # Filter by minimum similarity
-                if similarity >= min_similarity:
-                    similarities.append((document, float(similarity)))
+            # Large corpora: take HNSW candidates (over-fetched when filtering);
+            # filtered search scores only its category's rows; otherwise score
+            # every document in one matrix-vector product
+            candidate_cats = None
+            if self._index_ready():
+                rows = await self._index_candidates(query_embedding, k * 3 if category_filter else k)
+                similarities = self._emb_matrix[rows].astype(np.float32, copy=False) @ query_embedding
+                if category_filter:
+                    candidate_cats = self._cats[rows]
+            elif category_filter:
+                rows = self._category_rows(category_filter)
+                similarities = self._emb_matrix[rows].astype(np.float32, copy=False) @ query_embedding
+            else:
+                rows = np.arange(len(self._doc_ids))
+                similarities = self._emb_matrix.astype(np.float32, copy=False) @ query_embedding
+            
+            # Apply category filter and minimum similarity
+            mask = similarities >= min_similarity
+            if candidate_cats is not None:
+                mask &= candidate_cats == category_filter
+            hits = np.flatnonzero(mask)
             
-            # Sort by similarity and return top k
-            similarities.sort(key=lambda x: x[1], reverse=True)
-            results = similarities[:k]
+            # Select top k without sorting every candidate
+            if len(hits) > k:
+                hits = hits[np.argpartition(similarities[hits], -k)[-k:]]
+            hits = hits[np.argsort(-similarities[hits])]
+            
+            results = [
+                (self.documents[self._doc_ids[rows[hit]]], float(similarities[hit]))
+                for hit in hits
+            ]
             
             logger.debug(
                 "Vector search completed",
@@ -212,37 +348,40 @@ class VectorStore:
                 # Fallback to general search without category filter
                 results = await self.search(query=query, k=2, min_similarity=0.3)
             
-            # Build context string
-            context_parts = []
-            current_length = 0
+            # Build context string in one join, tracking the remaining budget
+            pieces = []
+            remaining_length = max_context_length
+            sources_used = 0
             
             for document, similarity in results:
                 content = document.content
                 metadata = document.metadata
+                separator = "\n" if sources_used else ""
                 
                 # Add source information
                 source_info = f"[Source: {metadata.get('title', 'Healthcare Knowledge')}]"
-                full_content = f"{source_info}\n{content}\n"
+                entry_length = len(source_info) + len(content) + 2
                 
                 # Check if adding this would exceed max length
-                if current_length + len(full_content) > max_context_length:
+                if entry_length > remaining_length:
                     # Truncate if needed
-                    remaining_length = max_context_length - current_length
                     if remaining_length > 100:  # Only add if meaningful length remains
-                        truncated_content = content[:remaining_length-len(source_info)-10] + "..."
-                        context_parts.append(f"{source_info}\n{truncated_content}")
+                        truncated_content = content[:remaining_length-len(source_info)-10]
+                        pieces += (separator, source_info, "\n", truncated_content, "...")
+                        sources_used += 1
                     break
                 
-                context_parts.append(full_content)
-                current_length += len(full_content)
+                pieces += (separator, source_info, "\n", content, "\n")
+                remaining_length -= entry_length
+                sources_used += 1
             
-            context = "\n".join(context_parts)
+            context = "".join(pieces)
             
             logger.debug(
                 "Context generated for query",
                 query_length=len(query),
                 context_length=len(context),
-                sources_used=len(context_parts),
+                sources_used=sources_used,
                 category=category
             )
             
@@ -274,15 +413,423 @@ class VectorStore:
         """Cleanup vector store resources."""
         logger.info("Cleaning up vector store...")
         
+        # Stop the background index rebuild
+        if self._index_rebuild_task:
+            self._index_rebuild_task.cancel()
+            await asyncio.gather(self._index_rebuild_task, return_exceptions=True)
+        
+        # Stop the encode worker; texts still queued fail rather than leave their callers waiting,
+        # and later calls go straight to the (shut down) executor instead of the dead queue
+        if self._encode_task:
+            queue, self._encode_queue = self._encode_queue, None
+            self._encode_task.cancel()
+            await asyncio.gather(self._encode_task, return_exceptions=True)
+            self._encode_task = None
+            pending = []
+            while not queue.empty():
+                pending.append(queue.get_nowait())
+            self._fail_waiters(pending, RuntimeError("Vector store is shutting down"))
+        
+        # Queued index adds finish before the state below is saved
+        await asyncio.get_running_loop().run_in_executor(None, self._encode_executor.shutdown)
+        
+        # Persist state so a restart maps it instead of re-encoding
+        atexit.unregister(self._save_state)
+        await asyncio.get_running_loop().run_in_executor(None, self._save_state)
+        
         # Clear storage
         self.documents.clear()
-        self.embeddings.clear()
+        self._doc_ids.clear()
+        self._doc_rows.clear()
+        self._reset_embeddings()
+        self._cat_rows.clear()
+        self._cat_row_arrays.clear()
+        self._index = self._new_index()
+        self._index_stale = False
         
-        # Note: In production, you might want to save state to disk
         logger.info("Vector store cleanup complete")
     
     # Private methods
     
+    async def _enqueue_encode(self, text: str) -> np.ndarray:
+        """Embed text through the batching worker."""
+        if self._encode_queue is None:
+            return await self._run_encode(text, normalize_embeddings=True, convert_to_numpy=True)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._encode_queue.put_nowait((text, future))
+        return await future
+    
+    async def _encode_worker(self) -> None:
+        """Coalesce queued texts for a short window and embed them in one call."""
+        loop = asyncio.get_running_loop()
+        queue = self._encode_queue
+        items: List[Tuple[str, asyncio.Future]] = []
+        
+        try:
+            while True:
+                items = [await queue.get()]
+                deadline = loop.time() + ENCODE_BATCH_WINDOW_SECONDS
+                while len(items) < ENCODE_MAX_BATCH_SIZE:
+                    if not queue.empty():
+                        items.append(queue.get_nowait())
+                        continue
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        items.append(await asyncio.wait_for(queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                
+                texts = [text for text, _ in items]
+                try:
+                    embeddings = await self._run_encode(
+                        texts,
+                        batch_size=len(texts),
+                        convert_to_numpy=True,
+                        normalize_embeddings=True
+                    )
+                except Exception as e:
+                    logger.error("Batched embedding failed", batch_size=len(texts), error=str(e))
+                    self._fail_waiters(items, e)
+                    continue
+                
+                for (_, future), embedding in zip(items, embeddings):
+                    if not future.done():
+                        future.set_result(embedding)
+        except asyncio.CancelledError:
+            # Cleanup fails whatever is still queued; the batch in hand fails here
+            self._fail_waiters(items, RuntimeError("Vector store is shutting down"))
+            raise
+    
+    def _fail_waiters(self, items: List[Tuple[str, asyncio.Future]], error: Exception) -> None:
+        """Fail the still-pending futures of queued (text, future) items."""
+        for _, future in items:
+            if not future.done():
+                future.set_exception(error)
+    
+    async def _run_encode(self, texts: Any, **kwargs: Any) -> np.ndarray:
+        """Run the embedding model on the encode thread."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._encode_executor,
+            functools.partial(self.embedding_model.encode, texts, **kwargs)
+        )
+    
+    def _new_document_id(self, offset: int = 0) -> str:
+        """Generate a document ID; offset keeps IDs unique within a batch."""
+        return f"doc_{len(self.documents) + offset}_{time.time_ns() // 1_000_000_000}"
+    
+    async def _prepare_document(self, content: str, document_id: str) -> str:
+        """Redact PHI from document content before it is embedded."""
+        if not self.phi_protector:
+            return content
+        
+        phi_detected, clean_content = await self.phi_protector.detect_and_redact(
+            content,
+            context={"source": "knowledge_base"}
+        )
+        
+        if phi_detected:
+            logger.warning("PHI detected in document, redacted", doc_id=document_id)
+        
+        return clean_content
+    
+    def _commit_documents(
+        self,
+        document_ids: List[str],
+        contents: List[str],
+        metadatas: List[Dict[str, Any]],
+        embeddings: Any
+    ) -> None:
+        """Store prepared documents and their (already L2-normalized) embedding rows."""
+        vectors = np.asarray(embeddings, dtype=np.float32).reshape(len(document_ids), -1)
+        if self.settings.debug:
+            assert not np.isnan(vectors).any(), "NaN in document embeddings"
+        
+        new_rows = []
+        new_cats = []
+        for i, (document_id, content, metadata) in enumerate(zip(document_ids, contents, metadatas)):
+            self.documents[document_id] = Document(
+                id=document_id,
+                content=content,
+                metadata=metadata,
+                embedding=vectors[i]
+            )
+            
+            category = metadata.get("category")
+            row = self._doc_rows.get(document_id)
+            if row is None:
+                row = len(self._doc_ids)
+                self._doc_rows[document_id] = row
+                self._doc_ids.append(document_id)
+                new_rows.append(i)
+                new_cats.append(category)
+                self._cat_rows.setdefault(category, []).append(row)
+                self._cat_row_arrays.pop(category, None)
+            else:
+                self._emb_matrix[row] = vectors[i]
+                previous_category = self._cats[row]
+                if previous_category != category:
+                    self._cat_rows[previous_category].remove(row)
+                    self._cat_rows.setdefault(category, []).append(row)
+                    self._cat_row_arrays.pop(previous_category, None)
+                    self._cat_row_arrays.pop(category, None)
+                self._cats[row] = category
+                # HNSW cannot update vectors in place; rebuild in the background
+                self._index_stale = True
+                self._index_generation += 1
+        
+        if new_rows:
+            size = len(self._doc_ids)
+            start = size - len(new_rows)
+            self._ensure_capacity(size)
+            self._emb_buffer[start:size] = vectors[new_rows]
+            self._cats_buffer[start:size] = new_cats
+            self._emb_matrix = self._emb_buffer[:size]
+            self._cats = self._cats_buffer[:size]
+            if self._index is not None and not self._index_stale:
+                # Runs after any search already queued on the encode thread, before later ones
+                self._encode_executor.submit(self._add_to_index, self._index, vectors[new_rows])
+    
+    def _save_state(self) -> None:
+        """Write embeddings, documents and the HNSW index to the persist path."""
+        path = self.settings.vector_store_persist_path
+        if not path or not self._doc_ids:
+            return
+        
+        directory = Path(path)
+        directory.mkdir(parents=True, exist_ok=True)
+        documents = [
+            {
+                "id": document.id,
+                "content": document.content,
+                "metadata": document.metadata,
+                "created_at": document.created_at
+            }
+            for document in (self.documents[document_id] for document_id in self._doc_ids)
+        ]
+        
+        # Exclusive lock so concurrent workers never interleave partial writes
+        with open(directory / _LOCK_FILE, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            
+            temp_path = directory / (_EMBEDDINGS_FILE + ".tmp")
+            with open(temp_path, "wb") as f:
+                np.save(f, self._emb_matrix)
+            os.replace(temp_path, directory / _EMBEDDINGS_FILE)
+            
+            temp_path = directory / (_DOCUMENTS_FILE + ".tmp")
+            temp_path.write_text(json.dumps(documents))
+            os.replace(temp_path, directory / _DOCUMENTS_FILE)
+            
+            if (
+                self._index is not None
+                and not self._index_stale
+                and self._index.ntotal == len(self._doc_ids)
+            ):
+                temp_path = directory / (_INDEX_FILE + ".tmp")
+                faiss.write_index(self._index, str(temp_path))
+                os.replace(temp_path, directory / _INDEX_FILE)
+            else:
+                (directory / _INDEX_FILE).unlink(missing_ok=True)
+        
+        logger.info("Vector store state saved", path=path, document_count=len(documents))
+    
+    def _load_state(self) -> bool:
+        """Memory-map persisted embeddings and restore documents; False if none."""
+        path = self.settings.vector_store_persist_path
+        if not path:
+            return False
+        
+        directory = Path(path)
+        if not (directory / _EMBEDDINGS_FILE).exists() or not (directory / _DOCUMENTS_FILE).exists():
+            return False
+        
+        with open(directory / _LOCK_FILE, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_SH)
+            # Copy-on-write mapping: pages load on demand, updates stay in memory
+            matrix = np.load(directory / _EMBEDDINGS_FILE, mmap_mode="c")
+            documents = json.loads((directory / _DOCUMENTS_FILE).read_text())
+            index = None
+            if faiss is not None and (directory / _INDEX_FILE).exists():
+                index = faiss.read_index(str(directory / _INDEX_FILE))
+        
+        if not documents or len(documents) != len(matrix):
+            logger.warning("Persisted vector store is empty or inconsistent, reseeding", path=path)
+            return False
+        
+        if matrix.dtype != self._emb_dtype:
+            matrix = matrix.astype(self._emb_dtype)
+        self._emb_buffer = matrix
+        self._emb_matrix = matrix
+        self._cats_buffer = np.empty(len(documents), dtype=object)
+        
+        for row, item in enumerate(documents):
+            document = Document(
+                id=item["id"],
+                content=item["content"],
+                metadata=item["metadata"],
+                embedding=matrix[row]
+            )
+            document.created_at = item["created_at"]
+            self.documents[document.id] = document
+            self._doc_ids.append(document.id)
+            self._doc_rows[document.id] = row
+            
+            category = item["metadata"].get("category")
+            self._cats_buffer[row] = category
+            self._cat_rows.setdefault(category, []).append(row)
+        
+        self._cats = self._cats_buffer
+        self._cat_row_arrays.clear()
+        
+        # Reuse the saved graph if it covers every row; otherwise rebuild once search needs it
+        if index is not None and index.ntotal == len(documents):
+            self._index = index
+            self._index_stale = False
+        else:
+            self._index_stale = True
+        
+        logger.info("Vector store state loaded", path=path, document_count=len(documents))
+        return True
+    
+    def _category_rows(self, category: str) -> np.ndarray:
+        """Row numbers of a category's documents, cached as an array until it changes."""
+        rows = self._cat_row_arrays.get(category)
+        if rows is None:
+            rows = np.array(self._cat_rows.get(category, ()), dtype=np.intp)
+            self._cat_row_arrays[category] = rows
+        return rows
+    
+    def _reset_embeddings(self) -> None:
+        """Drop all embedding rows and reallocate empty buffers."""
+        self._emb_buffer = np.empty(
+            (INITIAL_EMBEDDING_CAPACITY, self.embedding_dimension),
+            dtype=self._emb_dtype
+        )
+        self._cats_buffer = np.empty(INITIAL_EMBEDDING_CAPACITY, dtype=object)
+        self._emb_matrix = self._emb_buffer[:0]
+        self._cats = self._cats_buffer[:0]
+    
+    def _ensure_capacity(self, size: int) -> None:
+        """Grow the embedding buffers geometrically to hold at least size rows."""
+        capacity = len(self._emb_buffer)
+        if size <= capacity:
+            return
+        
+        while capacity < size:
+            capacity *= 2
+        
+        filled = len(self._emb_matrix)
+        emb_buffer = np.empty((capacity, self.embedding_dimension), dtype=self._emb_dtype)
+        emb_buffer[:filled] = self._emb_matrix
+        cats_buffer = np.empty(capacity, dtype=object)
+        cats_buffer[:filled] = self._cats
+        self._emb_buffer = emb_buffer
+        self._cats_buffer = cats_buffer
+    
+    def _new_index(self) -> Any:
+        """Create an empty inner-product HNSW index with fp16 scalar quantization."""
+        if faiss is None:
+            return None
+        
+        index = faiss.IndexHNSWSQ(
+            self.embedding_dimension,
+            faiss.ScalarQuantizer.QT_fp16,
+            HNSW_M,
+            faiss.METRIC_INNER_PRODUCT
+        )
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+        return index
+    
+    def _index_ready(self) -> bool:
+        """Whether search can use the HNSW graph; a stale one starts a background rebuild."""
+        if self._index is None or len(self._doc_ids) < HNSW_MIN_DOCUMENTS:
+            return False
+        
+        if self._index_stale:
+            if self._index_rebuild_task is None:
+                self._index_rebuild_task = asyncio.create_task(self._rebuild_index())
+            return False
+        return True
+    
+    async def _index_candidates(self, query_embedding: np.ndarray, count: int) -> np.ndarray:
+        """Return row numbers of the approximate nearest neighbours of a query."""
+        _, neighbours = await asyncio.get_running_loop().run_in_executor(
+            self._encode_executor,
+            self._index.search,
+            query_embedding.reshape(1, -1),
+            min(count, len(self._doc_ids))
+        )
+        return neighbours[0][neighbours[0] >= 0]
+    
+    async def _rebuild_index(self) -> None:
+        """Rebuild a stale HNSW graph on the encode thread from a snapshot of the rows."""
+        loop = asyncio.get_running_loop()
+        
+        try:
+            while self._index_stale:
+                generation = self._index_generation
+                index = await loop.run_in_executor(
+                    self._encode_executor,
+                    self._build_index,
+                    self._emb_matrix.astype(np.float32)
+                )
+                
+                # Catch up on rows appended while the graph was building
+                while generation == self._index_generation and index.ntotal < len(self._doc_ids):
+                    await loop.run_in_executor(
+                        self._encode_executor,
+                        index.add,
+                        self._emb_matrix[index.ntotal:].astype(np.float32)
+                    )
+                
+                # A row overwritten mid-build outdates the snapshot; build again
+                if generation == self._index_generation:
+                    self._index = index
+                    self._index_stale = False
+            
+            logger.info("HNSW index rebuilt", document_count=len(self._doc_ids))
+            
+        except Exception as e:
+            logger.error("HNSW index rebuild failed", error=str(e))
+        finally:
+            self._index_rebuild_task = None
+    
+    def _build_index(self, vectors: np.ndarray) -> Any:
+        """Build a new HNSW graph over the given rows."""
+        index = self._new_index()
+        index.add(vectors)
+        return index
+    
+    def _add_to_index(self, index: Any, vectors: np.ndarray) -> None:
+        """Append rows to the live HNSW graph (encode thread)."""
+        try:
+            index.add(vectors)
+        except Exception as e:
+            logger.error("HNSW index add failed", count=len(vectors), error=str(e))
+    
+    def _load_embedding_model(self) -> SentenceTransformer:
+        """Load the embedding model on the configured backend, falling back to torch."""
+        backend = self.settings.embedding_backend
+        file_name = _EMBEDDING_BACKEND_FILES.get(backend)
+        if file_name:
+            try:
+                return SentenceTransformer(
+                    'all-MiniLM-L6-v2',
+                    backend=backend,
+                    model_kwargs={"file_name": file_name}
+                )
+            except ImportError as e:
+                logger.warning(
+                    "Embedding backend unavailable, using torch",
+                    backend=backend,
+                    error=str(e)
+                )
+        
+        return SentenceTransformer('all-MiniLM-L6-v2')
+    
     async def _load_healthcare_knowledge(self) -> None:
         """Load healthcare knowledge base."""
         try:
@@ -350,17 +897,34 @@ class VectorStore:
                 }
             ]
             
+            # Redact, then embed the whole knowledge base in one batched call
+            document_ids = [self._new_document_id(i) for i in range(len(knowledge_base))]
+            clean_contents = await asyncio.gather(*[
+                self._prepare_document(item["content"], document_id)
+                for item, document_id in zip(knowledge_base, document_ids)
+            ])
+            embeddings = await self._run_encode(
+                list(clean_contents),
+                batch_size=32,
+                normalize_embeddings=True,
+                convert_to_numpy=True
+            )
+            
             # Add documents to vector store
-            for item in knowledge_base:
-                await self.add_document(
-                    content=item["content"],
-                    metadata={
+            self._commit_documents(
+                document_ids,
+                list(clean_contents),
+                [
+                    {
                         "title": item["title"],
                         "category": item["category"],
                         "tags": item["tags"],
                         "source": "healthcare_knowledge_base"
                     }
-                )
+                    for item in knowledge_base
+                ],
+                embeddings
+            )
             
             logger.info(f"Loaded {len(knowledge_base)} healthcare knowledge documents")
             
@@ -371,31 +935,28 @@ class VectorStore:
         """Classify query to determine relevant category."""
         query_lower = query.lower()
         
-        # Simple keyword-based classification
-        # In production, use a trained classifier
-        category_keywords = {
-            "symptoms": ["symptom", "pain", "fever", "headache", "cough", "cold", "flu", "sick", "hurt"],
-            "medications": ["medication", "medicine", "drug", "prescription", "pill", "dosage", "side effect"],
-            "billing": ["bill", "insurance", "cost", "payment", "coverage", "copay", "deductible"],
-            "appointments": ["appointment", "schedule", "booking", "visit", "see doctor", "when can"],
-            "emergency": ["emergency", "urgent", "911", "chest pain", "breathing", "unconscious"],
-            "prevention": ["vaccine", "shot", "screening", "checkup", "prevention", "immunization"],
-            "general_health": ["health", "wellness", "exercise", "diet", "blood pressure", "diabetes"]
-        }
+        if _QUERY_AUTOMATON is not None:
+            ranks = (rank for _, rank in _QUERY_AUTOMATON.iter(query_lower))
+        else:
+            ranks = (
+                _QUERY_KEYWORD_RANK[match.group(1)]
+                for match in _QUERY_PATTERN.finditer(query_lower)
+            )
         
-        for category, keywords in category_keywords.items():
-            if any(keyword in query_lower for keyword in keywords):
-                return category
+        rank = min(ranks, default=None)
+        if rank is None:
+            return None  # No specific category detected
         
-        return None  # No specific category detected
+        return _QUERY_CATEGORY_NAMES[rank]
 
 
 class DocumentProcessor:
     """Process and prepare documents for vector storage."""
     
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings, vector_store: Optional[VectorStore] = None):
         self.settings = settings
         self.phi_protector: Optional[PHIProtector] = None
+        self._vector_store = vector_store
     
     async def initialize(self) -> None:
         """Initialize document processor."""
@@ -425,6 +986,11 @@ class DocumentProcessor:
             # Split into chunks
             chunks = self._split_text_into_chunks(clean_text, chunk_size, chunk_overlap)
             
+            # Embed all chunks in one batch so callers can skip re-encoding
+            embeddings = None
+            if self._vector_store and self._vector_store.embedding_model:
+                embeddings = await self._vector_store.encode_batch(chunks)
+            
             # Prepare documents
             documents = []
             for i, chunk in enumerate(chunks):
@@ -435,10 +1001,13 @@ class DocumentProcessor:
                     "chunk_size": len(chunk)
                 })
                 
-                documents.append({
+                document = {
                     "content": chunk,
                     "metadata": chunk_metadata
-                })
+                }
+                if embeddings is not None:
+                    document["embedding"] = embeddings[i]
+                documents.append(document)
             
             return documents
             
@@ -446,6 +1015,32 @@ class DocumentProcessor:
             logger.error("Failed to process document", error=str(e))
             return []
     
+    async def add_text_document(
+        self,
+        text: str,
+        metadata: Dict[str, Any],
+        chunk_size: int = 500,
+        chunk_overlap: int = 50
+    ) -> List[str]:
+        """Chunk, redact and embed a document, then store every chunk in one bulk add."""
+        if not self._vector_store:
+            raise RuntimeError("Document processor has no vector store")
+        
+        documents = await self.process_text_document(text, metadata, chunk_size, chunk_overlap)
+        if not documents or "embedding" not in documents[0]:
+            logger.warning("Document not added, no chunks or embeddings", chunks=len(documents))
+            return []
+        
+        return await self._vector_store.add_documents_bulk(
+            [document["content"] for document in documents],
+            np.stack([document["embedding"] for document in documents]),
+            [document["metadata"] for document in documents]
+        )
+    
+    async def cleanup(self) -> None:
+        """Cleanup document processor."""
+        self._vector_store = None
+    
     def _split_text_into_chunks(
         self,
         text: str,
@@ -465,12 +1060,12 @@ class DocumentProcessor:
             # If this is not the last chunk and we're in the middle of a word,
             # try to end at a sentence or word boundary
             if end < len(text):
-                # Look for sentence boundaries (. ! ?)
-                sentence_end = text.rfind('.', start, end)
-                if sentence_end == -1:
-                    sentence_end = text.rfind('!', start, end)
-                if sentence_end == -1:
-                    sentence_end = text.rfind('?', start, end)
+                # Look for the last sentence boundary (. ! ?)
+                sentence_end = max(
+                    text.rfind('.', start, end),
+                    text.rfind('!', start, end),
+                    text.rfind('?', start, end)
+                )
                 
                 if sentence_end != -1 and sentence_end > start + chunk_size // 2:
                     end = sentence_end + 1
@@ -3,379 +3,669 @@ Configuration Management for MedinovAI Chatbot
 Handles all environment variables and settings with validation
 """
 
-from functools import lru_cache
-from typing import List, Optional, Dict, Any
-from pydantic import BaseSettings, Field, validator, SecretStr
+from __future__ import annotations
+
+import sys
+import threading
+from functools import cached_property, lru_cache
+from typing import FrozenSet, Literal, Optional, Dict, Any, Tuple, Type, Union
+from dotenv import dotenv_values
+from pydantic import Field, HttpUrl, SecretStr, field_validator, model_validator
+from pydantic.fields import FieldInfo
+from pydantic_settings import BaseSettings, PydanticBaseSettingsSource, SettingsConfigDict
+
+__all__ = [
+    "Settings",
+    "TwilioSettings",
+    "CX3Settings",
+    "MattermostSettings",
+    "AWSSettings",
+    "MCPSettings",
+    "AzureOpenAISettings",
+    "CustomModelSettings",
+    "OAuth2Settings",
+    "get_settings",
+]
+
+# Raw env values that switch a subsystem off
+_DISABLED_VALUES = frozenset({"false", "0", "no", "off"})
+
+# Shared by Settings and every settings group; parsed once per process
+ENV_FILE = ".env"
+
+# String values up to this length are interned (channel names, endpoints, voices)
+INTERN_MAX_LENGTH = 64
+
+
+def _intern_short_strings(model: BaseSettings) -> None:
+    """Replace short string field values with their interned copies."""
+    for name in type(model).model_fields:
+        value = getattr(model, name)
+        if type(value) is str and len(value) < INTERN_MAX_LENGTH:
+            object.__setattr__(model, name, sys.intern(value))
+
+
+@lru_cache(maxsize=None)
+def _dotenv_vars() -> Dict[str, Optional[str]]:
+    """Variables from the .env file, parsed once per process (names lower-cased)."""
+    return {name.lower(): value for name, value in dotenv_values(ENV_FILE, encoding="utf-8").items()}
+
+
+class _SharedDotEnvSource(PydanticBaseSettingsSource):
+    """Dotenv source reading the shared parse of ENV_FILE (case-insensitive names)."""
+    
+    def get_field_value(self, field: FieldInfo, field_name: str) -> Tuple[Any, str, bool]:
+        if isinstance(field.validation_alias, str):
+            field_key = env_name = field.validation_alias
+        else:
+            field_key = field_name
+            env_name = self.config.get("env_prefix", "") + field_name
+        return _dotenv_vars().get(env_name.lower()), field_key, self.field_is_complex(field)
+    
+    def __call__(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {}
+        for field_name, field in self.settings_cls.model_fields.items():
+            value, field_key, value_is_complex = self.get_field_value(field, field_name)
+            if value is not None:
+                data[field_key] = self.prepare_field_value(field_name, field, value, value_is_complex)
+        return data
+
+
+def _settings_sources(
+    settings_cls: Type[BaseSettings],
+    init_settings: PydanticBaseSettingsSource,
+    env_settings: PydanticBaseSettingsSource,
+    file_secret_settings: PydanticBaseSettingsSource,
+) -> Tuple[PydanticBaseSettingsSource, ...]:
+    """Default source order, with the shared dotenv source in place of a per-class parse."""
+    return (init_settings, env_settings, _SharedDotEnvSource(settings_cls), file_secret_settings)
+
+
+class _SettingsGroup(BaseSettings):
+    """Base for subsystem settings groups, validated on first access."""
+    
+    model_config = SettingsConfigDict(
+        env_file=ENV_FILE,
+        env_file_encoding="utf-8",
+        case_sensitive=False,
+        extra="ignore",
+        frozen=True
+    )
+    
+    @classmethod
+    def settings_customise_sources(
+        cls,
+        settings_cls: Type[BaseSettings],
+        init_settings: PydanticBaseSettingsSource,
+        env_settings: PydanticBaseSettingsSource,
+        dotenv_settings: PydanticBaseSettingsSource,
+        file_secret_settings: PydanticBaseSettingsSource,
+    ) -> Tuple[PydanticBaseSettingsSource, ...]:
+        return _settings_sources(settings_cls, init_settings, env_settings, file_secret_settings)
+    
+    def model_post_init(self, __context: Any) -> None:
+        _intern_short_strings(self)
+
+
+class TwilioSettings(_SettingsGroup):
+    """Twilio SMS/voice settings (TWILIO_*)."""
+    
+    model_config = SettingsConfigDict(env_prefix="TWILIO_")
+    
+    account_sid: Optional[str] = None
+    auth_token: Optional[SecretStr] = None
+    phone_number: Optional[str] = None
+    webhook_url: Optional[HttpUrl] = None
+    
+    # Voice Configuration
+    voice_enabled: bool = True
+    tts_voice: str = "Polly.Joanna"
+    speech_timeout: int = 5
+    speech_model: str = "default"
+    
+    # SMS Configuration
+    sms_enabled: bool = True
+    
+    @model_validator(mode="before")
+    @classmethod
+    def _skip_disabled(cls, data: Any) -> Any:
+        """Drop credential values when both SMS and voice are switched off."""
+        if not isinstance(data, dict):
+            return data
+        if (
+            str(data.get("sms_enabled", "true")).lower() in _DISABLED_VALUES
+            and str(data.get("voice_enabled", "true")).lower() in _DISABLED_VALUES
+        ):
+            return {"sms_enabled": False, "voice_enabled": False}
+        return data
+    
+    @cached_property
+    def _auth_token_plain(self) -> Optional[str]:
+        return self.auth_token.get_secret_value() if self.auth_token else None
+    
+    @cached_property
+    def config(self) -> Optional[Dict[str, Any]]:
+        """Twilio configuration, built on first use."""
+        if not self.account_sid or not self.auth_token:
+            return None
+        
+        return {
+            "account_sid": self.account_sid,
+            "auth_token": self._auth_token_plain,
+            "phone_number": self.phone_number,
+            "webhook_url": str(self.webhook_url) if self.webhook_url else None,
+            "voice_enabled": self.voice_enabled,
+            "sms_enabled": self.sms_enabled
+        }
+
+
+class CX3Settings(_SettingsGroup):
+    """3CX phone system settings (CX3_*)."""
+    
+    model_config = SettingsConfigDict(env_prefix="CX3_")
+    
+    server_url: Optional[HttpUrl] = None
+    username: Optional[str] = None
+    password: Optional[SecretStr] = None
+    sip_extension: Optional[str] = None
+    api_token: Optional[SecretStr] = None
+
+
+class MattermostSettings(_SettingsGroup):
+    """Mattermost integration settings (MATTERMOST_*)."""
+    
+    model_config = SettingsConfigDict(env_prefix="MATTERMOST_")
+    
+    url: Optional[HttpUrl] = None
+    token: Optional[SecretStr] = None
+    team_id: Optional[str] = None
+    bot_username: str = "medinovai-assistant"
+    
+    # Escalation Channels
+    escalation_channel: str = "support-escalation"
+    ai_console_channel: str = "ai-console"
+    csr_ops_channel: str = "csr-ops"
+    
+    @cached_property
+    def _token_plain(self) -> Optional[str]:
+        return self.token.get_secret_value() if self.token else None
+    
+    @cached_property
+    def config(self) -> Optional[Dict[str, Any]]:
+        """Mattermost configuration, built on first use."""
+        if not self.url or not self.token:
+            return None
+        
+        return {
+            "url": str(self.url),
+            "token": self._token_plain,
+            "team_id": self.team_id,
+            "bot_username": self.bot_username,
+            "channels": {
+                "escalation": self.escalation_channel,
+                "ai_console": self.ai_console_channel,
+                "csr_ops": self.csr_ops_channel
+            }
+        }
+
+
+class AWSSettings(_SettingsGroup):
+    """AWS service settings (AWS_*)."""
+    
+    model_config = SettingsConfigDict(env_prefix="AWS_")
+    
+    region: str = "us-east-1"
+    access_key_id: Optional[str] = None
+    secret_access_key: Optional[SecretStr] = None
+    
+    # KMS for Encryption
+    kms_key_id: Optional[str] = None
+    
+    # Secrets Manager
+    secrets_manager_arn: Optional[str] = None
+    
+    # S3 for Document Storage
+    s3_bucket: Optional[str] = None
+    s3_region: Optional[str] = None
+    
+    # CloudWatch Logging
+    cloudwatch_log_group: Optional[str] = None
+    cloudwatch_enabled: bool = False
+
+
+class MCPSettings(_SettingsGroup):
+    """MCP API integration settings (MCP_*)."""
+    
+    model_config = SettingsConfigDict(env_prefix="MCP_")
+    
+    api_enabled: bool = True
+    api_base_url: Optional[HttpUrl] = None
+    api_key: Optional[SecretStr] = None
+    api_version: str = "v1"
+    api_timeout: int = 30
+    
+    # Specific MCP Endpoints
+    orders_endpoint: str = "/api/v1/orders"
+    appointments_endpoint: str = "/api/v1/appointments"
+    patients_endpoint: str = "/api/v1/patients"
+    providers_endpoint: str = "/api/v1/providers"
+
+
+class AzureOpenAISettings(_SettingsGroup):
+    """Azure OpenAI settings (AZURE_OPENAI_*)."""
+    
+    model_config = SettingsConfigDict(env_prefix="AZURE_OPENAI_")
+    
+    endpoint: Optional[HttpUrl] = None
+    api_key: Optional[SecretStr] = None
+    deployment_name: Optional[str] = None
+    
+    @cached_property
+    def _api_key_plain(self) -> Optional[str]:
+        return self.api_key.get_secret_value() if self.api_key else None
+
+
+class CustomModelSettings(_SettingsGroup):
+    """Self-hosted model settings (CUSTOM_MODEL_*)."""
+    
+    model_config = SettingsConfigDict(env_prefix="CUSTOM_MODEL_")
+    
+    endpoint: Optional[HttpUrl] = None
+    api_key: Optional[SecretStr] = None
+    
+    @cached_property
+    def _api_key_plain(self) -> Optional[str]:
+        return self.api_key.get_secret_value() if self.api_key else None
+
+
+class OAuth2Settings(_SettingsGroup):
+    """OAuth2 login settings (OAUTH2_*)."""
+    
+    model_config = SettingsConfigDict(env_prefix="OAUTH2_")
+    
+    provider: str = "google"
+    client_id: Optional[str] = None
+    client_secret: Optional[SecretStr] = None
+    redirect_uri: Optional[HttpUrl] = None
 
 
 class Settings(BaseSettings):
     """Application settings with environment variable support."""
     
+    model_config = SettingsConfigDict(
+        env_file=ENV_FILE,
+        env_file_encoding="utf-8",
+        case_sensitive=False,
+        extra="ignore",
+        frozen=True
+    )
+    
     # =============================================================================
     # ENVIRONMENT CONFIGURATION
     # =============================================================================
-    environment: str = Field(default="development", env="NODE_ENV")
-    log_level: str = Field(default="INFO", env="LOG_LEVEL")
-    debug: bool = Field(default=False, env="DEBUG")
-    development_mode: bool = Field(default=True)
+    environment: Literal["development", "staging", "production"] = Field(
+        default="development", validation_alias="NODE_ENV"
+    )
+    log_level: Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"] = "INFO"
+    debug: bool = False
     
     # =============================================================================
     # AI MODEL CONFIGURATION
     # =============================================================================
-    ai_provider: str = Field(default="openai", env="AI_PROVIDER")
-    openai_api_key: SecretStr = Field(env="OPENAI_API_KEY")
-    ai_model: str = Field(default="gpt-4", env="AI_MODEL")
-    ai_temperature: float = Field(default=0.7, env="AI_TEMPERATURE")
-    ai_max_tokens: int = Field(default=2048, env="AI_MAX_TOKENS")
-    
-    # Azure OpenAI Configuration
-    azure_openai_endpoint: Optional[str] = Field(
-        None, env="AZURE_OPENAI_ENDPOINT"
-    )
-    azure_openai_api_key: Optional[SecretStr] = Field(
-        None, env="AZURE_OPENAI_API_KEY"
-    )
-    azure_openai_deployment_name: Optional[str] = Field(
-        None, env="AZURE_OPENAI_DEPLOYMENT_NAME"
-    )
-    
-    # Custom Model Configuration
-    custom_model_endpoint: Optional[str] = Field(
-        None, env="CUSTOM_MODEL_ENDPOINT"
-    )
-    custom_model_api_key: Optional[SecretStr] = Field(
-        None, env="CUSTOM_MODEL_API_KEY"
-    )
+    ai_provider: Literal["openai", "azure", "anthropic", "custom"] = "openai"
+    openai_api_key: SecretStr
+    ai_model: str = "gpt-4"
+    ai_temperature: float = 0.7
+    ai_max_tokens: int = 2048
+    # Azure OpenAI and custom model settings in AzureOpenAISettings / CustomModelSettings
     
     # =============================================================================
     # LANGUAGE & LOCALIZATION
     # =============================================================================
-    default_language: str = Field(default="en", env="DEFAULT_LANGUAGE")
-    supported_languages: List[str] = Field(
-        default=["en", "es", "zh", "hi"], env="SUPPORTED_LANGUAGES"
-    )
-    auto_detect_language: bool = Field(
-        default=True, env="AUTO_DETECT_LANGUAGE"
-    )
-    translation_api_key: Optional[SecretStr] = Field(
-        None, env="TRANSLATION_API_KEY"
-    )
+    default_language: str = "en"
+    # str is accepted so comma-separated env values reach the validator
+    supported_languages: Union[FrozenSet[str], str] = frozenset({"en", "es", "zh", "hi"})
+    auto_detect_language: bool = True
+    translation_api_key: Optional[SecretStr] = None
     
     # =============================================================================
-    # TWILIO CONFIGURATION
+    # TWILIO CONFIGURATION (provider settings in TwilioSettings)
     # =============================================================================
-    twilio_account_sid: Optional[str] = Field(None, env="TWILIO_ACCOUNT_SID")
-    twilio_auth_token: Optional[SecretStr] = Field(None, env="TWILIO_AUTH_TOKEN")
-    twilio_phone_number: Optional[str] = Field(None, env="TWILIO_PHONE_NUMBER")
-    twilio_webhook_url: Optional[str] = Field(None, env="TWILIO_WEBHOOK_URL")
-    
-    # Voice Configuration
-    twilio_voice_enabled: bool = Field(default=True, env="TWILIO_VOICE_ENABLED")
-    twilio_tts_voice: str = Field(default="Polly.Joanna", env="TWILIO_TTS_VOICE")
-    twilio_speech_timeout: int = Field(default=5, env="TWILIO_SPEECH_TIMEOUT")
-    twilio_speech_model: str = Field(default="default", env="TWILIO_SPEECH_MODEL")
-    
-    # SMS Configuration
-    twilio_sms_enabled: bool = Field(default=True, env="TWILIO_SMS_ENABLED")
-    sms_otp_expiry: int = Field(default=300, env="SMS_OTP_EXPIRY")
-    sms_max_retry: int = Field(default=3, env="SMS_MAX_RETRY")
+    sms_otp_expiry: int = 300
+    sms_max_retry: int = 3
     
     # =============================================================================
-    # 3CX PHONE SYSTEM INTEGRATION
+    # 3CX PHONE SYSTEM INTEGRATION (connection settings in CX3Settings)
     # =============================================================================
-    cx3_enabled: bool = Field(default=True, env="CX3_ENABLED")
-    cx3_server_url: Optional[str] = Field(None, env="CX3_SERVER_URL")
-    cx3_username: Optional[str] = Field(None, env="CX3_USERNAME")
-    cx3_password: Optional[SecretStr] = Field(None, env="CX3_PASSWORD")
-    cx3_sip_extension: Optional[str] = Field(None, env="CX3_SIP_EXTENSION")
-    cx3_api_token: Optional[SecretStr] = Field(None, env="CX3_API_TOKEN")
+    cx3_enabled: bool = True
     
     # =============================================================================
-    # MATTERMOST INTEGRATION
+    # MATTERMOST INTEGRATION (connection settings in MattermostSettings)
     # =============================================================================
-    mattermost_enabled: bool = Field(default=True, env="MATTERMOST_ENABLED")
-    mattermost_url: Optional[str] = Field(None, env="MATTERMOST_URL")
-    mattermost_token: Optional[SecretStr] = Field(None, env="MATTERMOST_TOKEN")
-    mattermost_team_id: Optional[str] = Field(None, env="MATTERMOST_TEAM_ID")
-    mattermost_bot_username: str = Field(default="medinovai-assistant", env="MATTERMOST_BOT_USERNAME")
-    
-    # Escalation Channels
-    mattermost_escalation_channel: str = Field(default="support-escalation", env="MATTERMOST_ESCALATION_CHANNEL")
-    mattermost_ai_console_channel: str = Field(default="ai-console", env="MATTERMOST_AI_CONSOLE_CHANNEL")
-    mattermost_csr_ops_channel: str = Field(default="csr-ops", env="MATTERMOST_CSR_OPS_CHANNEL")
+    mattermost_enabled: bool = True
     
     # Presence Detection
-    presence_check_interval: int = Field(default=60, env="PRESENCE_CHECK_INTERVAL")
-    auto_reassign_timeout: int = Field(default=300, env="AUTO_REASSIGN_TIMEOUT")
-    max_concurrent_chats: int = Field(default=5, env="MAX_CONCURRENT_CHATS")
+    presence_check_interval: int = 60
+    auto_reassign_timeout: int = 300
+    max_concurrent_chats: int = 5
     
     # =============================================================================
     # DATABASE CONFIGURATION
     # =============================================================================
-    database_url: str = Field(env="DATABASE_URL")
-    database_pool_size: int = Field(default=10, env="DATABASE_POOL_SIZE")
-    database_timeout: int = Field(default=30, env="DATABASE_TIMEOUT")
+    database_url: str
+    database_pool_size: int = 20
+    database_max_overflow: int = 20
+    audit_database_url: Optional[str] = None  # INSERT-only role for audit writes
+    database_timeout: int = 30
+    database_pgbouncer_mode: bool = False  # connecting through a transaction pooler
     
     # Vector Database for RAG
-    vector_db_provider: str = Field(default="chroma", env="VECTOR_DB_PROVIDER")
-    vector_db_url: str = Field(default="http://localhost:8000", env="VECTOR_DB_URL")
-    vector_db_collection: str = Field(default="medinovai_docs", env="VECTOR_DB_COLLECTION")
-    vector_embedding_model: str = Field(
-        default="sentence-transformers/all-MiniLM-L6-v2", 
-        env="VECTOR_EMBEDDING_MODEL"
-    )
+    vector_db_provider: str = "chroma"
+    vector_db_url: HttpUrl = Field(default="http://localhost:8000", validate_default=True)
+    vector_db_collection: str = "medinovai_docs"
+    vector_embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"
+    embedding_backend: str = "onnx"  # torch, onnx, openvino
+    embedding_dtype: str = "float16"  # float16, float32
+    vector_store_persist_path: Optional[str] = None
     
     # Redis for Caching
-    redis_url: str = Field(default="redis://localhost:6379/0", env="REDIS_URL")
-    redis_ttl: int = Field(default=3600, env="REDIS_TTL")
+    redis_url: str = "redis://localhost:6379/0"
+    redis_ttl: int = 3600
     
     # =============================================================================
-    # AWS SERVICES CONFIGURATION
+    # AWS SERVICES CONFIGURATION (service settings in AWSSettings)
     # =============================================================================
-    aws_region: str = Field(default="us-east-1", env="AWS_REGION")
-    aws_access_key_id: Optional[str] = Field(None, env="AWS_ACCESS_KEY_ID")
-    aws_secret_access_key: Optional[SecretStr] = Field(None, env="AWS_SECRET_ACCESS_KEY")
-    
-    # KMS for Encryption
-    aws_kms_key_id: Optional[str] = Field(None, env="AWS_KMS_KEY_ID")
-    encryption_key: Optional[SecretStr] = Field(None, env="ENCRYPTION_KEY")
-    
-    # Secrets Manager
-    aws_secrets_manager_arn: Optional[str] = Field(None, env="AWS_SECRETS_MANAGER_ARN")
-    use_aws_secrets: bool = Field(default=False, env="USE_AWS_SECRETS")
-    
-    # S3 for Document Storage
-    aws_s3_bucket: Optional[str] = Field(None, env="AWS_S3_BUCKET")
-    aws_s3_region: Optional[str] = Field(None, env="AWS_S3_REGION")
-    
-    # CloudWatch Logging
-    aws_cloudwatch_log_group: Optional[str] = Field(None, env="AWS_CLOUDWATCH_LOG_GROUP")
-    aws_cloudwatch_enabled: bool = Field(default=False, env="AWS_CLOUDWATCH_ENABLED")
+    encryption_key: Optional[SecretStr] = None
+    use_aws_secrets: bool = False
     
     # =============================================================================
     # AUTHENTICATION CONFIGURATION
     # =============================================================================
-    auth_primary_method: str = Field(default="sms", env="AUTH_PRIMARY_METHOD")
-    auth_fallback_enabled: bool = Field(default=True, env="AUTH_FALLBACK_ENABLED")
-    auth_session_timeout: int = Field(default=3600, env="AUTH_SESSION_TIMEOUT")
+    auth_primary_method: str = "sms"
+    auth_fallback_enabled: bool = True
+    auth_session_timeout: int = 3600
     
     # SMS Authentication
-    sms_verification_enabled: bool = Field(default=True, env="SMS_VERIFICATION_ENABLED")
-    sms_otp_length: int = Field(default=6, env="SMS_OTP_LENGTH")
+    sms_verification_enabled: bool = True
+    sms_otp_length: int = 6
     
-    # OAuth2 Configuration
-    oauth2_enabled: bool = Field(default=True, env="OAUTH2_ENABLED")
-    oauth2_provider: str = Field(default="google", env="OAUTH2_PROVIDER")
-    oauth2_client_id: Optional[str] = Field(None, env="OAUTH2_CLIENT_ID")
-    oauth2_client_secret: Optional[SecretStr] = Field(None, env="OAUTH2_CLIENT_SECRET")
-    oauth2_redirect_uri: Optional[str] = Field(None, env="OAUTH2_REDIRECT_URI")
+    # OAuth2 Configuration (client settings in OAuth2Settings)
+    oauth2_enabled: bool = True
     
     # JWT Configuration
-    jwt_secret: SecretStr = Field(env="JWT_SECRET")
-    jwt_expiry: int = Field(default=3600, env="JWT_EXPIRY")
-    jwt_refresh_expiry: int = Field(default=604800, env="JWT_REFRESH_EXPIRY")
-    
-    # =============================================================================
-    # MCP API INTEGRATION
-    # =============================================================================
-    mcp_api_enabled: bool = Field(default=True, env="MCP_API_ENABLED")
-    mcp_api_base_url: Optional[str] = Field(None, env="MCP_API_BASE_URL")
-    mcp_api_key: Optional[SecretStr] = Field(None, env="MCP_API_KEY")
-    mcp_api_version: str = Field(default="v1", env="MCP_API_VERSION")
-    mcp_api_timeout: int = Field(default=30, env="MCP_API_TIMEOUT")
-    
-    # Specific MCP Endpoints
-    mcp_orders_endpoint: str = Field(default="/api/v1/orders", env="MCP_ORDERS_ENDPOINT")
-    mcp_appointments_endpoint: str = Field(default="/api/v1/appointments", env="MCP_APPOINTMENTS_ENDPOINT")
-    mcp_patients_endpoint: str = Field(default="/api/v1/patients", env="MCP_PATIENTS_ENDPOINT")
-    mcp_providers_endpoint: str = Field(default="/api/v1/providers", env="MCP_PROVIDERS_ENDPOINT")
+    jwt_secret: SecretStr
+    jwt_expiry: int = 3600
+    jwt_refresh_expiry: int = 604800
     
     # =============================================================================
     # SECURITY & COMPLIANCE
     # =============================================================================
     # HIPAA Compliance
-    phi_redaction_enabled: bool = Field(default=True, env="PHI_REDACTION_ENABLED")
-    phi_detection_service: str = Field(default="aws-comprehend", env="PHI_DETECTION_SERVICE")
-    audit_logging_enabled: bool = Field(default=True, env="AUDIT_LOGGING_ENABLED")
-    audit_log_retention_days: int = Field(default=2555, env="AUDIT_LOG_RETENTION_DAYS")  # 7 years
+    phi_redaction_enabled: bool = True
+    phi_detection_service: str = "aws-comprehend"
+    audit_logging_enabled: bool = True
+    audit_log_retention_days: int = 2555  # 7 years
     
     # GDPR Compliance
-    gdpr_enabled: bool = Field(default=True, env="GDPR_ENABLED")
-    consent_required: bool = Field(default=True, env="CONSENT_REQUIRED")
-    data_retention_days: int = Field(default=365, env="DATA_RETENTION_DAYS")
-    right_to_erasure_enabled: bool = Field(default=True, env="RIGHT_TO_ERASURE_ENABLED")
+    gdpr_enabled: bool = True
+    consent_required: bool = True
+    data_retention_days: int = 365
+    right_to_erasure_enabled: bool = True
     
     # Rate Limiting
-    rate_limit_enabled: bool = Field(default=True, env="RATE_LIMIT_ENABLED")
-    rate_limit_requests_per_minute: int = Field(default=60, env="RATE_LIMIT_REQUESTS_PER_MINUTE")
-    rate_limit_burst_size: int = Field(default=10, env="RATE_LIMIT_BURST_SIZE")
+    rate_limit_enabled: bool = True
+    rate_limit_requests_per_minute: int = 60
+    rate_limit_burst_size: int = 10
     
     # Input Validation
-    input_max_length: int = Field(default=4096, env="INPUT_MAX_LENGTH")
-    input_validation_enabled: bool = Field(default=True, env="INPUT_VALIDATION_ENABLED")
-    xss_protection_enabled: bool = Field(default=True, env="XSS_PROTECTION_ENABLED")
+    input_max_length: int = 4096
+    input_validation_enabled: bool = True
+    xss_protection_enabled: bool = True
     
     # =============================================================================
     # MONITORING & ANALYTICS
     # =============================================================================
     # Prometheus Metrics
-    prometheus_enabled: bool = Field(default=True, env="PROMETHEUS_ENABLED")
-    prometheus_port: int = Field(default=9090, env="PROMETHEUS_PORT")
-    metrics_endpoint: str = Field(default="/metrics", env="METRICS_ENDPOINT")
+    prometheus_enabled: bool = True
+    prometheus_port: int = 9090
+    metrics_endpoint: str = "/metrics"
     
     # Health Checks
-    health_check_enabled: bool = Field(default=True, env="HEALTH_CHECK_ENABLED")
-    health_check_interval: int = Field(default=60, env="HEALTH_CHECK_INTERVAL")
-    health_check_timeout: int = Field(default=10, env="HEALTH_CHECK_TIMEOUT")
+    health_check_enabled: bool = True
+    health_check_interval: int = 60
+    health_check_timeout: int = 10
     
     # Performance Monitoring
-    performance_monitoring_enabled: bool = Field(default=True, env="PERFORMANCE_MONITORING_ENABLED")
-    response_time_threshold: int = Field(default=3000, env="RESPONSE_TIME_THRESHOLD")
-    error_rate_threshold: int = Field(default=5, env="ERROR_RATE_THRESHOLD")
+    performance_monitoring_enabled: bool = True
+    response_time_threshold: int = 3000
+    error_rate_threshold: int = 5
     
     # Analytics
-    analytics_enabled: bool = Field(default=True, env="ANALYTICS_ENABLED")
-    analytics_retention_days: int = Field(default=90, env="ANALYTICS_RETENTION_DAYS")
-    daily_report_enabled: bool = Field(default=True, env="DAILY_REPORT_ENABLED")
-    weekly_report_enabled: bool = Field(default=True, env="WEEKLY_REPORT_ENABLED")
-    monthly_report_enabled: bool = Field(default=True, env="MONTHLY_REPORT_ENABLED")
+    analytics_enabled: bool = True
+    analytics_retention_days: int = 90
+    daily_report_enabled: bool = True
+    weekly_report_enabled: bool = True
+    monthly_report_enabled: bool = True
     
     # =============================================================================
     # SERVER CONFIGURATION
     # =============================================================================
     # API Server
-    api_host: str = Field(default="0.0.0.0", env="API_HOST")
-    api_port: int = Field(default=8000, env="API_PORT")
-    api_workers: int = Field(default=4, env="API_WORKERS")
-    api_timeout: int = Field(default=60, env="API_TIMEOUT")
+    api_host: str = "0.0.0.0"
+    api_port: int = 8000
+    api_workers: int = 4
+    api_timeout: int = 60
     
     # WebSocket Server
-    websocket_enabled: bool = Field(default=True, env="WEBSOCKET_ENABLED")
-    websocket_port: int = Field(default=8001, env="WEBSOCKET_PORT")
-    websocket_max_connections: int = Field(default=1000, env="WEBSOCKET_MAX_CONNECTIONS")
+    websocket_enabled: bool = True
+    websocket_port: int = 8001
+    websocket_max_connections: int = 1000
+    websocket_shard_count: int = 1
     
     # Admin UI Server
-    admin_ui_port: int = Field(default=3000, env="ADMIN_UI_PORT")
-    admin_ui_host: str = Field(default="0.0.0.0", env="ADMIN_UI_HOST")
+    admin_ui_port: int = 3000
+    admin_ui_host: str = "0.0.0.0"
     
     # =============================================================================
     # FEATURE FLAGS
     # =============================================================================
     # Core Features
-    chat_enabled: bool = Field(default=True, env="CHAT_ENABLED")
-    sms_enabled: bool = Field(default=True, env="SMS_ENABLED")
-    voice_enabled: bool = Field(default=True, env="VOICE_ENABLED")
+    chat_enabled: bool = True
+    sms_enabled: bool = True
+    voice_enabled: bool = True
     
     # Advanced Features
-    rag_enabled: bool = Field(default=True, env="RAG_ENABLED")
-    voice_biometrics_enabled: bool = Field(default=False, env="VOICE_BIOMETRICS_ENABLED")
-    sentiment_analysis_enabled: bool = Field(default=True, env="SENTIMENT_ANALYSIS_ENABLED")
-    auto_escalation_enabled: bool = Field(default=True, env="AUTO_ESCALATION_ENABLED")
+    rag_enabled: bool = True
+    voice_biometrics_enabled: bool = False
+    sentiment_analysis_enabled: bool = True
+    auto_escalation_enabled: bool = True
     
     # Experimental Features
-    ai_coaching_enabled: bool = Field(default=False, env="AI_COACHING_ENABLED")
-    predictive_routing_enabled: bool = Field(default=False, env="PREDICTIVE_ROUTING_ENABLED")
-    voice_cloning_enabled: bool = Field(default=False, env="VOICE_CLONING_ENABLED")
+    ai_coaching_enabled: bool = False
+    predictive_routing_enabled: bool = False
+    voice_cloning_enabled: bool = False
+    
+    @classmethod
+    def settings_customise_sources(
+        cls,
+        settings_cls: Type[BaseSettings],
+        init_settings: PydanticBaseSettingsSource,
+        env_settings: PydanticBaseSettingsSource,
+        dotenv_settings: PydanticBaseSettingsSource,
+        file_secret_settings: PydanticBaseSettingsSource,
+    ) -> Tuple[PydanticBaseSettingsSource, ...]:
+        return _settings_sources(settings_cls, init_settings, env_settings, file_secret_settings)
+    
+    def model_post_init(self, __context: Any) -> None:
+        _intern_short_strings(self)
+        # Resolve the provider branch now so get_ai_config() never builds on a request
+        self.__dict__["_ai_config"] = self._build_ai_config()
+    
+    # =============================================================================
+    # SUBSYSTEM GROUPS (validated on first access only)
+    # =============================================================================
+    @cached_property
+    def twilio(self) -> TwilioSettings:
+        """Twilio settings."""
+        return TwilioSettings()
+    
+    @cached_property
+    def cx3(self) -> CX3Settings:
+        """3CX settings (defaults only, never read from env, when disabled)."""
+        if not self.cx3_enabled:
+            return CX3Settings.model_construct()
+        return CX3Settings()
+    
+    @cached_property
+    def mattermost(self) -> MattermostSettings:
+        """Mattermost settings (defaults only, never read from env, when disabled)."""
+        if not self.mattermost_enabled:
+            return MattermostSettings.model_construct()
+        return MattermostSettings()
+    
+    @cached_property
+    def aws(self) -> AWSSettings:
+        """AWS settings."""
+        return AWSSettings()
+    
+    @cached_property
+    def mcp(self) -> MCPSettings:
+        """MCP API settings."""
+        return MCPSettings()
+    
+    @cached_property
+    def azure_openai(self) -> AzureOpenAISettings:
+        """Azure OpenAI settings."""
+        return AzureOpenAISettings()
+    
+    @cached_property
+    def custom_model(self) -> CustomModelSettings:
+        """Self-hosted model settings."""
+        return CustomModelSettings()
+    
+    @cached_property
+    def oauth2(self) -> OAuth2Settings:
+        """OAuth2 settings (defaults only, never read from env, when disabled)."""
+        if not self.oauth2_enabled:
+            return OAuth2Settings.model_construct()
+        return OAuth2Settings()
     
     # =============================================================================
     # COMPUTED PROPERTIES
     # =============================================================================
     @property
-    def cors_origins(self) -> List[str]:
+    def development_mode(self) -> bool:
+        """Whether running in the development environment."""
+        return self.environment == "development"
+    
+    @cached_property
+    def cors_origins(self) -> Tuple[str, ...]:
         """Get CORS origins based on environment."""
         if self.development_mode:
-            return [
+            return (
                 "http://localhost:3000",
                 "http://localhost:3001",
                 "http://127.0.0.1:3000",
                 "http://127.0.0.1:3001"
-            ]
-        return [
+            )
+        return (
             "https://chat.myonsitehealthcare.com",
             "https://admin.myonsitehealthcare.com"
-        ]
+        )
     
-    @property
-    def allowed_hosts(self) -> List[str]:
+    @cached_property
+    def allowed_hosts(self) -> Tuple[str, ...]:
         """Get allowed hosts based on environment."""
         if self.development_mode:
-            return ["*"]
-        return [
+            return ("*",)
+        return (
             "api.myonsitehealthcare.com",
             "chat.myonsitehealthcare.com",
             "admin.myonsitehealthcare.com"
-        ]
+        )
     
     @property
     def session_secret_key(self) -> str:
         """Get session secret key."""
-        return self.jwt_secret.get_secret_value()
+        return self._jwt_secret_plain
     
     @property
     def session_max_age(self) -> int:
         """Get session max age."""
         return self.auth_session_timeout
     
+    # =============================================================================
+    # SECRET VALUES (unwrapped on first use only)
+    # =============================================================================
+    @cached_property
+    def _jwt_secret_plain(self) -> str:
+        return self.jwt_secret.get_secret_value()
+    
+    @cached_property
+    def _openai_api_key_plain(self) -> str:
+        return self.openai_api_key.get_secret_value()
+    
     # =============================================================================
     # VALIDATORS
     # =============================================================================
-    @validator("supported_languages", pre=True)
+    @field_validator("supported_languages", mode="before")
+    @classmethod
     def parse_supported_languages(cls, v):
-        """Parse supported languages from string or list."""
+        """Parse supported languages from string or list into a set."""
         if isinstance(v, str):
-            return [lang.strip() for lang in v.split(",")]
-        return v
-    
-    @validator("environment")
-    def validate_environment(cls, v):
-        """Validate environment value."""
-        allowed = ["development", "staging", "production"]
-        if v not in allowed:
-            raise ValueError(f"Environment must be one of: {allowed}")
-        return v
-    
-    @validator("ai_provider")
-    def validate_ai_provider(cls, v):
-        """Validate AI provider."""
-        allowed = ["openai", "azure", "anthropic", "custom"]
-        if v not in allowed:
-            raise ValueError(f"AI provider must be one of: {allowed}")
-        return v
-    
-    @validator("log_level")
-    def validate_log_level(cls, v):
-        """Validate log level."""
-        allowed = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
-        if v.upper() not in allowed:
-            raise ValueError(f"Log level must be one of: {allowed}")
-        return v.upper()
-    
-    @validator("development_mode", always=True)
-    def set_development_mode(cls, v, values):
-        """Set development mode based on environment."""
-        environment = values.get("environment", "development")
-        return environment == "development"
+            return frozenset(lang.strip() for lang in v.split(","))
+        return frozenset(v)
+    
+    @field_validator("log_level", mode="before")
+    @classmethod
+    def normalize_log_level(cls, v):
+        """Accept log levels in any case."""
+        return v.upper() if isinstance(v, str) else v
     
     # =============================================================================
     # CONFIGURATION METHODS
     # =============================================================================
     def get_database_config(self) -> Dict[str, Any]:
-        """Get database configuration."""
+        """Get database configuration (built once; treat as read-only)."""
+        return self._database_config
+    
+    def get_redis_config(self) -> Dict[str, Any]:
+        """Get Redis configuration (built once; treat as read-only)."""
+        return self._redis_config
+    
+    def get_ai_config(self) -> Dict[str, Any]:
+        """Get AI configuration (built once; treat as read-only)."""
+        return self._ai_config
+    
+    def get_twilio_config(self) -> Optional[Dict[str, Any]]:
+        """Get Twilio configuration (built once; treat as read-only)."""
+        return self.twilio.config
+    
+    def get_mattermost_config(self) -> Optional[Dict[str, Any]]:
+        """Get Mattermost configuration (built once; treat as read-only)."""
+        if not self.mattermost_enabled:
+            return None
+        return self.mattermost.config
+    
+    @cached_property
+    def _database_config(self) -> Dict[str, Any]:
+        """Database configuration, built on first use."""
         return {
             "url": self.database_url,
             "pool_size": self.database_pool_size,
             "timeout": self.database_timeout
         }
     
-    def get_redis_config(self) -> Dict[str, Any]:
-        """Get Redis configuration."""
+    @cached_property
+    def _redis_config(self) -> Dict[str, Any]:
+        """Redis configuration, built on first use."""
         return {
             "url": self.redis_url,
             "ttl": self.redis_ttl
         }
     
-    def get_ai_config(self) -> Dict[str, Any]:
-        """Get AI configuration."""
+    def _build_ai_config(self) -> Dict[str, Any]:
+        """AI configuration for the configured provider, built at init."""
         config = {
             "provider": self.ai_provider,
             "model": self.ai_model,
@@ -384,59 +674,37 @@ class Settings(BaseSettings):
         }
         
         if self.ai_provider == "openai":
-            config["api_key"] = self.openai_api_key.get_secret_value()
+            config["api_key"] = self._openai_api_key_plain
         elif self.ai_provider == "azure":
             config.update({
-                "endpoint": self.azure_openai_endpoint,
-                "api_key": self.azure_openai_api_key.get_secret_value() if self.azure_openai_api_key else None,
-                "deployment_name": self.azure_openai_deployment_name
+                "endpoint": str(self.azure_openai.endpoint) if self.azure_openai.endpoint else None,
+                "api_key": self.azure_openai._api_key_plain,
+                "deployment_name": self.azure_openai.deployment_name
             })
         elif self.ai_provider == "custom":
             config.update({
-                "endpoint": self.custom_model_endpoint,
-                "api_key": self.custom_model_api_key.get_secret_value() if self.custom_model_api_key else None
+                "endpoint": str(self.custom_model.endpoint) if self.custom_model.endpoint else None,
+                "api_key": self.custom_model._api_key_plain
             })
         
         return config
-    
-    def get_twilio_config(self) -> Optional[Dict[str, Any]]:
-        """Get Twilio configuration."""
-        if not self.twilio_account_sid or not self.twilio_auth_token:
-            return None
-        
-        return {
-            "account_sid": self.twilio_account_sid,
-            "auth_token": self.twilio_auth_token.get_secret_value(),
-            "phone_number": self.twilio_phone_number,
-            "webhook_url": self.twilio_webhook_url,
-            "voice_enabled": self.twilio_voice_enabled,
-            "sms_enabled": self.twilio_sms_enabled
-        }
-    
-    def get_mattermost_config(self) -> Optional[Dict[str, Any]]:
-        """Get Mattermost configuration."""
-        if not self.mattermost_enabled or not self.mattermost_url or not self.mattermost_token:
-            return None
-        
-        return {
-            "url": self.mattermost_url,
-            "token": self.mattermost_token.get_secret_value(),
-            "team_id": self.mattermost_team_id,
-            "bot_username": self.mattermost_bot_username,
-            "channels": {
-                "escalation": self.mattermost_escalation_channel,
-                "ai_console": self.mattermost_ai_console_channel,
-                "csr_ops": self.mattermost_csr_ops_channel
-            }
-        }
-    
-    class Config:
-        env_file = ".env"
-        env_file_encoding = "utf-8"
-        case_sensitive = False
 
 
-@lru_cache()
+_settings: Optional[Settings] = None
+_settings_lock = threading.Lock()
+
+
 def get_settings() -> Settings:
     """Get cached settings instance."""
-    return Settings() 
\ No newline at end of file
+    global _settings
+    settings = _settings
+    if settings is None:
+        with _settings_lock:
+            if _settings is None:
+                _settings = Settings()
+            settings = _settings
+    return settings
+
+
+# Build at import so a preloading master validates once and workers inherit it
+get_settings() 
\ No newline at end of file
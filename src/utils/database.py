@@ -4,28 +4,213 @@ HIPAA-compliant database schema with audit logging and encryption
 """
 
 import asyncio
+import base64
+import functools
+import hashlib
+import json
+import os
+import re
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import List, Optional, Any, Dict
+from typing import AsyncIterator, List, Optional, Any, Dict, Tuple
 
+import asyncpg
 import structlog
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from sqlalchemy import (
-    Column, String, Integer, DateTime, Boolean, Text, JSON, 
-    ForeignKey, Enum as SQLEnum, Index, BigInteger, Float
+    Column, String, Integer, DateTime, Boolean, Text,
+    ForeignKey, Enum as SQLEnum, Index, BigInteger, Float, event, text
 )
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.pool import NullPool
+from sqlalchemy.sql.elements import TextClause
 import uuid
 
-from utils.config import get_settings
+from utils.config import Settings, get_settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = structlog.get_logger(__name__)
 
+# Per-connection prepared statement cache when connecting to Postgres directly
+STATEMENT_CACHE_SIZE = 1024
+STATEMENT_CACHE_LIFETIME_SECONDS = 300
+
+# Session settings for every connection: JIT makes asyncpg's type introspection
+# slow and gains nothing on OLTP; TCP keepalives let dead connections be reaped
+# by the kernel instead of recycling healthy ones on a timer
+_SERVER_SETTINGS = {
+    "jit": "off",
+    "tcp_keepalives_idle": "60",
+    "tcp_keepalives_interval": "10",
+    "tcp_keepalives_count": "3"
+}
+
+# Startup parameters pgbouncer passes through; it refuses connections carrying any
+# other server setting, so those are set on the database role instead (see the
+# pgbouncer notes in docs/troubleshooting/common-issues.md)
+_PGBOUNCER_STARTUP_PARAMETERS = frozenset({"application_name"})
+
+# Audit entries are queued and written in batches off the request path
+AUDIT_QUEUE_MAX_SIZE = 10_000
+AUDIT_FLUSH_BATCH_SIZE = 512
+AUDIT_FLUSH_INTERVAL_SECONDS = 0.1
+AUDIT_ENQUEUE_TIMEOUT_SECONDS = 0.05
+
+# Batches at least this large are streamed with COPY instead of INSERT
+AUDIT_COPY_MIN_BATCH = 64
+
+# Audit writes use their own small pool so bursts never starve request traffic.
+# synchronous_commit=off risks at most the WAL writer delay (~200 ms) of audit
+# rows on a server crash, the same order as the in-process flush window.
+AUDIT_POOL_SIZE = 2
+AUDIT_MAX_OVERFLOW = 4
+_AUDIT_SERVER_SETTINGS = {"synchronous_commit": "off", "application_name": "audit_writer"}
+
+# Positional layout of queued audit records (id is generated by the table)
+_AUDIT_COLUMNS = (
+    "entry_id",
+    "event_type", "event_category", "severity",
+    "user_id", "agent_id", "conversation_id",
+    "ip_address", "user_agent", "request_id",
+    "event_data", "affected_resources",
+    "timestamp", "phi_accessed"
+)
+_AUDIT_COLUMN_LIST = ", ".join(f'"{column}"' for column in _AUDIT_COLUMNS)
+
+# A retried write of the same entry (same client-generated entry_id) is stored once;
+# distinct events, even of one type within one request, always get their own row
+_AUDIT_ON_CONFLICT = "ON CONFLICT (entry_id) DO NOTHING"
+_AUDIT_INSERT_SQL = "INSERT INTO audit_logs ({}) VALUES ({}) {}".format(
+    _AUDIT_COLUMN_LIST,
+    ", ".join(f"${position}" for position in range(1, len(_AUDIT_COLUMNS) + 1)),
+    _AUDIT_ON_CONFLICT
+)
+
+# COPY cannot skip conflicts, so large batches land in a transaction-scoped
+# staging table and are merged with one INSERT ... SELECT
+_AUDIT_STAGING_TABLE = "audit_logs_staging"
+_AUDIT_CREATE_STAGING_SQL = (
+    f"CREATE TEMP TABLE {_AUDIT_STAGING_TABLE} ON COMMIT DROP AS "
+    f"SELECT {_AUDIT_COLUMN_LIST} FROM audit_logs WITH NO DATA"
+)
+_AUDIT_MERGE_STAGING_SQL = (
+    f"INSERT INTO audit_logs ({_AUDIT_COLUMN_LIST}) "
+    f"SELECT {_AUDIT_COLUMN_LIST} FROM {_AUDIT_STAGING_TABLE} {_AUDIT_ON_CONFLICT}"
+)
+
+# AES-GCM nonce length for encrypted PHI columns
+AES_GCM_NONCE_BYTES = 12
+
+# Quoted SQL literals that look like emails or SSNs, redacted before logging
+_SQL_PHI_PATTERN = re.compile(r"(?P<email>'[^']*@[^']*')|(?P<ssn>'\d{3}-?\d{2}-?\d{4}')")
+_SQL_PHI_REPLACEMENTS = {"email": "'[REDACTED_EMAIL]'", "ssn": "'[REDACTED_SSN]'"}
+
+# Health check: connectivity plus planner row estimates in one round-trip
+# (reltuples is -1 until a table is first analyzed)
+_HEALTH_CHECK_SQL = (
+    "SELECT "
+    "(SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE relname = 'users'), "
+    "(SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE relname = 'conversations')"
+)
+
+# Raw asyncpg pool for hot queries (today only the health check): opened lazily and
+# kept small, since every connection counts against Postgres max_connections per worker
+RAW_POOL_MIN_SIZE = 0
+RAW_POOL_MAX_SIZE = 2
+
+
+def _json_default(value: Any) -> Any:
+    """Encode types the JSON encoders do not support natively (e.g. Decimal, UUID)."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+# Fall back to stdlib encoding when orjson is unavailable
+if orjson is not None:
+    def _json_dumps(value: Any) -> str:
+        """Serialize a JSONB column value."""
+        return orjson.dumps(value, default=_json_default, option=orjson.OPT_NON_STR_KEYS).decode()
+    
+    _json_loads = orjson.loads
+else:
+    def _json_dumps(value: Any) -> str:
+        """Serialize a JSONB column value."""
+        return json.dumps(value, default=_json_default)
+    
+    _json_loads = json.loads
+
+
+def _unique_statement_name() -> str:
+    """Name for a one-off prepared statement, unique across pgbouncer's shared backends."""
+    return f"__asyncpg_{uuid.uuid4().hex}__"
+
+
 Base = declarative_base()
 
 
-class User(Base):
+class EncryptedFieldMixin:
+    """AES-256-GCM encryption for the model's ``encrypted_*`` PHI columns."""
+    
+    # Shared by all models; built from ENCRYPTION_KEY on first use
+    _aesgcm: Optional[AESGCM] = None
+    
+    @classmethod
+    def encrypt_field(cls, value: str, field: str) -> str:
+        """Encrypt a value for a column; returns base64(nonce || ciphertext)."""
+        nonce = os.urandom(AES_GCM_NONCE_BYTES)
+        ciphertext = cls._cipher().encrypt(nonce, value.encode(), cls._aad(field))
+        return base64.b64encode(nonce + ciphertext).decode("ascii")
+    
+    @classmethod
+    def decrypt_field(cls, token: str, field: str) -> str:
+        """Decrypt a value produced by encrypt_field for the same column."""
+        raw = base64.b64decode(token)
+        nonce, ciphertext = raw[:AES_GCM_NONCE_BYTES], raw[AES_GCM_NONCE_BYTES:]
+        return cls._cipher().decrypt(nonce, ciphertext, cls._aad(field)).decode()
+    
+    @classmethod
+    def encrypt_fields(cls, values: List[str], field: str) -> List[str]:
+        """Encrypt a batch of values for one column."""
+        aesgcm = cls._cipher()
+        aad = cls._aad(field)
+        encrypted = []
+        for value in values:
+            nonce = os.urandom(AES_GCM_NONCE_BYTES)
+            encrypted.append(base64.b64encode(nonce + aesgcm.encrypt(nonce, value.encode(), aad)).decode("ascii"))
+        return encrypted
+    
+    # Private methods
+    
+    @classmethod
+    def _cipher(cls) -> AESGCM:
+        """Get the shared AES-GCM cipher, deriving the key on first use."""
+        aesgcm = EncryptedFieldMixin._aesgcm
+        if aesgcm is None:
+            encryption_key = get_settings().encryption_key
+            if not encryption_key:
+                raise ValueError("ENCRYPTION_KEY is not configured")
+            key = hashlib.sha256(encryption_key.get_secret_value().encode()).digest()
+            aesgcm = AESGCM(key)
+            EncryptedFieldMixin._aesgcm = aesgcm
+        return aesgcm
+    
+    @classmethod
+    def _aad(cls, field: str) -> bytes:
+        """Bind ciphertexts to their table and column."""
+        return f"{cls.__tablename__}.{field}".encode()
+
+
+class User(EncryptedFieldMixin, Base):
     """User model for patients and staff."""
     __tablename__ = "users"
     
@@ -44,8 +229,8 @@ class User(Base):
     last_login_at = Column(DateTime, nullable=True)
     
     # Preferences
-    communication_preferences = Column(JSON, default=dict)
-    accessibility_needs = Column(JSON, default=list)
+    communication_preferences = Column(JSONB, default=dict)
+    accessibility_needs = Column(JSONB, default=list)
     
     # Metadata
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -54,11 +239,6 @@ class User(Base):
     
     # Relationships
     conversations = relationship("Conversation", back_populates="user")
-    
-    __table_args__ = (
-        Index('idx_users_phone', 'phone_number'),
-        Index('idx_users_email', 'email'),
-    )
 
 
 class Agent(Base):
@@ -71,8 +251,8 @@ class Agent(Base):
     email = Column(String(255), unique=True, index=True)
     
     # Agent capabilities
-    languages = Column(JSON, default=["en"])
-    specialties = Column(JSON, default=list)  # billing, clinical, pharmacy
+    languages = Column(JSONB, default=["en"])
+    specialties = Column(JSONB, default=list)  # billing, clinical, pharmacy
     max_concurrent_chats = Column(Integer, default=5)
     
     # Status and availability
@@ -114,8 +294,8 @@ class Conversation(Base):
     )
     
     # Context and metadata
-    context_data = Column(JSON, default=dict)
-    metadata = Column(JSON, default=dict)
+    context_data = Column(JSONB, default=dict)
+    extra_data = Column("metadata", JSONB, default=dict)  # "metadata" is reserved by declarative
     
     # Timing
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -138,11 +318,11 @@ class Conversation(Base):
         Index('idx_conversations_user', 'user_id'),
         Index('idx_conversations_agent', 'assigned_agent_id'),
         Index('idx_conversations_state', 'state'),
-        Index('idx_conversations_created', 'created_at'),
+        Index('idx_conversations_created', 'created_at', postgresql_using='brin'),
     )
 
 
-class ConversationMessage(Base):
+class ConversationMessage(EncryptedFieldMixin, Base):
     """Individual messages within conversations."""
     __tablename__ = "conversation_messages"
     
@@ -163,7 +343,7 @@ class ConversationMessage(Base):
     agent_id = Column(UUID(as_uuid=True), ForeignKey("agents.id"), nullable=True)
     
     # Metadata
-    metadata = Column(JSON, default=dict)
+    extra_data = Column("metadata", JSONB, default=dict)  # "metadata" is reserved by declarative
     timestamp = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -171,8 +351,8 @@ class ConversationMessage(Base):
     
     __table_args__ = (
         Index('idx_messages_conversation', 'conversation_id'),
-        Index('idx_messages_timestamp', 'timestamp'),
-        Index('idx_messages_phi', 'phi_detected'),
+        Index('idx_messages_timestamp', 'timestamp', postgresql_using='brin'),
+        Index('idx_messages_phi', 'conversation_id', postgresql_where=text("phi_detected")),
     )
 
 
@@ -205,10 +385,10 @@ class EscalationTicket(Base):
     resolved_at = Column(DateTime, nullable=True)
     
     # Context
-    conversation_summary = Column(JSON, default=dict)
-    user_context = Column(JSON, default=dict)
-    tags = Column(JSON, default=list)
-    notes = Column(JSON, default=list)
+    conversation_summary = Column(JSONB, default=dict)
+    user_context = Column(JSONB, default=dict)
+    tags = Column(JSONB, default=list)
+    notes = Column(JSONB, default=list)
     
     # Relationships
     conversation = relationship("Conversation", back_populates="escalation_tickets")
@@ -217,7 +397,10 @@ class EscalationTicket(Base):
     __table_args__ = (
         Index('idx_tickets_conversation', 'conversation_id'),
         Index('idx_tickets_agent', 'assigned_agent_id'),
-        Index('idx_tickets_status', 'status'),
+        Index(
+            'idx_tickets_open', 'status',
+            postgresql_where=text("status IN ('pending', 'assigned', 'in_progress')")
+        ),
         Index('idx_tickets_priority', 'priority'),
         Index('idx_tickets_created', 'created_at'),
     )
@@ -243,25 +426,33 @@ class AuditLog(Base):
     ip_address = Column(String(45), nullable=True)  # IPv6 compatible
     user_agent = Column(Text, nullable=True)
     request_id = Column(String(100), nullable=True)
+    entry_id = Column(UUID(as_uuid=True), nullable=False, default=uuid.uuid4)  # Client-generated; retries store once
     
     # Event data
-    event_data = Column(JSON, default=dict)
-    affected_resources = Column(JSON, default=list)
+    event_data = Column(JSONB, default=dict)
+    affected_resources = Column(JSONB, default=list)
     
     # Timing
     timestamp = Column(DateTime, default=datetime.utcnow)
     
     # Compliance
     phi_accessed = Column(Boolean, default=False)
-    retention_until = Column(DateTime, nullable=True)  # For compliance retention
+    retention_until = Column(
+        DateTime,
+        nullable=True,
+        server_default=text("(now() AT TIME ZONE 'utc') + interval '7 years'")  # 7 year retention
+    )
     
     __table_args__ = (
-        Index('idx_audit_timestamp', 'timestamp'),
+        Index('idx_audit_timestamp', 'timestamp', postgresql_using='brin'),
         Index('idx_audit_event_type', 'event_type'),
         Index('idx_audit_user', 'user_id'),
         Index('idx_audit_agent', 'agent_id'),
-        Index('idx_audit_phi', 'phi_accessed'),
+        Index('idx_audit_phi', 'timestamp', postgresql_where=text("phi_accessed")),
         Index('idx_audit_severity', 'severity'),
+        Index('idx_audit_event_data_gin', 'event_data', postgresql_using='gin'),
+        Index('idx_audit_entry', 'entry_id', unique=True),
+        Index('idx_audit_request', 'request_id', postgresql_where=text("request_id IS NOT NULL")),
     )
 
 
@@ -273,8 +464,8 @@ class UserProfile(Base):
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), unique=True, nullable=False)
     
     # Healthcare context (anonymized/aggregated)
-    general_conditions = Column(JSON, default=list)  # Aggregated categories
-    care_team_ids = Column(JSON, default=list)
+    general_conditions = Column(JSONB, default=list)  # Aggregated categories
+    care_team_ids = Column(JSONB, default=list)
     insurance_provider = Column(String(100), nullable=True)
     
     # Communication preferences
@@ -289,10 +480,6 @@ class UserProfile(Base):
     # Metadata
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    
-    __table_args__ = (
-        Index('idx_profile_user', 'user_id'),
-    )
 
 
 class SystemConfiguration(Base):
@@ -301,7 +488,7 @@ class SystemConfiguration(Base):
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     key = Column(String(200), unique=True, nullable=False)
-    value = Column(JSON, nullable=False)
+    value = Column(JSONB, nullable=False)
     value_type = Column(String(50), nullable=False)  # string, int, bool, json
     
     # Metadata
@@ -315,7 +502,6 @@ class SystemConfiguration(Base):
     updated_by = Column(String(255), nullable=True)
     
     __table_args__ = (
-        Index('idx_config_key', 'key'),
         Index('idx_config_category', 'category'),
     )
 
@@ -323,11 +509,35 @@ class SystemConfiguration(Base):
 # Database session management
 async_engine = None
 AsyncSessionLocal = None
+_audit_engine = None
+
+# Raw asyncpg pool for hot parameterized queries, bypassing SQLAlchemy
+_raw_pool: Optional[asyncpg.Pool] = None
+
+# Retention cleanup works in bounded batches, committing between them
+CLEANUP_BATCH_SIZE = 10_000
+_DELETE_EXPIRED_AUDIT_LOGS = text(
+    "DELETE FROM audit_logs WHERE id IN ("
+    "SELECT id FROM audit_logs WHERE retention_until < :current_time LIMIT :batch_size)"
+)
+_ARCHIVE_OLD_CONVERSATIONS = text(
+    "UPDATE conversations SET archived = true WHERE id IN ("
+    "SELECT id FROM conversations WHERE created_at < :cutoff_date AND archived = false "
+    "LIMIT :batch_size)"
+)
+
+# Compiled text() clauses kept for raw SQL statements (least recently used evicted first)
+STATEMENT_TEXT_CACHE_SIZE = 256
+
+# Audit log batching
+_audit_queue: Optional[asyncio.Queue] = None
+_audit_flusher_task: Optional[asyncio.Task] = None
 
 
 async def init_database():
     """Initialize database connection and create tables."""
-    global async_engine, AsyncSessionLocal
+    global async_engine, AsyncSessionLocal, _audit_engine, _raw_pool
+    global _audit_queue, _audit_flusher_task
     
     settings = get_settings()
     
@@ -335,10 +545,28 @@ async def init_database():
         # Create async engine
         async_engine = create_async_engine(
             settings.database_url,
-            pool_size=settings.database_pool_size,
-            max_overflow=20,
-            pool_timeout=settings.database_timeout,
-            echo=settings.development_mode
+            json_serializer=_json_dumps,
+            json_deserializer=_json_loads,
+            **_engine_options(settings, settings.database_pool_size, settings.database_max_overflow)
+        )
+        
+        # Dedicated audit writer (optionally an INSERT-only role via AUDIT_DATABASE_URL)
+        _audit_engine = create_async_engine(
+            settings.audit_database_url or settings.database_url,
+            **_engine_options(settings, AUDIT_POOL_SIZE, AUDIT_MAX_OVERFLOW, _AUDIT_SERVER_SETTINGS)
+        )
+        
+        # SQL logging in development, with PHI-looking literals redacted
+        if settings.development_mode:
+            event.listen(async_engine.sync_engine, "before_cursor_execute", _start_sql_timer)
+            event.listen(async_engine.sync_engine, "after_cursor_execute", _log_sql_statement)
+        
+        _raw_pool = await asyncpg.create_pool(
+            make_url(settings.database_url).set(drivername="postgresql").render_as_string(hide_password=False),
+            min_size=RAW_POOL_MIN_SIZE,
+            max_size=RAW_POOL_MAX_SIZE,
+            statement_cache_size=0 if settings.database_pgbouncer_mode else STATEMENT_CACHE_SIZE,
+            server_settings=_server_settings(settings)
         )
         
         # Create session factory
@@ -352,6 +580,10 @@ async def init_database():
         async with async_engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
         
+        # Start audit log writer
+        _audit_queue = asyncio.Queue(maxsize=AUDIT_QUEUE_MAX_SIZE)
+        _audit_flusher_task = asyncio.create_task(_audit_flusher())
+        
         logger.info("Database initialized successfully")
         
     except Exception as e:
@@ -359,6 +591,104 @@ async def init_database():
         raise
 
 
+def _engine_options(
+    settings: Settings,
+    pool_size: int,
+    max_overflow: int,
+    server_settings: Optional[Dict[str, str]] = None
+) -> Dict[str, Any]:
+    """Pool and asyncpg statement-cache options for an async engine."""
+    server_settings = _server_settings(settings, server_settings)
+    
+    if settings.database_pgbouncer_mode:
+        # Transaction pooling hands out a different backend per transaction, so
+        # prepared statements cannot be reused and their names must never repeat
+        # across clients; let pgbouncer do the pooling
+        return {
+            "poolclass": NullPool,
+            "connect_args": {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": _unique_statement_name,
+                "server_settings": server_settings
+            }
+        }
+    
+    # Size pool_size + max_overflow to the worker's concurrent DB tasks; LIFO
+    # checkout keeps hot connections (and their statement caches) in use
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.database_timeout,
+        "pool_pre_ping": True,
+        "pool_recycle": -1,  # pre-ping and keepalives replace timed recycling
+        "pool_use_lifo": True,
+        "connect_args": {
+            "statement_cache_size": STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": STATEMENT_CACHE_SIZE,
+            "max_cached_statement_lifetime": STATEMENT_CACHE_LIFETIME_SECONDS,
+            "server_settings": server_settings
+        }
+    }
+
+
+def _server_settings(
+    settings: Settings,
+    extra: Optional[Dict[str, str]] = None
+) -> Dict[str, str]:
+    """Startup server settings, limited to what pgbouncer accepts in pgbouncer mode."""
+    server_settings = {**_SERVER_SETTINGS, **(extra or {})}
+    if settings.database_pgbouncer_mode:
+        return {
+            name: value for name, value in server_settings.items()
+            if name in _PGBOUNCER_STARTUP_PARAMETERS
+        }
+    return server_settings
+
+
+def _redact_sql_statement(statement: str) -> str:
+    """Redact email and SSN literals from a SQL statement in one scan."""
+    if "'" not in statement:
+        return statement
+    return _SQL_PHI_PATTERN.sub(lambda match: _SQL_PHI_REPLACEMENTS[match.lastgroup], statement)
+
+
+def _start_sql_timer(conn, cursor, statement, parameters, context, executemany):
+    """Stamp the statement start; all formatting happens after execution."""
+    context._sql_t0 = time.perf_counter_ns()
+
+
+def _log_sql_statement(conn, cursor, statement, parameters, context, executemany):
+    """Log executed SQL (without parameters) and its execution time for development."""
+    logger.debug(
+        "SQL statement",
+        statement=_redact_sql_statement(statement),
+        executemany=executemany,
+        execution_time_ms=(time.perf_counter_ns() - context._sql_t0) / 1e6
+    )
+
+
+async def close_database():
+    """Flush pending audit entries and dispose of the engines."""
+    global _audit_flusher_task
+    
+    if _audit_flusher_task:
+        # Sentinel: the flusher writes what it holds and exits
+        await _audit_queue.put(None)
+        await _audit_flusher_task
+        _audit_flusher_task = None
+    
+    # Tear down all pools concurrently; connection shutdowns overlap on the loop
+    closers = []
+    if _audit_engine:
+        closers.append(_audit_engine.dispose())
+    if _raw_pool:
+        closers.append(_raw_pool.close())
+    if async_engine:
+        closers.append(async_engine.dispose())
+    await asyncio.gather(*closers)
+
+
 async def get_database() -> AsyncSession:
     """Get database session."""
     if not AsyncSessionLocal:
@@ -371,28 +701,66 @@ async def get_database() -> AsyncSession:
             await session.close()
 
 
+async def fast_exec(sql: str, *args: Any) -> List[asyncpg.Record]:
+    """Run a hot parameterized query on the raw asyncpg pool ($1-style placeholders)."""
+    async with _raw_pool.acquire() as conn:
+        return await conn.fetch(sql, *args)
+
+
+@asynccontextmanager
+async def get_async_readonly_conn() -> AsyncIterator[AsyncConnection]:
+    """Get a Core connection for read-only queries, bypassing the ORM session."""
+    async with async_engine.connect() as conn:
+        yield conn
+
+
+@functools.lru_cache(maxsize=STATEMENT_TEXT_CACHE_SIZE)
+def _text_clause(query: str) -> TextClause:
+    """Compiled text() clause for a raw SQL statement."""
+    return text(query)
+
+
+async def execute_async_query(
+    query: str,
+    parameters: Optional[Dict[str, Any]] = None,
+    read_only: bool = False
+) -> List[Any]:
+    """Execute raw SQL on a pooled connection, reusing the compiled statement.
+    
+    read_only skips the commit round-trip; the connection is rolled back, so
+    pass it only for statements with no side effects (not SELECT ... FOR
+    UPDATE, advisory locks or functions that write).
+    """
+    stmt = _text_clause(query)
+    
+    if read_only:
+        async with get_async_readonly_conn() as conn:
+            result = await conn.execute(stmt, parameters or {})
+            return result.all()
+    
+    async with async_engine.begin() as conn:
+        result = await conn.execute(stmt, parameters or {})
+        return result.all() if result.returns_rows else []
+
+
 async def check_database_health() -> Dict[str, Any]:
     """Check database health for monitoring."""
     try:
-        async with AsyncSessionLocal() as session:
-            # Test basic connectivity
-            result = await session.execute("SELECT 1")
-            result.scalar()
-            
-            # Get some basic stats
-            users_count = await session.execute("SELECT COUNT(*) FROM users")
-            conversations_count = await session.execute("SELECT COUNT(*) FROM conversations")
-            
-            return {
-                "status": "healthy",
-                "connected": True,
-                "response_time_ms": 0,  # Would measure actual response time
-                "stats": {
-                    "total_users": users_count.scalar(),
-                    "total_conversations": conversations_count.scalar()
-                }
+        start = time.perf_counter()
+        total_users, total_conversations = (await fast_exec(_HEALTH_CHECK_SQL))[0]
+        response_time_ms = (time.perf_counter() - start) * 1000
+        
+        return {
+            "status": "healthy",
+            "connected": True,
+            "response_time_ms": response_time_ms,
+            "stats": {
+                # Planner estimates, not exact counts
+                "total_users": total_users,
+                "total_conversations": total_conversations
             }
-            
+        }
+        
     except Exception as e:
         return {
             "status": "unhealthy",
@@ -412,31 +780,130 @@ async def create_audit_entry(
     ip_address: Optional[str] = None,
     user_agent: Optional[str] = None,
     request_id: Optional[str] = None,
-    phi_accessed: bool = False
+    phi_accessed: bool = False,
+    entry_id: Optional[str] = None
 ) -> None:
-    """Create audit log entry for HIPAA compliance."""
+    """Queue audit log entry for HIPAA compliance; written in batches.
+    
+    A caller retrying an entry passes the same entry_id so it is stored once;
+    without one, every call is a distinct entry.
+    """
+    if _audit_queue is None:
+        logger.error("Failed to create audit entry", error="database not initialized")
+        return
+    
+    # Queued in _AUDIT_COLUMNS order so batches map straight onto driver records
+    record = (
+        uuid.UUID(entry_id) if entry_id else uuid.uuid4(),
+        event_type, event_category, severity,
+        user_id, agent_id, conversation_id,
+        ip_address, user_agent, request_id,
+        _json_dumps(event_data or {}), "[]",
+        datetime.utcnow(), phi_accessed
+    )
+    
     try:
-        async with AsyncSessionLocal() as session:
-            audit_entry = AuditLog(
+        _audit_queue.put_nowait(record)
+    except asyncio.QueueFull:
+        # Back-pressure: wait briefly for the flusher, then drop to the log
+        try:
+            await asyncio.wait_for(_audit_queue.put(record), AUDIT_ENQUEUE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            logger.error(
+                "Audit queue full, entry dropped",
                 event_type=event_type,
                 event_category=event_category,
                 severity=severity,
-                user_id=user_id,
-                agent_id=agent_id,
-                conversation_id=conversation_id,
-                event_data=event_data or {},
-                ip_address=ip_address,
-                user_agent=user_agent,
-                request_id=request_id,
-                phi_accessed=phi_accessed,
-                retention_until=datetime.utcnow().replace(year=datetime.utcnow().year + 7)  # 7 year retention
+                request_id=request_id
             )
+
+
+async def _audit_flusher():
+    """Write queued audit entries in batches until the stop sentinel arrives."""
+    loop = asyncio.get_running_loop()
+    stopping = False
+    
+    while not stopping:
+        record = await _audit_queue.get()
+        if record is None:
+            break
+        
+        records = [record]
+        deadline = loop.time() + AUDIT_FLUSH_INTERVAL_SECONDS
+        while len(records) < AUDIT_FLUSH_BATCH_SIZE:
+            try:
+                record = _audit_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    record = await asyncio.wait_for(_audit_queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
             
-            session.add(audit_entry)
-            await session.commit()
+            if record is None:
+                stopping = True
+                break
+            records.append(record)
+        
+        await _write_audit_records(records)
+
+
+async def _write_audit_records(records: List[Tuple[Any, ...]]) -> None:
+    """Write a batch of audit records: COPY for large batches, executemany INSERT otherwise."""
+    try:
+        async with _audit_engine.begin() as conn:
+            raw_connection = await conn.get_raw_connection()
+            driver_connection = raw_connection.driver_connection
+            
+            if len(records) >= AUDIT_COPY_MIN_BATCH:
+                await driver_connection.execute(_AUDIT_CREATE_STAGING_SQL)
+                await driver_connection.copy_records_to_table(
+                    _AUDIT_STAGING_TABLE,
+                    records=records,
+                    columns=_AUDIT_COLUMNS
+                )
+                await driver_connection.execute(_AUDIT_MERGE_STAGING_SQL)
+            else:
+                await driver_connection.executemany(_AUDIT_INSERT_SQL, records)
             
     except Exception as e:
-        logger.error("Failed to create audit entry", error=str(e))
+        # One bad row fails the whole batch; retry entry by entry so it loses only itself
+        logger.warning("Audit batch write failed, retrying entries individually", error=str(e), count=len(records))
+        await _write_audit_records_individually(records)
+
+
+async def _write_audit_records_individually(records: List[Tuple[Any, ...]]) -> None:
+    """Insert audit records one by one, each under its own savepoint; log every entry that still fails."""
+    failed: List[Tuple[Tuple[Any, ...], str]] = []
+    
+    try:
+        async with _audit_engine.begin() as conn:
+            raw_connection = await conn.get_raw_connection()
+            driver_connection = raw_connection.driver_connection
+            
+            for record in records:
+                try:
+                    async with driver_connection.transaction():
+                        await driver_connection.execute(_AUDIT_INSERT_SQL, *record)
+                except asyncpg.PostgresError as e:
+                    failed.append((record, str(e)))
+            
+    except Exception as e:
+        # Connection or commit failure: nothing from this batch was stored
+        failed = [(record, str(e)) for record in records]
+    
+    for record, error in failed:
+        logger.error(
+            "Failed to write audit entry",
+            error=error,
+            entry_id=str(record[0]),
+            event_type=record[1],
+            event_category=record[2],
+            severity=record[3],
+            request_id=record[9]
+        )
 
 
 async def cleanup_old_data():
@@ -446,20 +913,38 @@ async def cleanup_old_data():
             current_time = datetime.utcnow()
             
             # Delete old audit logs past retention period
-            await session.execute(
-                "DELETE FROM audit_logs WHERE retention_until < :current_time",
-                {"current_time": current_time}
+            deleted = await _run_in_batches(
+                session, _DELETE_EXPIRED_AUDIT_LOGS, {"current_time": current_time}
             )
             
             # Archive old conversations (older than 2 years)
             cutoff_date = current_time.replace(year=current_time.year - 2)
-            await session.execute(
-                "UPDATE conversations SET archived = true WHERE created_at < :cutoff_date AND archived = false",
-                {"cutoff_date": cutoff_date}
+            archived = await _run_in_batches(
+                session, _ARCHIVE_OLD_CONVERSATIONS, {"cutoff_date": cutoff_date}
             )
             
-            await session.commit()
-            logger.info("Database cleanup completed")
+            logger.info(
+                "Database cleanup completed",
+                audit_logs_deleted=deleted,
+                conversations_archived=archived
+            )
             
     except Exception as e:
-        logger.error("Database cleanup failed", error=str(e)) 
\ No newline at end of file
+        logger.error("Database cleanup failed", error=str(e))
+
+
+async def _run_in_batches(session: AsyncSession, statement: TextClause, parameters: Dict[str, Any]) -> int:
+    """Repeat a LIMITed write, committing each batch, until a short batch; returns rows affected."""
+    parameters = {**parameters, "batch_size": CLEANUP_BATCH_SIZE}
+    total = 0
+    
+    while True:
+        result = await session.execute(statement, parameters)
+        await session.commit()
+        total += result.rowcount
+        
+        if result.rowcount < CLEANUP_BATCH_SIZE:
+            return total
+        
+        # Let the audit flusher and request handlers run between batches
+        await asyncio.sleep(0)
@@ -3,16 +3,61 @@ Logging Configuration for MedinovAI Chatbot
 HIPAA-compliant structured logging with PHI redaction
 """
 
+import atexit
+import json
 import logging
 import logging.config
+import logging.handlers
 import os
+import queue
+import re
 import sys
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 import structlog
 from pythonjsonlogger import jsonlogger
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+# Per-record constants for HIPAA log fields (the environment is fixed for the process)
+_SERVICE = 'medinovai-chatbot'
+_ENVIRONMENT = os.getenv('NODE_ENV', 'development')
+
+# Compliance metadata shared by every record; a plain dict so both JSON encoders accept it, never mutate
+_COMPLIANCE = {
+    'hipaa': True,
+    'gdpr': True,
+    'phi_redacted': True,
+    'audit_trail': True
+}
+
+# Log level for each security event severity (anything else logs at INFO)
+_SEVERITY_LEVELS = {
+    'critical': logging.CRITICAL,
+    'high': logging.ERROR,
+    'medium': logging.WARNING
+}
+
+# Loggers used by the log_* helpers; getLogger returns the same objects dictConfig configures later
+_AUDIT_LOGGER = logging.getLogger('audit')
+_SECURITY_LOGGER = logging.getLogger('security')
+_CHAT_LOGGER = logging.getLogger('chat')
+_API_LOGGER = logging.getLogger('api')
+_DATABASE_LOGGER = logging.getLogger('database')
+_EXTERNAL_LOGGER = logging.getLogger('external')
+
+# Background listeners that own the real handlers (one per distinct handler set)
+_queue_listeners: List[logging.handlers.QueueListener] = []
+
 
 class PHIRedactionFilter(logging.Filter):
     """Filter to redact PHI from log messages."""
@@ -26,19 +71,39 @@ class PHIRedactionFilter(logging.Filter):
         "dob": r"\b\d{1,2}[/-]\d{1,2}[/-]\d{4}\b",
     }
     
+    # All patterns fused into one alternation (one scan per message), built at import;
+    # alternatives keep PHI_PATTERNS order so earlier types win at the same position.
+    # Compiled with RE2 when installed for linear-time matching on hostile input
+    PHI_PATTERN = (re2 or re).compile(
+        "|".join(f"(?P<{phi_type}>{pattern})" for phi_type, pattern in PHI_PATTERNS.items())
+    )
+    PHI_REPLACEMENTS = {phi_type: f"[REDACTED_{phi_type.upper()}]" for phi_type in PHI_PATTERNS}
+    
+    # Every pattern needs a digit or "@"; messages without either skip the full scan
+    PHI_TRIGGER = re.compile(r"[\d@]")
+    
     def filter(self, record: logging.LogRecord) -> bool:
         """Filter and redact PHI from log record."""
         if hasattr(record, 'msg'):
-            message = str(record.msg)
+            message = record.msg
+            if not isinstance(message, str):
+                message = str(message)
+            if not self.PHI_TRIGGER.search(message):
+                return True
             
             # Basic PHI redaction (in production, use more sophisticated tools)
-            for phi_type, pattern in self.PHI_PATTERNS.items():
-                import re
-                message = re.sub(pattern, f"[REDACTED_{phi_type.upper()}]", message)
-            
-            record.msg = message
+            redacted, count = self.PHI_PATTERN.subn(self._replacement, message)
+            if count:
+                record.msg = redacted
         
         return True
+    
+    # Private methods
+    
+    @staticmethod
+    def _replacement(match: re.Match) -> str:
+        """Replacement text for whichever PHI type matched."""
+        return PHIRedactionFilter.PHI_REPLACEMENTS[match.lastgroup]
 
 
 class HIPAAFormatter(jsonlogger.JsonFormatter):
@@ -49,25 +114,40 @@ class HIPAAFormatter(jsonlogger.JsonFormatter):
         """Add HIPAA-required fields to log record."""
         super().add_fields(log_record, record, message_dict)
         
-        # Add HIPAA audit fields
-        log_record['timestamp'] = datetime.utcnow().isoformat()
-        log_record['service'] = 'medinovai-chatbot'
-        log_record['environment'] = os.getenv('NODE_ENV', 'development')
-        log_record['user_id'] = getattr(record, 'user_id', 'anonymous')
-        log_record['session_id'] = getattr(record, 'session_id', None)
-        log_record['request_id'] = getattr(record, 'request_id', None)
-        log_record['ip_address'] = getattr(record, 'ip_address', None)
-        log_record['action'] = getattr(record, 'action', None)
-        log_record['resource'] = getattr(record, 'resource', None)
-        log_record['outcome'] = getattr(record, 'outcome', None)
+        # Fields passed via extra= live in the record's __dict__
+        extra = record.__dict__
         
-        # Add compliance metadata
-        log_record['compliance'] = {
-            'hipaa': True,
-            'gdpr': True,
-            'phi_redacted': True,
-            'audit_trail': True
-        }
+        # Add HIPAA audit fields and compliance metadata in one update;
+        # record.created is stamped at the call site and both encoders render datetimes as ISO 8601
+        log_record.update({
+            'timestamp': datetime.utcfromtimestamp(record.created),
+            'service': _SERVICE,
+            'environment': _ENVIRONMENT,
+            'user_id': extra.get('user_id', 'anonymous'),
+            'session_id': extra.get('session_id'),
+            'request_id': extra.get('request_id'),
+            'ip_address': extra.get('ip_address'),
+            'action': extra.get('action'),
+            'resource': extra.get('resource'),
+            'outcome': extra.get('outcome'),
+            'compliance': _COMPLIANCE
+        })
+    
+    def jsonify_log_record(self, log_record: Dict[str, Any]) -> str:
+        """Serialize the log record, using orjson when available."""
+        if orjson is None:
+            return super().jsonify_log_record(log_record)
+        
+        # Anything orjson can't encode natively falls back to str(), like the stdlib encoder
+        return orjson.dumps(log_record, default=self.json_default or str).decode()
+
+
+def _structlog_dumps(event_dict: Dict[str, Any], **kwargs: Any) -> str:
+    """JSON serializer for structlog's renderer; orjson when installed."""
+    if orjson is None:
+        return json.dumps(event_dict, **kwargs)
+    # Event kwargs can carry arbitrary dicts, so allow non-string keys like the stdlib encoder
+    return orjson.dumps(event_dict, default=kwargs.get('default'), option=orjson.OPT_NON_STR_KEYS).decode()
 
 
 def setup_logging() -> None:
@@ -88,7 +168,7 @@ def setup_logging() -> None:
             structlog.processors.StackInfoRenderer(),
             structlog.processors.format_exc_info,
             structlog.processors.UnicodeDecoder(),
-            structlog.processors.JSONRenderer()
+            structlog.processors.JSONRenderer(serializer=_structlog_dumps)
         ],
         context_class=dict,
         logger_factory=structlog.stdlib.LoggerFactory(),
@@ -122,27 +202,22 @@ def setup_logging() -> None:
                 'filters': ['phi_redaction'],
                 'stream': sys.stdout
             },
+            # Rotation is done externally by logrotate (infra/logrotate); WatchedFileHandler reopens after a rename
             'file': {
-                'class': 'logging.handlers.RotatingFileHandler',
+                'class': 'logging.handlers.WatchedFileHandler',
                 'filename': 'logs/medinovai-chatbot.log',
-                'maxBytes': 10485760,  # 10MB
-                'backupCount': 5,
                 'formatter': 'hipaa_json',
                 'filters': ['phi_redaction']
             },
             'audit': {
-                'class': 'logging.handlers.RotatingFileHandler',
+                'class': 'logging.handlers.WatchedFileHandler',
                 'filename': 'logs/audit.log',
-                'maxBytes': 10485760,  # 10MB
-                'backupCount': 50,  # Keep more audit logs
                 'formatter': 'hipaa_json',
                 'filters': ['phi_redaction']
             },
             'security': {
-                'class': 'logging.handlers.RotatingFileHandler',
+                'class': 'logging.handlers.WatchedFileHandler',
                 'filename': 'logs/security.log',
-                'maxBytes': 10485760,  # 10MB
-                'backupCount': 20,
                 'formatter': 'hipaa_json',
                 'filters': ['phi_redaction']
             }
@@ -186,10 +261,46 @@ def setup_logging() -> None:
     # Apply configuration
     logging.config.dictConfig(config)
     
+    # Move formatting, PHI redaction and file I/O off the calling thread
+    _start_queue_listeners([None, *config['loggers']])
+    
     # Setup additional loggers for specific components
     setup_component_loggers()
 
 
+def _start_queue_listeners(logger_names: List[Optional[str]]) -> None:
+    """Swap each logger's handlers for a QueueHandler drained by a listener thread."""
+    _stop_queue_listeners()
+    
+    # Loggers sharing the same handlers share one queue, so routing is unchanged
+    queue_handlers: Dict[tuple, logging.handlers.QueueHandler] = {}
+    for name in logger_names:
+        logger = logging.getLogger(name)
+        handlers = tuple(logger.handlers)
+        if not handlers:
+            continue
+        
+        if handlers not in queue_handlers:
+            log_queue: queue.Queue = queue.Queue(-1)
+            listener = logging.handlers.QueueListener(
+                log_queue, *handlers, respect_handler_level=True
+            )
+            listener.start()
+            _queue_listeners.append(listener)
+            queue_handlers[handlers] = logging.handlers.QueueHandler(log_queue)
+        
+        logger.handlers = [queue_handlers[handlers]]
+
+
+def _stop_queue_listeners() -> None:
+    """Flush and stop the background logging listeners."""
+    while _queue_listeners:
+        _queue_listeners.pop().stop()
+
+
+atexit.register(_stop_queue_listeners)
+
+
 def setup_component_loggers() -> None:
     """Setup specialized loggers for different components."""
     
@@ -216,12 +327,12 @@ def setup_component_loggers() -> None:
 
 def get_audit_logger() -> logging.Logger:
     """Get the audit logger for HIPAA compliance."""
-    return logging.getLogger('audit')
+    return _AUDIT_LOGGER
 
 
 def get_security_logger() -> logging.Logger:
     """Get the security logger for security events."""
-    return logging.getLogger('security')
+    return _SECURITY_LOGGER
 
 
 def log_phi_access(user_id: str, action: str, resource: str, 
@@ -229,6 +340,8 @@ def log_phi_access(user_id: str, action: str, resource: str,
                    ip_address: Optional[str] = None) -> None:
     """Log PHI access for HIPAA audit trail."""
     audit_logger = get_audit_logger()
+    if not audit_logger.isEnabledFor(logging.INFO):
+        return
     
     audit_logger.info(
         "PHI Access Event",
@@ -253,6 +366,11 @@ def log_security_event(event_type: str, description: str,
     """Log security events for monitoring and compliance."""
     security_logger = get_security_logger()
     
+    # Log at appropriate level based on severity
+    level = _SEVERITY_LEVELS.get(severity, logging.INFO)
+    if not security_logger.isEnabledFor(level):
+        return
+    
     log_data = {
         'event_type': event_type,
         'description': description,
@@ -265,22 +383,16 @@ def log_security_event(event_type: str, description: str,
     if additional_data:
         log_data['additional_data'] = additional_data
     
-    # Log at appropriate level based on severity
-    if severity == 'critical':
-        security_logger.critical(description, extra=log_data)
-    elif severity == 'high':
-        security_logger.error(description, extra=log_data)
-    elif severity == 'medium':
-        security_logger.warning(description, extra=log_data)
-    else:
-        security_logger.info(description, extra=log_data)
+    security_logger.log(level, description, extra=log_data)
 
 
 def log_chat_interaction(session_id: str, user_id: str, message_type: str,
                         channel: str, response_time_ms: Optional[int] = None,
                         escalated: bool = False) -> None:
     """Log chat interactions for analytics and compliance."""
-    chat_logger = logging.getLogger('chat')
+    chat_logger = _CHAT_LOGGER
+    if not chat_logger.isEnabledFor(logging.INFO):
+        return
     
     chat_logger.info(
         "Chat Interaction",
@@ -302,7 +414,9 @@ def log_api_request(method: str, endpoint: str, status_code: int,
                    request_id: Optional[str] = None,
                    ip_address: Optional[str] = None) -> None:
     """Log API requests for monitoring and compliance."""
-    api_logger = logging.getLogger('api')
+    api_logger = _API_LOGGER
+    if not api_logger.isEnabledFor(logging.INFO):
+        return
     
     api_logger.info(
         "API Request",
@@ -324,7 +438,9 @@ def log_database_operation(operation: str, table: str, success: bool,
                           execution_time_ms: Optional[int] = None,
                           error_message: Optional[str] = None) -> None:
     """Log database operations for monitoring."""
-    db_logger = logging.getLogger('database')
+    db_logger = _DATABASE_LOGGER
+    if not db_logger.isEnabledFor(logging.INFO if success else logging.ERROR):
+        return
     
     log_data = {
         'operation': operation,
@@ -348,7 +464,9 @@ def log_external_service_call(service: str, endpoint: str, success: bool,
                              status_code: Optional[int] = None,
                              error_message: Optional[str] = None) -> None:
     """Log external service calls for monitoring."""
-    external_logger = logging.getLogger('external')
+    external_logger = _EXTERNAL_LOGGER
+    if not external_logger.isEnabledFor(logging.INFO if success else logging.ERROR):
+        return
     
     log_data = {
         'service': service,
@@ -4,9 +4,9 @@ Collects and reports on conversation metrics, PHI detection, and system performa
 """
 
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, List, Optional, Any
-from collections import defaultdict, deque
+from collections import defaultdict
 
 import structlog
 from prometheus_client import Counter, Histogram, Gauge, Summary
@@ -15,6 +15,26 @@ from utils.config import Settings
 
 logger = structlog.get_logger(__name__)
 
+# One-minute buckets covering the rolling last-hour window
+MINUTE_BUCKETS = 60
+
+# Hourly stats ring size (two days; get_hourly_stats reads up to this many hours)
+HOUR_BUCKETS = 48
+
+# Counters kept per hour
+HOURLY_STAT_FIELDS = (
+    "conversations_started",
+    "conversations_completed",
+    "total_messages",
+    "escalations",
+    "messages_processed",
+    "phi_detections",
+    "errors",
+)
+
+# Response time SLA target
+RESPONSE_TIME_SLA_MS = 3000
+
 
 class MetricsCollector:
     """
@@ -71,11 +91,33 @@ class MetricsCollector:
             ['error_type', 'component']
         )
         
+        # Bound label children, cached per label values so the hot path skips labels()
+        self._conversations_started: Dict[tuple, Any] = {}
+        self._conversations_completed: Dict[str, Any] = {}
+        self._conversations_escalated: Dict[str, Any] = {}
+        self._escalations: Dict[tuple, Any] = {}
+        self._user_messages: Dict[str, Any] = {}
+        self._response_times: Dict[str, Any] = {}
+        self._message_errors: Dict[str, Any] = {}
+        self._api_errors: Dict[str, Any] = {}
+        self._automated_phi_detections = self.phi_detection_counter.labels(detection_type="automated")
+        
         # In-memory metrics for dashboard
         self.conversation_metrics = defaultdict(int)
-        self.response_times = deque(maxlen=1000)  # Last 1000 response times
-        self.phi_detections = deque(maxlen=1000)  # Last 1000 PHI detections
-        self.hourly_stats = defaultdict(lambda: defaultdict(int))
+        self.channel_metrics = defaultdict(lambda: defaultdict(int))
+        
+        # Hourly stats as a fixed ring of counter dicts (slot = epoch hour % HOUR_BUCKETS)
+        self._hour_ring: List[Dict[str, int]] = [
+            dict.fromkeys(HOURLY_STAT_FIELDS, 0) for _ in range(HOUR_BUCKETS)
+        ]
+        self._hour_ring_meta = [-1] * HOUR_BUCKETS
+        
+        # Last-hour message stats as a ring of per-minute buckets (slot = epoch minute % 60)
+        self._minute_epochs = [-1] * MINUTE_BUCKETS
+        self._rt_counts = [0] * MINUTE_BUCKETS
+        self._rt_sums = [0.0] * MINUTE_BUCKETS
+        self._rt_under_sla = [0] * MINUTE_BUCKETS
+        self._phi_counts = [0] * MINUTE_BUCKETS
         
         # Performance tracking
         self.start_time = datetime.utcnow()
@@ -88,21 +130,24 @@ class MetricsCollector:
         language: str = "en"
     ) -> None:
         """Record when a conversation starts."""
-        self.conversation_counter.labels(
-            channel=channel,
-            language=language,
-            outcome="started"
-        ).inc()
+        child = self._conversations_started.get((channel, language))
+        if child is None:
+            child = self._conversations_started[(channel, language)] = self.conversation_counter.labels(
+                channel=channel,
+                language=language,
+                outcome="started"
+            )
+        child.inc()
         
         self.conversation_metrics["total_started"] += 1
-        self.conversation_metrics[f"started_{channel}"] += 1
+        self.channel_metrics[channel]["started"] += 1
         
         # Update active conversations gauge
         self.active_conversations_gauge.inc()
         
         # Update hourly stats
-        hour_key = datetime.utcnow().strftime("%Y-%m-%d_%H")
-        self.hourly_stats[hour_key]["conversations_started"] += 1
+        hour_stats = self._hour_bucket()
+        hour_stats["conversations_started"] += 1
         
         logger.debug(
             "Conversation started recorded",
@@ -117,14 +162,17 @@ class MetricsCollector:
         satisfaction_score: Optional[int] = None
     ) -> None:
         """Record when a conversation completes."""
-        self.conversation_counter.labels(
-            channel=channel,
-            language="unknown",  # Not available at completion
-            outcome="completed"
-        ).inc()
+        child = self._conversations_completed.get(channel)
+        if child is None:
+            child = self._conversations_completed[channel] = self.conversation_counter.labels(
+                channel=channel,
+                language="unknown",  # Not available at completion
+                outcome="completed"
+            )
+        child.inc()
         
         self.conversation_metrics["total_completed"] += 1
-        self.conversation_metrics[f"completed_{channel}"] += 1
+        self.channel_metrics[channel]["completed"] += 1
         
         if satisfaction_score:
             self.conversation_metrics["satisfaction_sum"] += satisfaction_score
@@ -134,9 +182,9 @@ class MetricsCollector:
         self.active_conversations_gauge.dec()
         
         # Update hourly stats
-        hour_key = datetime.utcnow().strftime("%Y-%m-%d_%H")
-        self.hourly_stats[hour_key]["conversations_completed"] += 1
-        self.hourly_stats[hour_key]["total_messages"] += message_count
+        hour_stats = self._hour_bucket()
+        hour_stats["conversations_completed"] += 1
+        hour_stats["total_messages"] += message_count
         
         logger.debug(
             "Conversation completed recorded",
@@ -151,23 +199,29 @@ class MetricsCollector:
         reason: str
     ) -> None:
         """Record when a conversation is escalated."""
-        self.escalation_counter.labels(
-            reason=reason,
-            channel=channel
-        ).inc()
-        
-        self.conversation_counter.labels(
-            channel=channel,
-            language="unknown",
-            outcome="escalated"
-        ).inc()
+        child = self._escalations.get((reason, channel))
+        if child is None:
+            child = self._escalations[(reason, channel)] = self.escalation_counter.labels(
+                reason=reason,
+                channel=channel
+            )
+        child.inc()
+        
+        child = self._conversations_escalated.get(channel)
+        if child is None:
+            child = self._conversations_escalated[channel] = self.conversation_counter.labels(
+                channel=channel,
+                language="unknown",
+                outcome="escalated"
+            )
+        child.inc()
         
         self.conversation_metrics["total_escalated"] += 1
-        self.conversation_metrics[f"escalated_{channel}"] += 1
+        self.channel_metrics[channel]["escalated"] += 1
         
         # Update hourly stats
-        hour_key = datetime.utcnow().strftime("%Y-%m-%d_%H")
-        self.hourly_stats[hour_key]["escalations"] += 1
+        hour_stats = self._hour_bucket()
+        hour_stats["escalations"] += 1
         
         logger.info(
             "Conversation escalation recorded",
@@ -182,36 +236,38 @@ class MetricsCollector:
         phi_detected: bool = False
     ) -> None:
         """Record message processing metrics."""
-        self.message_counter.labels(
-            channel=channel,
-            type="user"
-        ).inc()
+        child = self._user_messages.get(channel)
+        if child is None:
+            child = self._user_messages[channel] = self.message_counter.labels(
+                channel=channel,
+                type="user"
+            )
+        child.inc()
         
         # Record response time
         response_time_seconds = response_time_ms / 1000
-        self.response_time_histogram.labels(channel=channel).observe(response_time_seconds)
+        histogram = self._response_times.get(channel)
+        if histogram is None:
+            histogram = self._response_times[channel] = self.response_time_histogram.labels(channel=channel)
+        histogram.observe(response_time_seconds)
         
         # Store for dashboard
-        self.response_times.append({
-            "timestamp": datetime.utcnow(),
-            "response_time_ms": response_time_ms,
-            "channel": channel
-        })
+        slot = self._minute_slot()
+        self._rt_counts[slot] += 1
+        self._rt_sums[slot] += response_time_ms
+        if response_time_ms < RESPONSE_TIME_SLA_MS:
+            self._rt_under_sla[slot] += 1
         
         # Record PHI detection
         if phi_detected:
-            self.phi_detection_counter.labels(detection_type="automated").inc()
-            self.phi_detections.append({
-                "timestamp": datetime.utcnow(),
-                "channel": channel,
-                "method": "automated"
-            })
+            self._automated_phi_detections.inc()
+            self._phi_counts[slot] += 1
         
         # Update hourly stats
-        hour_key = datetime.utcnow().strftime("%Y-%m-%d_%H")
-        self.hourly_stats[hour_key]["messages_processed"] += 1
+        hour_stats = self._hour_bucket()
+        hour_stats["messages_processed"] += 1
         if phi_detected:
-            self.hourly_stats[hour_key]["phi_detections"] += 1
+            hour_stats["phi_detections"] += 1
         
         logger.debug(
             "Message processing recorded",
@@ -226,16 +282,19 @@ class MetricsCollector:
         error_type: str
     ) -> None:
         """Record message processing error."""
-        self.error_counter.labels(
-            error_type=error_type,
-            component="message_processing"
-        ).inc()
+        child = self._message_errors.get(error_type)
+        if child is None:
+            child = self._message_errors[error_type] = self.error_counter.labels(
+                error_type=error_type,
+                component="message_processing"
+            )
+        child.inc()
         
         self.conversation_metrics["total_errors"] += 1
         
         # Update hourly stats
-        hour_key = datetime.utcnow().strftime("%Y-%m-%d_%H")
-        self.hourly_stats[hour_key]["errors"] += 1
+        hour_stats = self._hour_bucket()
+        hour_stats["errors"] += 1
         
         logger.warning(
             "Message error recorded",
@@ -265,10 +324,13 @@ class MetricsCollector:
         error_type: str
     ) -> None:
         """Record API request error."""
-        self.error_counter.labels(
-            error_type=error_type,
-            component="api"
-        ).inc()
+        child = self._api_errors.get(error_type)
+        if child is None:
+            child = self._api_errors[error_type] = self.error_counter.labels(
+                error_type=error_type,
+                component="api"
+            )
+        child.inc()
     
     def update_agent_workload(self, agent_id: str, workload: int) -> None:
         """Update agent workload metric."""
@@ -287,12 +349,9 @@ class MetricsCollector:
                 self.conversation_metrics["satisfaction_count"]
             )
         
-        # Calculate average response time
-        recent_response_times = [
-            r["response_time_ms"] for r in self.response_times
-            if (current_time - r["timestamp"]).total_seconds() < 3600  # Last hour
-        ]
-        avg_response_time = sum(recent_response_times) / len(recent_response_times) if recent_response_times else 0
+        # Calculate average response time (last hour)
+        recent_count = self._window_sum(self._rt_counts)
+        avg_response_time = self._window_sum(self._rt_sums) / recent_count if recent_count else 0
         
         # Calculate escalation rate
         total_conversations = (
@@ -320,10 +379,7 @@ class MetricsCollector:
                 "total_errors": self.conversation_metrics["total_errors"]
             },
             "compliance": {
-                "phi_detections_last_hour": len([
-                    p for p in self.phi_detections
-                    if (current_time - p["timestamp"]).total_seconds() < 3600
-                ]),
+                "phi_detections_last_hour": self._window_sum(self._phi_counts),
                 "phi_detection_rate": self._calculate_phi_detection_rate()
             },
             "channels": self._get_channel_metrics()
@@ -332,15 +388,14 @@ class MetricsCollector:
     def get_hourly_stats(self, hours: int = 24) -> List[Dict[str, Any]]:
         """Get hourly statistics for the last N hours."""
         stats = []
-        current_time = datetime.utcnow()
+        current_hour = int(time.time()) // 3600
         
-        for i in range(hours):
-            hour_time = current_time - timedelta(hours=i)
-            hour_key = hour_time.strftime("%Y-%m-%d_%H")
-            hour_data = self.hourly_stats.get(hour_key, {})
+        for epoch_hour in range(current_hour, current_hour - hours, -1):
+            slot = epoch_hour % HOUR_BUCKETS
+            hour_data = self._hour_ring[slot] if self._hour_ring_meta[slot] == epoch_hour else {}
             
             stats.append({
-                "hour": hour_time.strftime("%Y-%m-%d %H:00"),
+                "hour": datetime.utcfromtimestamp(epoch_hour * 3600).strftime("%Y-%m-%d %H:00"),
                 "conversations_started": hour_data.get("conversations_started", 0),
                 "conversations_completed": hour_data.get("conversations_completed", 0),
                 "escalations": hour_data.get("escalations", 0),
@@ -356,42 +411,60 @@ class MetricsCollector:
         current_time = datetime.utcnow()
         
         # Response time SLA (target: < 3 seconds)
-        recent_times = [
-            r["response_time_ms"] for r in self.response_times
-            if (current_time - r["timestamp"]).total_seconds() < 3600
-        ]
+        recent_count = self._window_sum(self._rt_counts)
         
         response_time_sla = 0.0
-        if recent_times:
-            under_sla = sum(1 for t in recent_times if t < 3000)
-            response_time_sla = (under_sla / len(recent_times)) * 100
+        if recent_count:
+            under_sla = self._window_sum(self._rt_under_sla)
+            response_time_sla = (under_sla / recent_count) * 100
         
         # Escalation SLA (target: > 80% resolution without escalation)
         resolution_sla = 100 - self._calculate_escalation_rate()
         
         return {
             "response_time_sla_percent": round(response_time_sla, 2),
-            "target_response_time_ms": 3000,
+            "target_response_time_ms": RESPONSE_TIME_SLA_MS,
             "resolution_sla_percent": round(resolution_sla, 2),
             "target_resolution_percent": 80.0,
             "last_updated": current_time.isoformat()
         }
     
+    def _hour_bucket(self) -> Dict[str, int]:
+        """Get the counters for the current hour, resetting the slot if it holds an older hour."""
+        epoch_hour = int(time.time()) // 3600
+        slot = epoch_hour % HOUR_BUCKETS
+        if self._hour_ring_meta[slot] != epoch_hour:
+            self._hour_ring_meta[slot] = epoch_hour
+            self._hour_ring[slot] = dict.fromkeys(HOURLY_STAT_FIELDS, 0)
+        return self._hour_ring[slot]
+    
+    def _minute_slot(self) -> int:
+        """Get the ring slot for the current minute, clearing it if it holds an older minute."""
+        epoch_minute = int(time.time()) // 60
+        slot = epoch_minute % MINUTE_BUCKETS
+        if self._minute_epochs[slot] != epoch_minute:
+            self._minute_epochs[slot] = epoch_minute
+            self._rt_counts[slot] = 0
+            self._rt_sums[slot] = 0.0
+            self._rt_under_sla[slot] = 0
+            self._phi_counts[slot] = 0
+        return slot
+    
+    def _window_sum(self, buckets: List[float]) -> float:
+        """Sum the buckets whose minute falls inside the last hour."""
+        oldest_minute = int(time.time()) // 60 - MINUTE_BUCKETS
+        return sum(
+            value for value, epoch_minute in zip(buckets, self._minute_epochs)
+            if epoch_minute > oldest_minute
+        )
+    
     def _calculate_phi_detection_rate(self) -> float:
         """Calculate PHI detection rate."""
-        current_time = datetime.utcnow()
-        
         # PHI detections in last hour
-        recent_phi = len([
-            p for p in self.phi_detections
-            if (current_time - p["timestamp"]).total_seconds() < 3600
-        ])
+        recent_phi = self._window_sum(self._phi_counts)
         
         # Messages processed in last hour
-        recent_messages = len([
-            r for r in self.response_times
-            if (current_time - r["timestamp"]).total_seconds() < 3600
-        ])
+        recent_messages = self._window_sum(self._rt_counts)
         
         if recent_messages == 0:
             return 0.0
@@ -414,15 +487,4 @@ class MetricsCollector:
     
     def _get_channel_metrics(self) -> Dict[str, Dict[str, int]]:
         """Get metrics broken down by channel."""
-        channels = {}
-        
-        for key, value in self.conversation_metrics.items():
-            if "_" in key:
-                parts = key.split("_", 1)
-                if len(parts) == 2:
-                    metric_type, channel = parts
-                    if channel not in channels:
-                        channels[channel] = {}
-                    channels[channel][metric_type] = value
-        
-        return channels 
\ No newline at end of file
+        return {channel: dict(metrics) for channel, metrics in self.channel_metrics.items()} 
\ No newline at end of file
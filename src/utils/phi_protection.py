@@ -3,19 +3,82 @@ PHI Protection - HIPAA-compliant PHI detection and redaction for MedinovAI
 Handles detection, redaction, and anonymization of Protected Health Information
 """
 
+import asyncio
+import functools
 import re
 import hashlib
-from datetime import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Tuple, Any
 
 import structlog
-from presidio_analyzer import AnalyzerEngine
+from presidio_analyzer import AnalyzerEngine, BatchAnalyzerEngine, RecognizerRegistry, RecognizerResult
+from presidio_analyzer.predefined_recognizers import (
+    CreditCardRecognizer,
+    DateRecognizer,
+    EmailRecognizer,
+    MedicalLicenseRecognizer,
+    PhoneRecognizer,
+    SpacyRecognizer,
+    UsPassportRecognizer,
+    UsSsnRecognizer,
+)
 from presidio_anonymizer import AnonymizerEngine
 
 from utils.config import Settings
 
+try:
+    import re2
+except ImportError:
+    re2 = None
+
 logger = structlog.get_logger(__name__)
 
+# Entities Presidio looks for in every message
+PHI_ENTITIES = [
+    "PERSON", "PHONE_NUMBER", "EMAIL_ADDRESS",
+    "US_SSN", "CREDIT_CARD", "DATE_TIME",
+    "MEDICAL_LICENSE", "US_PASSPORT"
+]
+
+# How long the analyze worker waits for more texts to join a batch
+ANALYZE_BATCH_WINDOW_SECONDS = 0.005
+
+# Most texts analyzed in one batched Presidio call
+ANALYZE_MAX_BATCH_SIZE = 32
+
+# Custom PHI patterns not covered by Presidio, one named group per PHI type
+CUSTOM_PHI_PATTERNS = {
+    # Medical Record Numbers (MRN)
+    "mrn": r'(?i:\b(?:mrn|medical\s+record|patient\s+id)[:\s#]*([a-z0-9\-]{6,})\b)',
+    # Insurance ID patterns
+    "insurance_id": r'(?i:\b(?:insurance|policy|member)\s+(?:id|number)[:\s#]*([a-z0-9\-]{8,})\b)',
+    # Date of Birth patterns
+    "dob": r'(?i:\b(?:dob|date\s+of\s+birth|born)[:\s]*(\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4})\b)',
+    # Prescription numbers
+    "prescription": r'(?i:\b(?:rx|prescription)[:\s#]*([a-z0-9\-]{6,})\b)',
+    # Appointment IDs
+    "appointment_id": r'(?i:\b(?:appointment|appt)[:\s#]*([a-z0-9\-]{6,})\b)',
+    # Diagnosis codes (ICD-10), case-sensitive
+    "diagnosis_code": r'\b[A-Z]\d{2}(?:\.\d{1,3})?\b',
+    # Lab values with specific ranges
+    "lab_value": r'(?i:\b(?:glucose|cholesterol|blood\s+pressure)\s*:?\s*\d+(?:\.\d+)?(?:\s*mg/dl|mmhg)?\b)',
+}
+
+# Compiled once at import and shared by every PHIProtector; RE2 when installed for linear-time matching
+_CUSTOM_PHI_RE = (re2 or re).compile(
+    "|".join(f"(?P<{name}>{source})" for name, source in CUSTOM_PHI_PATTERNS.items())
+)
+
+# Identifier patterns redact only their captured value and keep the leading label
+_PHI_VALUE_GROUPS = {
+    name: _CUSTOM_PHI_RE.groupindex[name] + 1
+    for name, source in CUSTOM_PHI_PATTERNS.items() if re.compile(source).groups
+}
+
+# Redaction placeholder per PHI type
+_PHI_PLACEHOLDERS = {name: f"[REDACTED_{name.upper()}]" for name in CUSTOM_PHI_PATTERNS}
+
 
 class PHIProtector:
     """
@@ -27,9 +90,21 @@ class PHIProtector:
         self.settings = settings
         self.analyzer: Optional[AnalyzerEngine] = None
         self.anonymizer: Optional[AnonymizerEngine] = None
+        self.batch_analyzer: Optional[BatchAnalyzerEngine] = None
+        
+        # Concurrent analyze requests are coalesced into batched Presidio calls
+        self._analyze_queue: Optional[asyncio.Queue] = None
+        self._analyze_task: Optional[asyncio.Task] = None
+        
+        # Presidio (spaCy NER + regex recognizers) runs on one dedicated thread, off the event loop
+        self._analyze_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="phi-analyze")
         
         # PHI patterns for enhanced detection
-        self.phi_patterns = self._initialize_phi_patterns()
+        self.phi_pattern = _CUSTOM_PHI_RE
+        
+        # SHA-256 state with the salt already absorbed; hash_phi copies it per value
+        salt = settings.encryption_key.get_secret_value()[:16] if settings.encryption_key else "default_salt"
+        self._phi_hash_base = hashlib.sha256(salt.encode())
         
         # Redaction configuration
         self.redaction_enabled = settings.phi_redaction_enabled
@@ -41,9 +116,19 @@ class PHIProtector:
         """Initialize PHI protection engines."""
         try:
             if self.redaction_enabled:
-                # Initialize Presidio analyzer and anonymizer
-                self.analyzer = AnalyzerEngine()
+                # Initialize Presidio analyzer (only the recognizers for PHI_ENTITIES) and anonymizer
+                self.analyzer = AnalyzerEngine(
+                    registry=self._build_recognizer_registry(),
+                    supported_languages=["en"]
+                )
                 self.anonymizer = AnonymizerEngine()
+                self.batch_analyzer = BatchAnalyzerEngine(analyzer_engine=self.analyzer)
+                
+                # Run the spaCy pipeline and recognizers once so the first message doesn't pay for warm-up
+                await self._run_analyze(["warmup"])
+                
+                self._analyze_queue = asyncio.Queue()
+                self._analyze_task = asyncio.create_task(self._analyze_worker())
                 
                 logger.info("PHI protection engines initialized")
             else:
@@ -72,15 +157,7 @@ class PHIProtector:
             
             if self.analyzer and self.anonymizer:
                 # Analyze text for PII/PHI
-                results = self.analyzer.analyze(
-                    text=text,
-                    entities=[
-                        "PERSON", "PHONE_NUMBER", "EMAIL_ADDRESS", 
-                        "SSN", "CREDIT_CARD", "DATE_TIME",
-                        "MEDICAL_LICENSE", "US_PASSPORT"
-                    ],
-                    language="en"
-                )
+                results = await self._enqueue_analyze(text)
                 
                 if results:
                     phi_detected = True
@@ -112,6 +189,14 @@ class PHIProtector:
             # Return original text if detection fails
             return False, text
     
+    async def detect_and_redact_batch(
+        self,
+        texts: List[str],
+        context: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[bool, str]]:
+        """Detect and redact PHI in several texts; Presidio analyzes them in shared batches."""
+        return await asyncio.gather(*(self.detect_and_redact(text, context) for text in texts))
+    
     async def anonymize_for_analytics(
         self,
         data: Dict[str, Any]
@@ -120,103 +205,155 @@ class PHIProtector:
         if not self.redaction_enabled:
             return data
         
-        anonymized_data = {}
+        # Copy the structure first, remembering where each string value lives
+        slots: List[Tuple[Dict[str, Any], str]] = []
+        anonymized_data = self._copy_for_anonymization(data, slots)
+        
+        # Redact all string values concurrently so Presidio sees them as one batch
+        results = await self.detect_and_redact_batch([container[key] for container, key in slots])
+        for (container, key), (_, anonymized_value) in zip(slots, results):
+            container[key] = anonymized_value
+        
+        return anonymized_data
+    
+    def _copy_for_anonymization(
+        self,
+        data: Dict[str, Any],
+        slots: List[Tuple[Dict[str, Any], str]]
+    ) -> Dict[str, Any]:
+        """Copy nested analytics data, recording the (dict, key) slot of every string to redact."""
+        copied = {}
         
         for key, value in data.items():
             if isinstance(value, str):
-                _, anonymized_value = await self.detect_and_redact(value)
-                anonymized_data[key] = anonymized_value
+                copied[key] = value
+                slots.append((copied, key))
             elif isinstance(value, dict):
-                anonymized_data[key] = await self.anonymize_for_analytics(value)
+                copied[key] = self._copy_for_anonymization(value, slots)
             elif isinstance(value, list):
-                anonymized_data[key] = [
-                    await self.anonymize_for_analytics(item) if isinstance(item, dict)
+                copied[key] = [
+                    self._copy_for_anonymization(item, slots) if isinstance(item, dict)
                     else item for item in value
                 ]
             else:
-                anonymized_data[key] = value
+                copied[key] = value
         
-        return anonymized_data
+        return copied
     
     def hash_phi(self, phi_value: str) -> str:
         """Create consistent hash for PHI (for tracking without storing)."""
         # Use SHA-256 with salt for consistent hashing
-        salt = self.settings.encryption_key.get_secret_value()[:16] if self.settings.encryption_key else "default_salt"
-        combined = f"{salt}{phi_value}"
-        return hashlib.sha256(combined.encode()).hexdigest()[:16]
+        phi_hash = self._phi_hash_base.copy()
+        phi_hash.update(phi_value.encode())
+        return phi_hash.hexdigest()[:16]
     
-    def _initialize_phi_patterns(self) -> Dict[str, re.Pattern]:
-        """Initialize regex patterns for PHI detection."""
-        patterns = {}
-        
-        # Medical Record Numbers (MRN)
-        patterns["mrn"] = re.compile(
-            r'\b(?:mrn|medical\s+record|patient\s+id)[:\s#]*([a-z0-9\-]{6,})\b',
-            re.IGNORECASE
-        )
-        
-        # Insurance ID patterns
-        patterns["insurance_id"] = re.compile(
-            r'\b(?:insurance|policy|member)\s+(?:id|number)[:\s#]*([a-z0-9\-]{8,})\b',
-            re.IGNORECASE
-        )
-        
-        # Date of Birth patterns
-        patterns["dob"] = re.compile(
-            r'\b(?:dob|date\s+of\s+birth|born)[:\s]*(\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4})\b',
-            re.IGNORECASE
-        )
+    async def cleanup(self) -> None:
+        """Stop the analyze worker and its thread."""
+        # Texts still queued fail rather than leave their callers waiting, and later
+        # calls go straight to the (shut down) executor instead of the dead queue
+        if self._analyze_task:
+            queue, self._analyze_queue = self._analyze_queue, None
+            self._analyze_task.cancel()
+            await asyncio.gather(self._analyze_task, return_exceptions=True)
+            self._analyze_task = None
+            pending = []
+            while not queue.empty():
+                pending.append(queue.get_nowait())
+            self._fail_waiters(pending, RuntimeError("PHI protector is shutting down"))
+        self._analyze_executor.shutdown(wait=False)
+    
+    def _build_recognizer_registry(self) -> RecognizerRegistry:
+        """Registry with just the recognizers for PHI_ENTITIES, skipping Presidio's other defaults."""
+        return RecognizerRegistry(recognizers=[
+            SpacyRecognizer(),
+            PhoneRecognizer(),
+            EmailRecognizer(),
+            UsSsnRecognizer(),
+            CreditCardRecognizer(),
+            DateRecognizer(),
+            MedicalLicenseRecognizer(),
+            UsPassportRecognizer(),
+        ])
+    
+    async def _enqueue_analyze(self, text: str) -> List[RecognizerResult]:
+        """Analyze text through the batching worker."""
+        if self._analyze_queue is None:
+            return (await self._run_analyze([text]))[0]
         
-        # Prescription numbers
-        patterns["prescription"] = re.compile(
-            r'\b(?:rx|prescription)[:\s#]*([a-z0-9\-]{6,})\b',
-            re.IGNORECASE
-        )
+        future = asyncio.get_running_loop().create_future()
+        self._analyze_queue.put_nowait((text, future))
+        return await future
+    
+    async def _analyze_worker(self) -> None:
+        """Coalesce queued texts for a short window and analyze them in one call."""
+        loop = asyncio.get_running_loop()
+        queue = self._analyze_queue
+        items: List[Tuple[str, asyncio.Future]] = []
         
-        # Appointment IDs
-        patterns["appointment_id"] = re.compile(
-            r'\b(?:appointment|appt)[:\s#]*([a-z0-9\-]{6,})\b',
-            re.IGNORECASE
+        try:
+            while True:
+                items = [await queue.get()]
+                deadline = loop.time() + ANALYZE_BATCH_WINDOW_SECONDS
+                while len(items) < ANALYZE_MAX_BATCH_SIZE:
+                    if not queue.empty():
+                        items.append(queue.get_nowait())
+                        continue
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        items.append(await asyncio.wait_for(queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                
+                texts = [text for text, _ in items]
+                try:
+                    results = await self._run_analyze(texts)
+                except Exception as e:
+                    logger.error("Batched PHI analysis failed", batch_size=len(texts), error=str(e))
+                    self._fail_waiters(items, e)
+                    continue
+                
+                for (_, future), text_results in zip(items, results):
+                    if not future.done():
+                        future.set_result(text_results)
+        except asyncio.CancelledError:
+            # Cleanup fails whatever is still queued; the batch in hand fails here
+            self._fail_waiters(items, RuntimeError("PHI protector is shutting down"))
+            raise
+    
+    def _fail_waiters(self, items: List[Tuple[str, asyncio.Future]], error: Exception) -> None:
+        """Fail the still-pending futures of queued (text, future) items."""
+        for _, future in items:
+            if not future.done():
+                future.set_exception(error)
+    
+    async def _run_analyze(self, texts: List[str]) -> List[List[RecognizerResult]]:
+        """Run Presidio over a batch of texts on the analyze thread."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._analyze_executor,
+            functools.partial(
+                self.batch_analyzer.analyze_iterator,
+                texts,
+                language="en",
+                entities=PHI_ENTITIES
+            )
         )
-        
-        return patterns
     
     async def _detect_custom_phi(self, text: str) -> Tuple[bool, str]:
         """Detect custom PHI patterns not covered by Presidio."""
-        phi_detected = False
-        redacted_text = text
-        
-        for pattern_name, pattern in self.phi_patterns.items():
-            matches = pattern.findall(text)
-            if matches:
-                phi_detected = True
-                
-                # Replace matches with redacted placeholders
-                for match in matches:
-                    if isinstance(match, tuple):
-                        match = match[0]  # Get first capture group
-                    
-                    placeholder = f"[REDACTED_{pattern_name.upper()}]"
-                    redacted_text = redacted_text.replace(match, placeholder)
-        
-        # Additional checks for healthcare-specific PHI
-        
-        # Diagnosis codes (ICD-10)
-        icd_pattern = re.compile(r'\b[A-Z]\d{2}(?:\.\d{1,3})?\b')
-        if icd_pattern.search(text):
-            phi_detected = True
-            redacted_text = icd_pattern.sub('[REDACTED_DIAGNOSIS_CODE]', redacted_text)
-        
-        # Lab values with specific ranges
-        lab_pattern = re.compile(
-            r'\b(?:glucose|cholesterol|blood\s+pressure)\s*:?\s*\d+(?:\.\d+)?(?:\s*mg/dl|mmhg)?\b',
-            re.IGNORECASE
-        )
-        if lab_pattern.search(text):
-            phi_detected = True
-            redacted_text = lab_pattern.sub('[REDACTED_LAB_VALUE]', redacted_text)
-        
-        return phi_detected, redacted_text
+        # One scan over the text; each match is replaced where it was found
+        redacted_text, match_count = self.phi_pattern.subn(self._redact_phi_match, text)
+        return match_count > 0, redacted_text
+    
+    def _redact_phi_match(self, match: re.Match) -> str:
+        """Replacement text for a custom PHI match."""
+        phi_type = match.lastgroup
+        placeholder = _PHI_PLACEHOLDERS[phi_type]
+        value_group = _PHI_VALUE_GROUPS.get(phi_type)
+        if value_group is None:
+            return placeholder
+        return match.string[match.start():match.start(value_group)] + placeholder
     
     async def _log_phi_detection(
         self,
@@ -227,7 +364,7 @@ class PHIProtector:
         try:
             audit_entry = {
                 "event": "phi_detected",
-                "timestamp": datetime.utcnow().isoformat(),
+                "timestamp": time.time(),
                 "text_length": len(original_text),
                 "text_hash": hashlib.sha256(original_text.encode()).hexdigest(),
                 "context": context or {},
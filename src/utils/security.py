@@ -3,23 +3,156 @@ Security Manager - Authentication, encryption, and security controls for Medinov
 Handles JWT tokens, encryption, rate limiting, and security audit logging
 """
 
+import base64
+import hmac
+import json
+import os
+import re
 import secrets
 import hashlib
 import time
-import uuid
+from collections import defaultdict, deque
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Deque, Dict, List, Optional, Any, Tuple
 
 import structlog
 import jwt
 from passlib.context import CryptContext
-from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
 from utils.config import Settings
 
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = structlog.get_logger(__name__)
 
 
+# Fall back to stdlib encoding when orjson is unavailable
+if orjson is not None:
+    def _json_dumps(value: Any) -> bytes:
+        """Serialize a JWT payload."""
+        return orjson.dumps(value)
+    
+    _json_loads = orjson.loads
+else:
+    def _json_dumps(value: Any) -> bytes:
+        """Serialize a JWT payload."""
+        return json.dumps(value, separators=(",", ":")).encode()
+    
+    _json_loads = json.loads
+
+
+def _b64url_encode(data: bytes) -> str:
+    """Unpadded base64url, as used in JWTs."""
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64url_decode(data: str) -> bytes:
+    """Decode unpadded base64url."""
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+# Input fragments that indicate XSS or SQL injection attempts; earlier entries are reported first
+XSS_PATTERNS = [
+    "<script", "</script>", "javascript:", "onload=", "onerror=",
+    "onclick=", "onmouseover=", "onfocus=", "<iframe", "</iframe>"
+]
+SQL_INJECTION_PATTERNS = [
+    "union select", "drop table", "delete from", "insert into",
+    "update set", "'or'1'='1", "';--", "/*", "*/"
+]
+_INPUT_THREAT_PATTERNS = XSS_PATTERNS + SQL_INJECTION_PATTERNS
+
+# All threat fragments matched in one pass: Aho-Corasick when available, else an
+# overlapping-match regex; each fragment maps to its index in _INPUT_THREAT_PATTERNS
+_INPUT_THREAT_RANK = {pattern: rank for rank, pattern in enumerate(_INPUT_THREAT_PATTERNS)}
+
+if ahocorasick is not None:
+    _INPUT_THREAT_AUTOMATON = ahocorasick.Automaton()
+    for _pattern, _rank in _INPUT_THREAT_RANK.items():
+        _INPUT_THREAT_AUTOMATON.add_word(_pattern, _rank)
+    _INPUT_THREAT_AUTOMATON.make_automaton()
+else:
+    _INPUT_THREAT_AUTOMATON = None
+
+_INPUT_THREAT_PATTERN = re.compile(
+    "(?=("
+    + "|".join(
+        re.escape(pattern)
+        for pattern in sorted(_INPUT_THREAT_RANK, key=len, reverse=True)
+    )
+    + "))"
+)
+
+# Severity of each security event type; anything not listed is "low"
+SECURITY_EVENT_SEVERITY = {
+    "sql_injection_attempt": "high",
+    "xss_attempt": "high",
+    "token_invalid": "high",
+    "multiple_login_failures": "high",
+    "unauthorized_access": "high",
+    "rate_limit_exceeded": "medium",
+    "token_expired": "medium",
+    "input_too_long": "medium"
+}
+
+# HTML escapes applied by sanitize_input in a single pass
+_HTML_ESCAPE_TABLE = str.maketrans({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    "\"": "&quot;",
+    "'": "&#x27;"
+})
+
+# Random nonce prepended to each AES-GCM ciphertext
+AES_GCM_NONCE_BYTES = 12
+
+# Encoded JOSE header of the HS256 tokens we issue (same bytes PyJWT emits)
+_JWT_HS256_HEADER = base64.urlsafe_b64encode(b'{"alg":"HS256","typ":"JWT"}').rstrip(b"=").decode("ascii")
+
+# Redis key prefix for per-identifier rate limit windows
+RATE_LIMIT_KEY_PREFIX = "medinovai:ratelimit:"
+
+# Rate limit checks sit on every request, so Redis connects and replies are bounded tightly
+RATE_LIMIT_REDIS_TIMEOUT_SECONDS = 0.25
+
+# After a Redis failure the local limiter is used this long before Redis is tried again
+RATE_LIMIT_REDIS_RETRY_SECONDS = 30.0
+
+# Sliding-window log in a sorted set, trimmed, counted and appended atomically;
+# returns {allowed, requests in window}
+_RATE_LIMIT_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local count = redis.call('ZCARD', KEYS[1])
+if count >= limit then
+    return {0, count}
+end
+redis.call('ZADD', KEYS[1], now, ARGV[4])
+redis.call('EXPIRE', KEYS[1], math.ceil(window))
+return {1, count + 1}
+"""
+
+# Window covered by the security summary and score
+SECURITY_EVENT_WINDOW_SECONDS = 86400
+
+
 class SecurityManager:
     """
     Manages security aspects of MedinovAI including authentication,
@@ -34,29 +167,45 @@ class SecurityManager:
         
         # JWT configuration
         self.jwt_secret = settings.jwt_secret.get_secret_value()
+        self._jwt_secret_bytes = self.jwt_secret.encode()
         self.jwt_algorithm = "HS256"
         self.jwt_expiry = settings.jwt_expiry
         
-        # Encryption
+        # Encryption (AES-256-GCM)
         self.encryption_key = None
+        self._aead: Optional[AESGCM] = None
         if settings.encryption_key:
             self.encryption_key = settings.encryption_key.get_secret_value()
-            # Ensure key is proper length for Fernet
+            # Derive a 256-bit key from the configured secret
             key_hash = hashlib.sha256(self.encryption_key.encode()).digest()
-            import base64
-            self.fernet = Fernet(base64.urlsafe_b64encode(key_hash))
-        
-        # Rate limiting storage (in production, use Redis)
+            self._aead = AESGCM(key_hash)
+        
+        # Rate limiting: shared Redis sliding window, in-process fallback without the redis package
+        self.redis = aioredis.from_url(
+            settings.redis_url,
+            socket_connect_timeout=RATE_LIMIT_REDIS_TIMEOUT_SECONDS,
+            socket_timeout=RATE_LIMIT_REDIS_TIMEOUT_SECONDS
+        ) if aioredis is not None else None
+        self._rate_limit_script = (
+            self.redis.register_script(_RATE_LIMIT_SCRIPT) if self.redis is not None else None
+        )
         self.rate_limit_store: Dict[str, List[float]] = {}
+        # Circuit breaker: monotonic time before which Redis is skipped (0 while closed)
+        self._redis_retry_at = 0.0
         
-        # Security audit log
-        self.security_events: List[Dict[str, Any]] = []
+        # Security audit log for the last 24 hours as compact (epoch seconds, event type, severity)
+        # records, oldest first; full events go to the logger, only the running counts need these
+        self.security_events: Deque[Tuple[float, str, str]] = deque()
+        self._event_type_counts: Dict[str, int] = defaultdict(int)
+        self._severity_counts = {"low": 0, "medium": 0, "high": 0}
+        self._last_high_severity_event: Optional[Dict[str, Any]] = None
         
         logger.info("Security manager initialized")
     
     def generate_request_id(self) -> str:
         """Generate unique request ID for tracing."""
-        return str(uuid.uuid4())
+        # 128 random bits as 22 base64url characters, without uuid4's formatting
+        return base64.urlsafe_b64encode(os.urandom(16)).rstrip(b"=").decode("ascii")
     
     def hash_password(self, password: str) -> str:
         """Hash password using bcrypt."""
@@ -73,78 +222,186 @@ class SecurityManager:
     ) -> str:
         """Create JWT access token."""
         to_encode = data.copy()
+        now = int(time.time())
         
         if expires_delta:
-            expire = datetime.utcnow() + expires_delta
+            expire = now + int(expires_delta.total_seconds())
         else:
-            expire = datetime.utcnow() + timedelta(seconds=self.jwt_expiry)
+            expire = now + self.jwt_expiry
         
         to_encode.update({
             "exp": expire,
-            "iat": datetime.utcnow(),
+            "iat": now,
             "type": "access"
         })
         
-        return jwt.encode(to_encode, self.jwt_secret, algorithm=self.jwt_algorithm)
+        return self._encode_hs256(to_encode)
     
     def create_refresh_token(self, user_id: str) -> str:
         """Create JWT refresh token."""
+        now = int(time.time())
         to_encode = {
             "sub": user_id,
-            "exp": datetime.utcnow() + timedelta(seconds=self.settings.jwt_refresh_expiry),
-            "iat": datetime.utcnow(),
+            "exp": now + self.settings.jwt_refresh_expiry,
+            "iat": now,
             "type": "refresh"
         }
         
-        return jwt.encode(to_encode, self.jwt_secret, algorithm=self.jwt_algorithm)
+        return self._encode_hs256(to_encode)
     
     def verify_token(self, token: str) -> Optional[Dict[str, Any]]:
         """Verify and decode JWT token."""
         try:
-            payload = jwt.decode(
-                token,
-                self.jwt_secret,
-                algorithms=[self.jwt_algorithm]
-            )
+            # Tokens with our own header take the cached-key path, anything else goes through PyJWT
+            payload = self._decode_hs256(token)
+            if payload is None:
+                payload = jwt.decode(
+                    token,
+                    self.jwt_secret,
+                    algorithms=[self.jwt_algorithm]
+                )
             return payload
         except jwt.ExpiredSignatureError:
             self.log_security_event("token_expired", {"token_type": "access"})
             return None
-        except jwt.JWTError as e:
+        except jwt.InvalidTokenError as e:
             self.log_security_event("token_invalid", {"error": str(e)})
             return None
     
+    def _encode_hs256(self, payload: Dict[str, Any]) -> str:
+        """Sign an HS256 JWT using the precomputed header and key bytes."""
+        signing_input = f"{_JWT_HS256_HEADER}.{_b64url_encode(_json_dumps(payload))}"
+        signature = hmac.new(self._jwt_secret_bytes, signing_input.encode("ascii"), hashlib.sha256).digest()
+        return f"{signing_input}.{_b64url_encode(signature)}"
+    
+    def _decode_hs256(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Verify an HS256 JWT carrying our standard header, with PyJWT's claim checks.
+        Returns None when the header differs; raises PyJWT's exceptions on failure.
+        """
+        signing_input, _, signature_b64 = token.rpartition(".")
+        header_b64, _, payload_b64 = signing_input.partition(".")
+        if header_b64 != _JWT_HS256_HEADER:
+            return None
+        
+        try:
+            signature = _b64url_decode(signature_b64)
+            expected = hmac.new(
+                self._jwt_secret_bytes, signing_input.encode("ascii"), hashlib.sha256
+            ).digest()
+        except ValueError as e:
+            raise jwt.DecodeError("Invalid token encoding") from e
+        if not hmac.compare_digest(signature, expected):
+            raise jwt.InvalidSignatureError("Signature verification failed")
+        
+        try:
+            payload = _json_loads(_b64url_decode(payload_b64))
+        except ValueError as e:
+            raise jwt.DecodeError("Invalid payload") from e
+        if not isinstance(payload, dict):
+            raise jwt.DecodeError("Invalid payload string: must be a json object")
+        
+        now = int(time.time())
+        exp = payload.get("exp")
+        if exp is not None:
+            if not isinstance(exp, (int, float)):
+                raise jwt.DecodeError("Expiration Time claim (exp) must be an integer.")
+            if exp <= now:
+                raise jwt.ExpiredSignatureError("Signature has expired")
+        iat = payload.get("iat")
+        if iat is not None:
+            if not isinstance(iat, (int, float)):
+                raise jwt.InvalidIssuedAtError("Issued At claim (iat) must be an integer.")
+            if iat > now:
+                raise jwt.ImmatureSignatureError("The token is not yet valid (iat)")
+        nbf = payload.get("nbf")
+        if nbf is not None:
+            if not isinstance(nbf, (int, float)):
+                raise jwt.DecodeError("Not Before claim (nbf) must be an integer.")
+            if nbf > now:
+                raise jwt.ImmatureSignatureError("The token is not yet valid (nbf)")
+        if "aud" in payload:
+            raise jwt.InvalidAudienceError("Invalid audience")
+        
+        return payload
+    
     def encrypt_data(self, data: str) -> Optional[str]:
         """Encrypt sensitive data."""
-        if not self.fernet:
+        if not self._aead:
             logger.warning("Encryption not configured")
             return data
         
         try:
-            return self.fernet.encrypt(data.encode()).decode()
+            return base64.urlsafe_b64encode(self.encrypt_bytes(data.encode())).decode("ascii")
         except Exception as e:
             logger.error("Encryption failed", error=str(e))
             return None
     
     def decrypt_data(self, encrypted_data: str) -> Optional[str]:
         """Decrypt sensitive data."""
-        if not self.fernet:
+        if not self._aead:
             logger.warning("Encryption not configured")
             return encrypted_data
         
         try:
-            return self.fernet.decrypt(encrypted_data.encode()).decode()
+            return self.decrypt_bytes(base64.urlsafe_b64decode(encrypted_data)).decode()
         except Exception as e:
             logger.error("Decryption failed", error=str(e))
             return None
     
-    def check_rate_limit(
+    def encrypt_bytes(self, data: bytes) -> bytes:
+        """Encrypt raw bytes as nonce + ciphertext + tag, for callers that don't need text."""
+        nonce = os.urandom(AES_GCM_NONCE_BYTES)
+        return nonce + self._aead.encrypt(nonce, data, None)
+    
+    def decrypt_bytes(self, encrypted_data: bytes) -> bytes:
+        """Decrypt the output of encrypt_bytes; raises InvalidTag if it was tampered with."""
+        nonce, ciphertext = encrypted_data[:AES_GCM_NONCE_BYTES], encrypted_data[AES_GCM_NONCE_BYTES:]
+        return self._aead.decrypt(nonce, ciphertext, None)
+    
+    async def check_rate_limit(
         self,
         identifier: str,
         requests_per_minute: int = 60,
         window_minutes: int = 1
     ) -> bool:
         """Check if request is within rate limit."""
+        if self._rate_limit_script is not None and time.monotonic() >= self._redis_retry_at:
+            try:
+                allowed, request_count = await self._rate_limit_script(
+                    keys=[f"{RATE_LIMIT_KEY_PREFIX}{identifier}"],
+                    args=[time.time(), window_minutes * 60, requests_per_minute, secrets.token_hex(8)]
+                )
+            except Exception as e:
+                # Checks already in flight when the breaker trips fail too; log the trip once
+                if time.monotonic() >= self._redis_retry_at:
+                    self._redis_retry_at = time.monotonic() + RATE_LIMIT_REDIS_RETRY_SECONDS
+                    logger.warning(
+                        "Redis rate limit check failed, using local limiter",
+                        error=str(e),
+                        retry_in_seconds=RATE_LIMIT_REDIS_RETRY_SECONDS
+                    )
+            else:
+                if self._redis_retry_at:
+                    self._redis_retry_at = 0.0
+                    logger.info("Redis rate limiting restored")
+                if not allowed:
+                    self.log_security_event("rate_limit_exceeded", {
+                        "identifier": identifier,
+                        "requests": request_count,
+                        "limit": requests_per_minute
+                    })
+                return bool(allowed)
+        
+        return self._check_local_rate_limit(identifier, requests_per_minute, window_minutes)
+    
+    def _check_local_rate_limit(
+        self,
+        identifier: str,
+        requests_per_minute: int,
+        window_minutes: int
+    ) -> bool:
+        """In-process rate limit check, used when Redis is unavailable."""
         current_time = time.time()
         window_start = current_time - (window_minutes * 60)
         
@@ -183,36 +440,28 @@ class SecurityManager:
             })
             return False
         
-        # Check for potential XSS
-        xss_patterns = [
-            "<script", "</script>", "javascript:", "onload=", "onerror=",
-            "onclick=", "onmouseover=", "onfocus=", "<iframe", "</iframe>"
-        ]
-        
+        # Check for potential XSS and SQL injection patterns in one scan
         input_lower = input_data.lower()
-        for pattern in xss_patterns:
-            if pattern in input_lower:
-                self.log_security_event("xss_attempt", {
-                    "pattern": pattern,
-                    "input_length": len(input_data)
-                })
-                return False
-        
-        # Check for SQL injection patterns
-        sql_patterns = [
-            "union select", "drop table", "delete from", "insert into",
-            "update set", "'or'1'='1", "';--", "/*", "*/"
-        ]
-        
-        for pattern in sql_patterns:
-            if pattern in input_lower:
-                self.log_security_event("sql_injection_attempt", {
-                    "pattern": pattern,
-                    "input_length": len(input_data)
-                })
-                return False
         
-        return True
+        if _INPUT_THREAT_AUTOMATON is not None:
+            ranks = (rank for _, rank in _INPUT_THREAT_AUTOMATON.iter(input_lower))
+        else:
+            ranks = (
+                _INPUT_THREAT_RANK[match.group(1)]
+                for match in _INPUT_THREAT_PATTERN.finditer(input_lower)
+            )
+        
+        rank = min(ranks, default=None)
+        if rank is None:
+            return True
+        
+        # XSS patterns take precedence over SQL injection patterns
+        event_type = "xss_attempt" if rank < len(XSS_PATTERNS) else "sql_injection_attempt"
+        self.log_security_event(event_type, {
+            "pattern": _INPUT_THREAT_PATTERNS[rank],
+            "input_length": len(input_data)
+        })
+        return False
     
     def sanitize_input(self, input_data: str) -> str:
         """Sanitize user input."""
@@ -220,11 +469,12 @@ class SecurityManager:
             return input_data
         
         # Remove potential XSS characters
-        sanitized = input_data.replace("<", "&lt;").replace(">", "&gt;")
-        sanitized = sanitized.replace("\"", "&quot;").replace("'", "&#x27;")
-        sanitized = sanitized.replace("&", "&amp;")
-        
-        return sanitized
+        return input_data.translate(_HTML_ESCAPE_TABLE)
+    
+    async def cleanup(self) -> None:
+        """Close the Redis connection used for rate limiting."""
+        if self.redis is not None:
+            await self.redis.close()
     
     def generate_session_id(self) -> str:
         """Generate secure session ID."""
@@ -232,12 +482,15 @@ class SecurityManager:
     
     def generate_otp(self, length: int = 6) -> str:
         """Generate numeric OTP code."""
-        return ''.join([str(secrets.randbelow(10)) for _ in range(length)])
+        # One uniform draw over all codes of this length, zero-padded
+        return f"{secrets.randbelow(10 ** length):0{length}d}"
     
     def hash_otp(self, otp: str, phone_number: str) -> str:
         """Create hash of OTP with phone number for verification."""
-        combined = f"{otp}{phone_number}{self.jwt_secret}"
-        return hashlib.sha256(combined.encode()).hexdigest()
+        otp_hash = hashlib.sha256(otp.encode())
+        otp_hash.update(phone_number.encode())
+        otp_hash.update(self._jwt_secret_bytes)
+        return otp_hash.hexdigest()
     
     def verify_otp_hash(self, otp: str, phone_number: str, otp_hash: str) -> bool:
         """Verify OTP against stored hash."""
@@ -252,17 +505,24 @@ class SecurityManager:
         ip_address: Optional[str] = None
     ) -> None:
         """Log security event for audit."""
+        # Epoch seconds; formatted as ISO only when the event is read back in a summary
+        now = time.time()
         event = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": now,
             "event_type": event_type,
             "details": details,
             "user_id": user_id,
             "ip_address": ip_address,
-            "severity": self._get_event_severity(event_type)
+            "severity": SECURITY_EVENT_SEVERITY.get(event_type, "low")
         }
         
         # Store in memory (in production, use secure audit database)
-        self.security_events.append(event)
+        self._expire_security_events(now)
+        self.security_events.append((now, event_type, event["severity"]))
+        self._event_type_counts[event_type] += 1
+        self._severity_counts[event["severity"]] += 1
+        if event["severity"] == "high":
+            self._last_high_severity_event = event
         
         # Log based on severity
         if event["severity"] == "high":
@@ -274,82 +534,51 @@ class SecurityManager:
     
     def get_security_summary(self) -> Dict[str, Any]:
         """Get security events summary."""
-        current_time = datetime.utcnow()
-        
         # Count events by type in last 24 hours
-        recent_events = [
-            event for event in self.security_events
-            if (current_time - datetime.fromisoformat(event["timestamp"])).total_seconds() < 86400
-        ]
-        
-        event_counts = {}
-        severity_counts = {"low": 0, "medium": 0, "high": 0}
-        
-        for event in recent_events:
-            event_type = event["event_type"]
-            event_counts[event_type] = event_counts.get(event_type, 0) + 1
-            
-            severity = event["severity"]
-            severity_counts[severity] += 1
+        self._expire_security_events(time.time())
         
         return {
-            "total_events_24h": len(recent_events),
-            "event_types": event_counts,
-            "severity_breakdown": severity_counts,
+            "total_events_24h": len(self.security_events),
+            "event_types": dict(self._event_type_counts),
+            "severity_breakdown": dict(self._severity_counts),
             "last_high_severity": self._get_last_high_severity_event(),
             "security_score": self._calculate_security_score()
         }
     
     def _get_event_severity(self, event_type: str) -> str:
         """Determine severity level for security event."""
-        high_severity = [
-            "sql_injection_attempt", "xss_attempt", "token_invalid",
-            "multiple_login_failures", "unauthorized_access"
-        ]
-        
-        medium_severity = [
-            "rate_limit_exceeded", "token_expired", "input_too_long"
-        ]
-        
-        if event_type in high_severity:
-            return "high"
-        elif event_type in medium_severity:
-            return "medium"
-        else:
-            return "low"
+        return SECURITY_EVENT_SEVERITY.get(event_type, "low")
     
     def _get_last_high_severity_event(self) -> Optional[Dict[str, Any]]:
         """Get most recent high severity security event."""
-        high_severity_events = [
-            event for event in self.security_events
-            if event["severity"] == "high"
-        ]
-        
-        if high_severity_events:
-            return max(high_severity_events, key=lambda x: x["timestamp"])
-        
-        return None
+        event = self._last_high_severity_event
+        if event is None:
+            return None
+        return {**event, "timestamp": datetime.utcfromtimestamp(event["timestamp"]).isoformat()}
     
     def _calculate_security_score(self) -> int:
         """Calculate security score based on recent events."""
-        current_time = datetime.utcnow()
-        
         # Events in last 24 hours
-        recent_events = [
-            event for event in self.security_events
-            if (current_time - datetime.fromisoformat(event["timestamp"])).total_seconds() < 86400
-        ]
-        
-        # Start with perfect score
-        score = 100
-        
-        # Deduct points for security events
-        for event in recent_events:
-            if event["severity"] == "high":
-                score -= 10
-            elif event["severity"] == "medium":
-                score -= 3
-            else:
-                score -= 1
-        
-        return max(0, score)  # Don't go below 0 
\ No newline at end of file
+        self._expire_security_events(time.time())
+        severity_counts = self._severity_counts
+        
+        # Start with perfect score and deduct points for security events
+        score = (
+            100
+            - 10 * severity_counts["high"]
+            - 3 * severity_counts["medium"]
+            - severity_counts["low"]
+        )
+        
+        return max(0, score)  # Don't go below 0
+    
+    def _expire_security_events(self, now: float) -> None:
+        """Drop events older than the summary window and take them out of the running counts."""
+        cutoff = now - SECURITY_EVENT_WINDOW_SECONDS
+        events = self.security_events
+        while events and events[0][0] <= cutoff:
+            _, event_type, severity = events.popleft()
+            self._event_type_counts[event_type] -= 1
+            if not self._event_type_counts[event_type]:
+                del self._event_type_counts[event_type]
+            self._severity_counts[severity] -= 1 
\ No newline at end of file